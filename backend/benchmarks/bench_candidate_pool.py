@@ -0,0 +1,98 @@
+"""Candidate pool bitset counts vs a per-request scan.
+
+The baseline does what a join over worker_skills and worker_details would
+do per request, but in-process over Python dicts, so it is a lower bound for
+the Mongo version. Run from the backend directory:
+
+    python benchmarks/bench_candidate_pool.py [--workers 200000]
+"""
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from candidate_pool import CandidatePool  # noqa: E402
+
+CITIES = ["İstanbul", "Ankara", "İzmir", "Bursa", "Kocaeli", "Konya", "Antalya", "Kayseri"]
+
+
+def make_data(workers: int):
+    rng = random.Random(42)
+    # Three levels like the seeded tree: 5 main, 4 sub each, 3 details each
+    categories = {}
+    for m in range(5):
+        categories[f"m{m}"] = {"parent_id": None}
+        for s in range(4):
+            categories[f"m{m}s{s}"] = {"parent_id": f"m{m}"}
+            for d in range(3):
+                categories[f"m{m}s{s}d{d}"] = {"parent_id": f"m{m}s{s}"}
+    details = [c for c in categories if c.count("d") == 1 and "s" in c]
+    worker_docs = [{
+        "user_id": f"w{i}",
+        "city": rng.choice(CITIES),
+        "district": f"ilçe{rng.randrange(30)}",
+    } for i in range(workers)]
+    skill_docs = [
+        {"worker_id": f"w{i}", "skill_category_id": category}
+        for i in range(workers)
+        for category in rng.sample(details, rng.randint(1, 4))
+    ]
+    return categories, worker_docs, skill_docs
+
+
+def scan_count(categories, worker_docs, skill_docs, wanted, city):
+    def ancestors(category_id):
+        while category_id is not None:
+            yield category_id
+            category_id = categories[category_id]["parent_id"]
+
+    skills_by_worker = {}
+    for doc in skill_docs:
+        skills_by_worker.setdefault(doc["worker_id"], set()).update(ancestors(doc["skill_category_id"]))
+    return sum(
+        1 for w in worker_docs
+        if w["city"] == city and set(wanted) <= skills_by_worker.get(w["user_id"], set())
+    )
+
+
+def timed(func, repeat: int = 20) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=200_000)
+    args = parser.parse_args()
+
+    categories, worker_docs, skill_docs = make_data(args.workers)
+    pool = CandidatePool()
+    tracemalloc.start()
+    start = time.perf_counter()
+    pool.load(categories, worker_docs, skill_docs)
+    elapsed = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"Loaded {len(pool)} workers / {len(skill_docs)} skills in {elapsed:.2f} s, ~{memory / 2**20:.0f} MiB")
+
+    for wanted, city in [(["m1"], "İstanbul"), (["m2s1", "m3s0"], "Ankara"), (["m0s2d1"], "İzmir")]:
+        count = pool.count(wanted, city=city)["all_skills"]
+        assert count == scan_count(categories, worker_docs, skill_docs, wanted, city)
+        scan_s = timed(lambda: scan_count(categories, worker_docs, skill_docs, wanted, city), 2)
+        pool_s = timed(lambda: pool.count(wanted, city=city))
+        print(f"  {','.join(wanted):<12} {city:<9} scan {scan_s * 1e3:9.2f} ms   bitsets {pool_s * 1e6:8.1f} µs   "
+              f"x{scan_s / pool_s:8.0f}   ({count} workers)")
+
+    update_s = timed(lambda: pool.set_skills("w7", ["m4s3d2"]), 100)
+    print(f"  set_skills on one worker: {update_s * 1e6:.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
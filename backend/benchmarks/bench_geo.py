@@ -0,0 +1,121 @@
+"""Nearby search ($geoNear on a 2dsphere index) vs matching the city string.
+
+Workers are spread around the district centroids of the bundled table with
+a few kilometres of jitter. In-process, the benchmark reports what an exact
+city match gets wrong compared to a true radius: workers just across a
+province border (Gebze/Tuzla, Darıca/Pendik) are missed, and far corners of a
+large province are included. Pass --mongo to seed a scratch collection in the
+database from .env and time both queries with their indexes. Run from the
+backend directory:
+
+    python benchmarks/bench_geo.py [--workers 200000] [--radius 30] [--mongo]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import geo  # noqa: E402
+
+# (city, district) the queries are centred on
+CENTRES = [("Kocaeli", "Gebze"), ("İstanbul", "Tuzla"), ("Bursa", "Nilüfer"), ("İzmir", "Bornova")]
+JITTER_DEGREES = 0.05
+SCRATCH_COLLECTION = "bench_geo_workers"
+
+
+def make_workers(count: int) -> list:
+    rng = random.Random(42)
+    cities, districts = geo._centroids()
+    places = [(city, district, point) for (city, district), point in districts.items()]
+    workers = []
+    for i in range(count):
+        city, district, (lon, lat) = rng.choice(places)
+        lon += rng.uniform(-JITTER_DEGREES, JITTER_DEGREES)
+        lat += rng.uniform(-JITTER_DEGREES, JITTER_DEGREES)
+        workers.append({"user_id": f"w{i}", "city": city, "district": district, "location": geo.point(lon, lat)})
+    return workers
+
+
+def timed(func, repeat: int = 20) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+async def atimed(func, repeat: int = 10) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def compare_in_process(workers: list, radius_km: float) -> None:
+    for city, district in CENTRES:
+        centre = geo.locate(city, district)[0]
+        folded = geo.fold(city)
+        by_city = {w["user_id"] for w in workers if geo.fold(w["city"]) == folded}
+        nearby = {
+            w["user_id"] for w in workers
+            if geo.distance_km(centre, tuple(w["location"]["coordinates"])) <= radius_km
+        }
+        scan_s = timed(lambda: [
+            w for w in workers if geo.distance_km(centre, tuple(w["location"]["coordinates"])) <= radius_km
+        ], 2)
+        print(f"  {district + ', ' + city:<20} within {radius_km:g} km {len(nearby):7d}   same city {len(by_city):7d}   "
+              f"missed by city {len(nearby - by_city):7d}   farther than {radius_km:g} km {len(by_city - nearby):7d}   "
+              f"(haversine scan {scan_s * 1e3:.0f} ms)")
+
+
+async def compare_mongo(workers: list, radius_km: float) -> None:
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).resolve().parent.parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    collection = client[os.environ['DB_NAME']][SCRATCH_COLLECTION]
+    try:
+        await collection.drop()
+        for start in range(0, len(workers), 10_000):
+            await collection.insert_many([dict(w) for w in workers[start:start + 10_000]], ordered=False)
+        await collection.create_index("city")
+        await collection.create_index([("location", "2dsphere")])
+
+        for city, district in CENTRES:
+            centre = geo.locate(city, district)[0]
+            pipeline = [geo.near_stage(centre, radius_km), {"$limit": 50}, {"$project": {"_id": 0, "user_id": 1}}]
+            city_s = await atimed(lambda: collection.find({"city": city}, {"_id": 0, "user_id": 1}).limit(50).to_list(50))
+            near_s = await atimed(lambda: collection.aggregate(pipeline).to_list(50))
+            count_s = await atimed(lambda: collection.count_documents({"location": {"$geoWithin": {
+                "$centerSphere": [list(centre), radius_km / geo.EARTH_RADIUS_KM]}}}), 3)
+            print(f"  {district + ', ' + city:<20} city match {city_s * 1e3:7.2f} ms   $geoNear top 50 "
+                  f"{near_s * 1e3:7.2f} ms   count within {radius_km:g} km {count_s * 1e3:7.2f} ms")
+    finally:
+        await collection.drop()
+        client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=200_000)
+    parser.add_argument("--radius", type=float, default=30.0)
+    parser.add_argument("--mongo", action="store_true")
+    args = parser.parse_args()
+
+    workers = make_workers(args.workers)
+    print(f"{len(workers)} workers around {len(geo._centroids()[1])} district centroids")
+    compare_in_process(workers, args.radius)
+    if args.mongo:
+        asyncio.run(compare_mongo(workers, args.radius))
+
+
+if __name__ == "__main__":
+    main()
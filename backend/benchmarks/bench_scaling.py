@@ -0,0 +1,116 @@
+"""Throughput of serve.py from 1 to N worker processes.
+
+For each worker count, the benchmark starts serve.py on a free local port
+against the database in .env. It waits for /api/health/ready, then drives
+each path with keep-alive HTTP clients in separate processes for --duration
+seconds, and reports requests per second with the speedup over one worker.
+The load generator shares the machine with the server, so the curve flattens
+before the core count. Keep --max-workers below the core count to leave
+cores free for it.
+
+    python benchmarks/bench_scaling.py [--max-workers 8] [--duration 10]
+"""
+import argparse
+import http.client
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+PATHS = [
+    # CPU in the worker: in-memory search plus serialization
+    "/api/search?q=kaynak&limit=20",
+    # Mongo round trip plus serialization
+    "/api/jobs?limit=20",
+]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(port: int, timeout: float = 120.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/api/health/ready")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"server on port {port} did not become ready")
+
+
+def client(port: int, path: str, duration: float, counter) -> None:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    done = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        conn.request("GET", path)
+        response = conn.getresponse()
+        response.read()
+        if response.status == 200:
+            done += 1
+    with counter.get_lock():
+        counter.value += done
+
+
+def throughput(port: int, path: str, clients: int, duration: float) -> float:
+    counter = multiprocessing.Value("l", 0)
+    procs = [multiprocessing.Process(target=client, args=(port, path, duration, counter)) for _ in range(clients)]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join()
+    return counter.value / duration
+
+
+def worker_counts(max_workers: int) -> List[int]:
+    counts, n = [], 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    return counts + [max_workers]
+
+
+def main() -> None:
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-workers", type=int, default=cpus)
+    parser.add_argument("--clients", type=int, default=2 * cpus)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    baseline = {}
+    for workers in worker_counts(args.max_workers):
+        port = free_port()
+        server = subprocess.Popen(
+            [sys.executable, "serve.py", "--workers", str(workers), "--port", str(port),
+             "--host", "127.0.0.1", "--log-level", "warning"],
+            cwd=BACKEND_DIR,
+        )
+        try:
+            wait_ready(port)
+            for path in PATHS:
+                # Short warm-up so every worker has its connections open
+                throughput(port, path, args.clients, 1.0)
+                rps = throughput(port, path, args.clients, args.duration)
+                baseline.setdefault(path, rps)
+                print(f"  {workers:3d} workers  {path:<32} {rps:10.0f} req/s   x{rps / baseline[path]:5.2f}")
+        finally:
+            server.send_signal(signal.SIGINT)
+            server.wait(timeout=60)
+
+
+if __name__ == "__main__":
+    main()
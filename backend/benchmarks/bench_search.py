@@ -0,0 +1,93 @@
+"""Search index vs regex scan benchmark.
+
+The regex baseline scans every document like a `$regex` query without a usable
+index does. By default it runs in-process, which is a lower bound for Mongo
+(no BSON decoding or network). Pass --mongo to also time real `$regex` queries
+against the jobs collection from .env. Run from the backend directory:
+
+    python benchmarks/bench_search.py [--docs 50000] [--mongo]
+"""
+import argparse
+import asyncio
+import os
+import random
+import re
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from search_index import SearchIndex  # noqa: E402
+
+TITLES = ["Kaynakçı", "CNC Torna Ustası", "Elektrikçi", "Boyacı", "Argon Kaynak Ustası",
+          "Paslanmaz Kaynakçı", "Freze Operatörü", "Sıhhi Tesisatçı", "İnşaat İşçisi", "Montaj Elemanı"]
+WORDS = ["günlük", "proje", "acil", "tecrübeli", "şantiye", "fabrika", "vardiya", "ölçü",
+         "hassas", "çelik", "alüminyum", "bakım", "onarım", "İstanbul", "Gebze", "Ümraniye"]
+QUERIES = ["kaynakci", "torna usta", "elektrik", "paslanmaz kay", "sihhi tesisat", "gebze vardiya"]
+
+
+def make_docs(count: int) -> list:
+    rng = random.Random(42)
+    return [{
+        "id": str(uuid.uuid4()),
+        "title": f"{rng.choice(TITLES)} Aranıyor",
+        "description": " ".join(rng.choice(WORDS) for _ in range(40)),
+    } for _ in range(count)]
+
+
+def timed(func, repeat: int = 20) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+async def mongo_regex(queries: list) -> None:
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).resolve().parent.parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    jobs = client[os.environ['DB_NAME']].jobs
+    for query in queries:
+        pattern = re.escape(query.split()[0])
+        start = time.perf_counter()
+        await jobs.find({"$or": [{"title": {"$regex": pattern, "$options": "i"}},
+                                 {"description": {"$regex": pattern, "$options": "i"}}]},
+                        {"_id": 0, "id": 1}).to_list(None)
+        print(f"  mongo $regex {query!r:<18} {(time.perf_counter() - start) * 1e3:9.2f} ms")
+    client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=50_000)
+    parser.add_argument("--mongo", action="store_true")
+    args = parser.parse_args()
+
+    docs = make_docs(args.docs)
+    index = SearchIndex()
+    start = time.perf_counter()
+    for doc in docs:
+        index.add("job", doc["id"], [(doc["title"], 3.0), (doc["description"], 1.0)], {"title": doc["title"]})
+    print(f"Indexed {len(docs)} jobs in {time.perf_counter() - start:.2f} s")
+
+    for query in QUERIES:
+        # A case-insensitive regex cannot fold ı/i or ş/s, so it gets the
+        # benefit of the doubt and only has to find the first token.
+        regex = re.compile(re.escape(query.split()[0]), re.IGNORECASE)
+        scan_s = timed(lambda: [d["id"] for d in docs if regex.search(d["title"]) or regex.search(d["description"])], 3)
+        index_s = timed(lambda: index.search(query, limit=20))
+        hits = len(index.search(query, limit=len(docs)))
+        print(f"  {query!r:<18} regex scan {scan_s * 1e3:9.2f} ms   index {index_s * 1e3:7.3f} ms   "
+              f"x{scan_s / index_s:7.1f}   ({hits} index hits)")
+
+    if args.mongo:
+        asyncio.run(mongo_regex(QUERIES))
+
+
+if __name__ == "__main__":
+    main()
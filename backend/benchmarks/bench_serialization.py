@@ -0,0 +1,127 @@
+"""Before/after benchmark for the orjson response path.
+
+Compares what FastAPI does for a plain handler return value (jsonable_encoder
+followed by stdlib json, plus a Pydantic round trip for detail routes) with
+the handlers' own path: the defaults merge for profiles, then fast_json. The
+fixtures hold what Motor returns, so dates are datetime objects, not strings.
+Run from the backend directory:
+
+    python benchmarks/bench_serialization.py
+"""
+import json
+import sys
+import timeit
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from fastapi.encoders import jsonable_encoder
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from server import (  # noqa: E402
+    EMPLOYER_DETAILS_DEFAULTS,
+    WORKER_DETAILS_DEFAULTS,
+    EmployerDetails,
+    WorkerDetails,
+    fast_json,
+)
+
+LIST_FIELDS = "id,title,job_status,start_date,budget_info,created_at"
+
+
+def make_jobs(count: int) -> list:
+    now = datetime.now(timezone.utc)
+    return [{
+        "id": str(uuid.uuid4()),
+        "employer_id": str(uuid.uuid4()),
+        "title": f"CNC Torna Ustası Aranıyor #{i}",
+        "description": "Fanuc kontrollü CNC torna tezgahında seri üretim. " * 20,
+        "required_skills": [str(uuid.uuid4()) for _ in range(3)],
+        "start_date": now + timedelta(days=3),
+        "end_date": now + timedelta(days=30),
+        "budget_info": "Günlük 1500 TL",
+        "job_status": "open",
+        "created_at": now,
+        "expires_at": now + timedelta(days=30),
+        "view_count": i,
+        "location": {"type": "Point", "coordinates": [29.43, 40.80]},
+        "location_precision": "district",
+    } for i in range(count)]
+
+
+def make_worker() -> dict:
+    # A profile written before the newer fields existed, as the defaults merge sees it
+    return {
+        "user_id": str(uuid.uuid4()),
+        "first_name": "Mehmet",
+        "last_name": "Yılmaz",
+        "birth_year": 1985,
+        "city": "İstanbul",
+        "district": "Ümraniye",
+        "is_anonymous": False,
+        "certificate_status": "verified",
+        "ghosting_count": 0,
+        "rejected_job_count": 1,
+        "total_jobs_completed": 42,
+        "average_rating": 4.7,
+        "location": {"type": "Point", "coordinates": [29.11, 41.02]},
+    }
+
+
+def make_employer() -> dict:
+    return {
+        "user_id": str(uuid.uuid4()),
+        "company_name": "ABC Makina San. Ltd.",
+        "tax_number": "1234567890",
+        "sector": "Metal İşleme",
+        "city": "Kocaeli",
+        "district": "Gebze",
+        "address": "Organize Sanayi Bölgesi 5. Cadde No:42",
+        "payment_reliability_score": 4.7,
+        "cancellation_count": 1,
+        "total_jobs_posted": 34,
+        "average_rating": 4.3,
+        "location": {"type": "Point", "coordinates": [29.43, 40.80]},
+        "location_precision": "district",
+    }
+
+
+def stdlib_render(content) -> bytes:
+    # Mirrors starlette.responses.JSONResponse.render
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def report(name: str, before, after, number: int) -> None:
+    before_s = min(timeit.repeat(before, number=number, repeat=5)) / number
+    after_s = min(timeit.repeat(after, number=number, repeat=5)) / number
+    print(f"{name:<34} before {before_s * 1e6:10.1f} µs   after {after_s * 1e6:10.1f} µs   "
+          f"x{before_s / after_s:5.1f}")
+
+
+def main() -> None:
+    jobs = make_jobs(50)
+    projected = [{k: job[k] for k in LIST_FIELDS.split(",")} for job in jobs]
+    worker = make_worker()
+    employer = make_employer()
+
+    report("GET /api/jobs (50 rows)",
+           lambda: stdlib_render(jsonable_encoder(jobs)),
+           lambda: fast_json(jobs).body, number=200)
+    report("GET /api/jobs?fields=... (50 rows)",
+           lambda: stdlib_render(jsonable_encoder(jobs)),
+           lambda: fast_json(projected).body, number=200)
+    report("GET /api/workers/{id}",
+           lambda: stdlib_render(jsonable_encoder(WorkerDetails(**worker))),
+           lambda: fast_json({**WORKER_DETAILS_DEFAULTS, **worker}).body, number=5000)
+    report("GET /api/employers/{id}",
+           lambda: stdlib_render(jsonable_encoder(EmployerDetails(**employer))),
+           lambda: fast_json({**EMPLOYER_DETAILS_DEFAULTS, **employer}).body, number=5000)
+
+    print(f"\nPayload size, 50 jobs: {len(fast_json(jobs).body)} bytes full, "
+          f"{len(fast_json(projected).body)} bytes with fields={LIST_FIELDS}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""In-memory estimate of the worker pool for a set of skills and a location.
+
+Every worker gets a slot number, and each skill category, city and district
+keeps a bitset of the slots that belong to it. Python ints are used as the
+bitsets: CPython stores them as arrays of 30-bit digits, and `&`, `|` and
+`int.bit_count()` run over those arrays in C. A count is a few ANDs and a
+popcount, independent of how many worker_skills documents there are.
+
+A worker with a detailed skill also counts for its ancestors, so a job asking
+for "CNC Torna" finds workers who listed "2 Eksen CNC Torna".
+
+Memory budget for 1M workers: a bitset costs at most one bit per slot, so
+~125 KB once the highest slot is near 1M. With ~200 skill categories, 81
+provinces and ~970 districts that is at most ~155 MB of bitsets, usually
+far less because most districts only have low slots. Per-worker bookkeeping
+(worker id -> slot, slot -> category and location indices, needed to clear
+bits on update) adds roughly 200 bytes per worker, so ~200 MB. Freed slots
+are reused, so the bitsets do not grow with churn.
+
+Updates are O(bitset size) because ints are immutable: setting one bit
+copies the bitset (~10 µs at 1M workers). The initial load builds every
+bitset from a bytearray in one pass instead.
+"""
+import logging
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from search_index import fold
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=4096)
+def _location_keys(city: Optional[str], district: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    city_key = fold(city).strip() if city else None
+    district_key = f"{city_key}/{fold(district).strip()}" if city_key and district else None
+    return city_key, district_key
+
+
+@lru_cache(maxsize=4096)
+def _location_bitset_keys(city: Optional[str], district: Optional[str]) -> Tuple[str, ...]:
+    return tuple(f"loc:{key}" for key in _location_keys(city, district) if key)
+
+
+def _bitset(slots: List[int], size: int) -> int:
+    data = bytearray(size // 8 + 1)
+    for slot in slots:
+        data[slot >> 3] |= 1 << (slot & 7)
+    return int.from_bytes(data, "little")
+
+
+class CandidatePool:
+    def __init__(self):
+        self._reset()
+
+    def _reset(self) -> None:
+        self._slots: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._size = 0
+        self._all = 0
+        self._parents: Dict[str, Optional[str]] = {}
+        self._bits: Dict[str, int] = {}
+        # Per slot: the keys whose bitsets have that slot set
+        self._slot_skills: List[Tuple[str, ...]] = []
+        self._slot_location: List[Tuple[str, ...]] = []
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _expand(self, category_ids: Iterable[str]) -> Tuple[str, ...]:
+        """Categories plus all their ancestors, as bitset keys"""
+        keys = set()
+        for category_id in category_ids:
+            seen = 0
+            while category_id is not None and seen < 16:
+                keys.add(f"skill:{category_id}")
+                category_id = self._parents.get(category_id)
+                seen += 1
+        return tuple(keys)
+
+    def _slot(self, worker_id: str, loading: bool = False) -> int:
+        slot = self._slots.get(worker_id)
+        if slot is None:
+            if self._free:
+                slot = self._free.pop()
+            else:
+                slot = self._size
+                self._size += 1
+                self._slot_skills.append(())
+                self._slot_location.append(())
+            self._slots[worker_id] = slot
+            if not loading:
+                self._all |= 1 << slot
+        return slot
+
+    def _move(self, slot: int, old: Tuple[str, ...], new: Tuple[str, ...]) -> None:
+        bit = 1 << slot
+        for key in set(old) - set(new):
+            self._bits[key] ^= bit
+        for key in set(new) - set(old):
+            self._bits[key] = self._bits.get(key, 0) | bit
+
+    def load(self, categories: Dict[str, dict], workers: Iterable[dict], skills: Iterable[dict]) -> None:
+        """Rebuild from worker_details and worker_skills documents"""
+        loader = PoolLoader(categories)
+        for worker in workers:
+            loader.add_worker(worker)
+        for skill in skills:
+            loader.add_skill(skill)
+        vars(self).update(vars(loader.finish()))
+
+    def set_location(self, worker_id: str, city: Optional[str], district: Optional[str]) -> None:
+        slot = self._slot(worker_id)
+        location = _location_bitset_keys(city, district)
+        self._move(slot, self._slot_location[slot], location)
+        self._slot_location[slot] = location
+
+    def set_skills(self, worker_id: str, category_ids: Iterable[str]) -> None:
+        slot = self._slot(worker_id)
+        keys = self._expand(category_ids)
+        self._move(slot, self._slot_skills[slot], keys)
+        self._slot_skills[slot] = keys
+
+    def add_skill(self, worker_id: str, category_id: str) -> None:
+        slot = self._slot(worker_id)
+        keys = tuple(set(self._slot_skills[slot]) | set(self._expand([category_id])))
+        self._move(slot, self._slot_skills[slot], keys)
+        self._slot_skills[slot] = keys
+
+    def remove_worker(self, worker_id: str) -> None:
+        slot = self._slots.pop(worker_id, None)
+        if slot is None:
+            return
+        self._move(slot, self._slot_skills[slot] + self._slot_location[slot], ())
+        self._slot_skills[slot] = ()
+        self._slot_location[slot] = ()
+        self._all ^= 1 << slot
+        self._free.append(slot)
+
+    def count(self, category_ids: Iterable[str], city: Optional[str] = None, district: Optional[str] = None) -> dict:
+        """Workers with all / any of the categories, optionally within a city or district"""
+        city_key, district_key = _location_keys(city, district)
+        scope = self._all
+        if district_key:
+            scope &= self._bits.get(f"loc:{district_key}", 0)
+        elif city_key:
+            scope &= self._bits.get(f"loc:{city_key}", 0)
+
+        category_ids = list(dict.fromkeys(category_ids))
+        all_skills = any_skill = 0
+        if category_ids:
+            all_skills, any_skill = scope, 0
+            for category_id in category_ids:
+                bits = self._bits.get(f"skill:{category_id}", 0)
+                all_skills &= bits
+                any_skill |= bits
+            any_skill &= scope
+        return {
+            "all_skills": all_skills.bit_count(),
+            "any_skill": any_skill.bit_count(),
+            "in_location": scope.bit_count(),
+        }
+
+
+class PoolLoader:
+    """Builds a fresh CandidatePool from documents streamed off a cursor.
+
+    Only slot numbers are kept per document, so the worker_details and
+    worker_skills documents never need to be in memory at once. The pool
+    being served stays untouched until finish() hands over the new one.
+    """
+
+    def __init__(self, categories: Dict[str, dict]):
+        self.pool = CandidatePool()
+        self.pool._parents = {cat_id: cat.get("parent_id") for cat_id, cat in categories.items()}
+        self._members: Dict[str, List[int]] = {}
+        self._slot_skills: Dict[int, set] = {}
+
+    def add_worker(self, worker: dict) -> None:
+        pool = self.pool
+        slot = pool._slot(worker["user_id"], loading=True)
+        location = _location_bitset_keys(worker.get("city"), worker.get("district"))
+        pool._slot_location[slot] = location
+        for key in location:
+            self._members.setdefault(key, []).append(slot)
+
+    def add_skill(self, skill: dict) -> None:
+        slot = self.pool._slot(skill["worker_id"], loading=True)
+        self._slot_skills.setdefault(slot, set()).add(skill["skill_category_id"])
+
+    def finish(self) -> CandidatePool:
+        pool, members = self.pool, self._members
+        # Most workers share one of a few skill combinations
+        expanded: Dict[frozenset, Tuple[str, ...]] = {}
+        for slot, category_ids in self._slot_skills.items():
+            category_ids = frozenset(category_ids)
+            keys = expanded.get(category_ids)
+            if keys is None:
+                keys = expanded[category_ids] = pool._expand(category_ids)
+            pool._slot_skills[slot] = keys
+            for key in keys:
+                members.setdefault(key, []).append(slot)
+
+        pool._bits = {key: _bitset(slots, pool._size) for key, slots in members.items()}
+        pool._all = (1 << pool._size) - 1
+        logger.info("Candidate pool loaded with %d workers and %d bitsets", len(pool._slots), len(pool._bits))
+        return pool
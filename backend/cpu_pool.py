@@ -0,0 +1,68 @@
+"""Executors for CPU-bound work.
+
+bcrypt gets a small dedicated thread pool. The extension releases the GIL,
+so a few threads hash in parallel. Each hash still keeps a core busy for
+hundreds of milliseconds, though. asyncio's default executor allows
+cpu_count + 4 threads, so a login burst hitting every worker process at once
+would oversubscribe the machine. BCRYPT_THREADS caps the pool per process
+(one thread per core by default; serve.py splits that between workers).
+
+Other CPU-heavy calls (currently upload hashing) go to a process pool of
+CPU_PROCESSES children (one by default, serve.py gives each worker its share
+of the cores), so they never hold the worker's GIL. Those functions must
+be module-level and take picklable arguments, and they should live in
+lightweight modules because the spawned children import them. Each child
+costs the memory of those imports. With CPU_PROCESSES=0 they run on the
+default thread executor.
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+
+def _noop() -> None:
+    return None
+
+
+class CpuPool:
+    def __init__(self, bcrypt_threads: int, processes: int = 0):
+        self.bcrypt_threads = max(1, bcrypt_threads)
+        self.processes = max(0, processes)
+        self._bcrypt: Optional[Executor] = None
+        self._processes: Optional[Executor] = None
+
+    def start(self) -> None:
+        """Create the executors inside the serving process, never at import"""
+        self._bcrypt = ThreadPoolExecutor(max_workers=self.bcrypt_threads, thread_name_prefix="bcrypt")
+        if self.processes:
+            # spawn, not fork: forking a process that already runs an event loop
+            # and Mongo monitor threads copies their locks in whatever state they are in
+            self._processes = ProcessPoolExecutor(self.processes, mp_context=multiprocessing.get_context("spawn"))
+
+    async def warm_up(self) -> None:
+        """Start the child processes now instead of on the first upload"""
+        if self._processes is not None:
+            await asyncio.gather(*(self.run(_noop) for _ in range(self.processes)))
+
+    async def shutdown(self) -> None:
+        executors = [e for e in (self._bcrypt, self._processes) if e is not None]
+        self._bcrypt = self._processes = None
+        # Waiting for running hashes and child processes blocks, so keep it off the event loop
+        for executor in executors:
+            await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+
+    async def bcrypt(self, func: Callable[..., Any], *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._bcrypt, func, *args)
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run func in the process pool, or a thread when there is none"""
+        return await asyncio.get_running_loop().run_in_executor(self._processes, func, *args)
+
+
+def from_env() -> CpuPool:
+    return CpuPool(
+        bcrypt_threads=int(os.environ.get('BCRYPT_THREADS', str(os.cpu_count() or 1))),
+        processes=int(os.environ.get('CPU_PROCESSES', '1')),
+    )
@@ -0,0 +1,83 @@
+"""Weak ETags for list endpoints, derived from version counters.
+
+Every write that changes what a cached read returns bumps a counter in the
+`collection_versions` collection (one document per key, e.g. "jobs" or
+"notifications:<user_id>"). A GET hashes the counters it depends on together
+with its path and query string; if the client's If-None-Match matches, the
+route answers 304 before running its query or serializing anything.
+
+Results that also change with the clock (e.g. only jobs not yet expired)
+pass a `salt` that changes when they do, such as the next expiry time.
+
+Bump after the write, never before: the ETag is read before the data, so a
+concurrent write can only make a response newer than its tag, which the next
+request corrects.
+"""
+import hashlib
+from typing import Dict, Iterable, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+from pymongo import UpdateOne
+
+CACHE_CONTROL = "no-cache"
+
+
+class NotModified(Exception):
+    def __init__(self, etag: str):
+        self.etag = etag
+
+
+async def bump(db, *keys: str) -> None:
+    if not keys:
+        return
+    await db.collection_versions.bulk_write(
+        [UpdateOne({"_id": key}, {"$inc": {"v": 1}}, upsert=True) for key in dict.fromkeys(keys)],
+        ordered=False,
+    )
+
+
+async def read_versions(db, keys: Iterable[str]) -> Dict[str, int]:
+    docs = await db.collection_versions.find({"_id": {"$in": list(keys)}}).to_list(None)
+    return {doc["_id"]: doc["v"] for doc in docs}
+
+
+async def current_etag(
+    db, request: Request, keys: Iterable[str], salt: str = "", versions: Optional[Dict[str, int]] = None
+) -> str:
+    """versions pins keys to known values, e.g. the ones a cache was loaded at"""
+    keys = sorted(set(keys))
+    known = versions or {}
+    missing = [key for key in keys if key not in known]
+    versions = {**(await read_versions(db, missing) if missing else {}), **known}
+    stamp = hashlib.sha1(request.url.path.encode())
+    stamp.update(b"?" + request.url.query.encode())
+    for key in keys:
+        stamp.update(f"|{key}={versions.get(key, 0)}".encode())
+    if salt:
+        stamp.update(f"|salt={salt}".encode())
+    return f'W/"{stamp.hexdigest()[:20]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison, as If-None-Match requires"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+async def check(
+    db, request: Request, *keys: str, salt: str = "", versions: Optional[Dict[str, int]] = None
+) -> dict:
+    """Headers for the response, or NotModified if the client copy is current"""
+    etag = await current_etag(db, request, keys, salt, versions)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        raise NotModified(etag)
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+
+async def not_modified_handler(request: Request, exc: NotModified) -> Response:
+    return Response(status_code=304, headers={"ETag": exc.etag, "Cache-Control": CACHE_CONTROL})
@@ -0,0 +1,182 @@
+"""Offline geocoding of Turkish city/district names and nearby queries.
+
+Profiles only carry free-text `city` and `district`, so they are mapped to
+a point through the bundled centroid table in data/tr_centroids.csv: every
+province plus the districts where most of the listings are. A district that
+is not in the table falls back to its province centroid, and
+`location_precision` records which of the two was used. Names are matched
+after search_index.fold, so "GEBZE", "Gebze" and "gebze" are the same key.
+
+Points are stored as GeoJSON under `location` on worker_details,
+employer_details and jobs (copied from the employer, see job_cards.py) and
+queried through a 2dsphere index with $geoNear, which returns results
+nearest first with their distance.
+
+    python geo.py    # backfill locations on every profile and job
+"""
+import asyncio
+import csv
+import logging
+import math
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from pymongo import UpdateOne
+
+import etags
+import job_cards
+from search_index import fold
+
+logger = logging.getLogger(__name__)
+
+CENTROIDS_PATH = Path(__file__).parent / "data" / "tr_centroids.csv"
+EARTH_RADIUS_KM = 6371.0088
+DEFAULT_RADIUS_KM = 50.0
+MAX_RADIUS_KM = 500.0
+
+CITY = "city"
+DISTRICT = "district"
+
+# (longitude, latitude), the GeoJSON order
+LonLat = Tuple[float, float]
+
+
+@lru_cache(maxsize=1)
+def _centroids() -> Tuple[Dict[str, LonLat], Dict[Tuple[str, str], LonLat]]:
+    cities: Dict[str, LonLat] = {}
+    districts: Dict[Tuple[str, str], LonLat] = {}
+    with open(CENTROIDS_PATH, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            point = (float(row["lon"]), float(row["lat"]))
+            if row["district"]:
+                districts[(fold(row["city"]), fold(row["district"]))] = point
+            else:
+                cities[fold(row["city"])] = point
+    return cities, districts
+
+
+@lru_cache(maxsize=4096)
+def locate(city: Optional[str], district: Optional[str] = None) -> Optional[Tuple[LonLat, str]]:
+    """The centroid for a city/district pair and its precision, None if the city is unknown"""
+    if not city:
+        return None
+    cities, districts = _centroids()
+    city_key = fold(city.strip())
+    if district:
+        point = districts.get((city_key, fold(district.strip())))
+        if point is not None:
+            return point, DISTRICT
+    point = cities.get(city_key)
+    return (point, CITY) if point is not None else None
+
+
+def point(lon: float, lat: float) -> dict:
+    return {"type": "Point", "coordinates": [lon, lat]}
+
+
+def location_fields(city: Optional[str], district: Optional[str]) -> dict:
+    """`location` and `location_precision` for a profile, empty when it cannot be placed"""
+    found = locate(city, district)
+    if found is None:
+        return {}
+    (lon, lat), precision = found
+    return {"location": point(lon, lat), "location_precision": precision}
+
+
+def resolve_near(
+    lat: Optional[float], lon: Optional[float], city: Optional[str], district: Optional[str]
+) -> Optional[LonLat]:
+    """The point a nearby query is centred on; raises ValueError for unusable input"""
+    if lat is not None or lon is not None:
+        if lat is None or lon is None:
+            raise ValueError("lat and lon must be given together")
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            raise ValueError("lat/lon out of range")
+        return lon, lat
+    if city:
+        found = locate(city, district)
+        if found is None:
+            raise ValueError(f"unknown location {city!r}")
+        return found[0]
+    return None
+
+
+def near_stage(center: LonLat, radius_km: float, query: Optional[dict] = None) -> dict:
+    """$geoNear over `location`; must be the first stage of the pipeline"""
+    return {"$geoNear": {
+        "near": point(*center),
+        "key": "location",
+        "distanceField": "distance_km",
+        "distanceMultiplier": 0.001,
+        "maxDistance": min(radius_km, MAX_RADIUS_KM) * 1000,
+        "query": query or {},
+        "spherical": True,
+    }}
+
+
+def distance_km(a: LonLat, b: LonLat) -> float:
+    """Great-circle (haversine) distance"""
+    lon1, lat1, lon2, lat2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(h))
+
+
+async def ensure_indexes(db) -> None:
+    await asyncio.gather(
+        db.worker_details.create_index([("location", "2dsphere")]),
+        db.employer_details.create_index([("location", "2dsphere")]),
+        db.jobs.create_index([("location", "2dsphere")]),
+    )
+
+
+async def _backfill_profiles(collection) -> Dict[str, int]:
+    counts = {"placed": 0, "unknown": 0}
+    ops = []
+    async for doc in collection.find({}, {"_id": 1, "city": 1, "district": 1}).batch_size(1000):
+        fields = location_fields(doc.get("city"), doc.get("district"))
+        if fields:
+            counts["placed"] += 1
+            ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": fields}))
+        else:
+            counts["unknown"] += 1
+            ops.append(UpdateOne({"_id": doc["_id"]}, {"$unset": {"location": "", "location_precision": ""}}))
+        if len(ops) >= 1000:
+            await collection.bulk_write(ops, ordered=False)
+            ops = []
+    if ops:
+        await collection.bulk_write(ops, ordered=False)
+    return counts
+
+
+async def backfill(db) -> dict:
+    """Geocode every worker and employer profile, then copy employer locations onto jobs"""
+    result = {
+        "worker_details": await _backfill_profiles(db.worker_details),
+        "employer_details": await _backfill_profiles(db.employer_details),
+    }
+    await etags.bump(db, "worker_details")
+    await etags.bump(db, "employer_details")
+    result["jobs_updated"] = await job_cards.refresh_employer_summaries(db)
+    logger.info("Location backfill finished: %s", result)
+    return result
+
+
+async def main() -> None:
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    try:
+        db = client[os.environ['DB_NAME']]
+        await ensure_indexes(db)
+        print(await backfill(db))
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,298 @@
+"""Idempotency-Key support for retried POST requests.
+
+The first request carrying a given key runs normally and its response is
+stored in the TTL-indexed `idempotency_keys` collection and a small in-memory
+cache. Retries with the same key get the stored response replayed without
+reaching the handler. A retry that arrives while the first attempt is still
+running waits for it, whether it runs in this process (shared future) or in
+another worker (polling the collection), instead of racing it.
+
+The claim on a key is a lease: the owner extends `lease_until` while the
+handler runs, and a waiter takes the key over once the lease has lapsed, so
+a worker that dies mid-request does not block the key until the TTL.
+
+Reusing a key with a different request body is rejected with 422. Bodies up
+to MAX_BUFFERED_BYTES are read and hashed before the handler runs. Multipart
+uploads and larger bodies are hashed as the handler streams them, and a
+retry of one is hashed while it is drained, so they are never held in memory.
+
+Only successes and validation errors (400, 422) are stored, since retrying
+those cannot change the answer. Anything else (rate limited, auth failures,
+conflicts, 5xx) releases the key, so a later retry runs for real.
+"""
+import asyncio
+import hashlib
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, Optional
+
+import orjson
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+HEADER = b"idempotency-key"
+IN_PROGRESS = "in_progress"
+COMPLETED = "completed"
+# Larger bodies are hashed while streamed instead of buffered
+MAX_BUFFERED_BYTES = 1024 * 1024
+STORED_CLIENT_ERRORS = {400, 422}
+
+
+def should_store(status_code: int) -> bool:
+    return 200 <= status_code < 300 or status_code in STORED_CLIENT_ERRORS
+
+
+def should_buffer(headers: dict) -> bool:
+    if headers.get(b"content-type", b"").lower().startswith(b"multipart/"):
+        return False
+    try:
+        return int(headers.get(b"content-length", b"0")) <= MAX_BUFFERED_BYTES
+    except ValueError:
+        return False
+
+
+async def ensure_indexes(db, ttl_seconds: int) -> None:
+    await db.idempotency_keys.create_index("created_at", expireAfterSeconds=ttl_seconds)
+
+
+def _json_response(status: int, detail: str) -> dict:
+    return {
+        "status_code": status,
+        "headers": [["content-type", "application/json"]],
+        "body": orjson.dumps({"detail": detail}),
+    }
+
+
+class RequestBody:
+    """Hashes the request body on its way to the handler, buffered or streamed"""
+
+    def __init__(self, receive):
+        self._receive = receive
+        self._buffered = []
+        self._hash = hashlib.sha256()
+        self.complete = False
+
+    async def _next(self) -> dict:
+        message = await self._receive()
+        if message["type"] == "http.request":
+            self._hash.update(message.get("body", b""))
+            self.complete = not message.get("more_body")
+        return message
+
+    async def buffer(self) -> None:
+        while not self.complete:
+            message = await self._next()
+            self._buffered.append(message)
+            if message["type"] != "http.request":
+                break
+
+    async def receive(self) -> dict:
+        if self._buffered:
+            return self._buffered.pop(0)
+        return await self._next()
+
+    async def fingerprint(self) -> Optional[str]:
+        """Hash of the whole body, reading (and dropping) whatever the handler left"""
+        while not self.complete:
+            if (await self._next())["type"] != "http.request":
+                return None
+        return self._hash.hexdigest()
+
+
+class IdempotencyMiddleware:
+    def __init__(
+        self,
+        app,
+        get_db: Callable,
+        paths: Iterable[str],
+        ttl_seconds: int = 24 * 3600,
+        cache_size: int = 10_000,
+        wait_timeout: float = 30.0,
+        lease_seconds: float = 15.0,
+    ):
+        self.app = app
+        self.get_db = get_db
+        self.paths = set(paths)
+        self.ttl_seconds = ttl_seconds
+        self.cache_size = cache_size
+        self.wait_timeout = wait_timeout
+        self.lease_seconds = lease_seconds
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        idempotency_key = headers.get(HEADER)
+        if not idempotency_key:
+            return await self.app(scope, receive, send)
+
+        request_body = RequestBody(receive)
+        if should_buffer(headers):
+            await request_body.buffer()
+
+        key = hashlib.sha256(b"\0".join([
+            scope["path"].encode(), scope.get("query_string", b""), idempotency_key,
+        ])).hexdigest()
+        owner = uuid.uuid4().hex
+
+        stored = await self._lookup(key, owner)
+        if stored is not None:
+            return await self._replay(send, self._check(stored, await request_body.fingerprint()))
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        heartbeat = asyncio.create_task(self._heartbeat(key, owner))
+        response = {"status_code": 500, "headers": [], "body": b""}
+        body_parts = []
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                response["status_code"] = message["status"]
+                response["headers"] = [
+                    [k.decode("latin-1"), v.decode("latin-1")]
+                    for k, v in message.get("headers", [])
+                    if k.lower() != b"content-length"
+                ]
+            elif message["type"] == "http.response.body":
+                body_parts.append(message.get("body", b""))
+            await send(message)
+
+        doc = None
+        try:
+            await self.app(scope, request_body.receive, capture_send)
+            response["body"] = b"".join(body_parts)
+            doc = await self._finish(key, owner, await request_body.fingerprint(), response)
+        finally:
+            # Waiters are resolved on every path; None (the handler raised or
+            # was cancelled) sends them back to claim the key themselves
+            heartbeat.cancel()
+            self._in_flight.pop(key, None)
+            if not future.done():
+                future.set_result(doc)
+            if doc is None:
+                await asyncio.shield(self._release(key, owner))
+
+    async def _lookup(self, key: str, owner: str) -> Optional[dict]:
+        """Stored response for the key, or None once this request owns it"""
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            self._cache.move_to_end(key)
+            return cached[1]
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            try:
+                stored = await asyncio.wait_for(asyncio.shield(in_flight), self.wait_timeout)
+            except asyncio.TimeoutError:
+                return _json_response(409, "Aynı istek hâlâ işleniyor")
+            if stored is None:
+                return await self._lookup(key, owner)
+            return stored
+
+        db = self.get_db()
+        now = datetime.now(timezone.utc)
+        try:
+            await db.idempotency_keys.insert_one({
+                "_id": key,
+                "status": IN_PROGRESS,
+                "owner": owner,
+                "lease_until": now + timedelta(seconds=self.lease_seconds),
+                "created_at": now,
+            })
+            return None
+        except DuplicateKeyError:
+            pass
+
+        # Another worker owns the key; wait for it to store a response
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            doc = await db.idempotency_keys.find_one({"_id": key})
+            if doc is None:
+                # The owner failed and released the key; run this one instead
+                return await self._lookup(key, owner)
+            if doc["status"] == COMPLETED:
+                self._remember(key, doc)
+                return doc
+            if await self._take_over(key, owner):
+                return None
+            await asyncio.sleep(0.1)
+        return _json_response(409, "Aynı istek hâlâ işleniyor")
+
+    async def _take_over(self, key: str, owner: str) -> bool:
+        """Claim a key whose owner stopped renewing its lease"""
+        now = datetime.now(timezone.utc)
+        taken = await self.get_db().idempotency_keys.find_one_and_update(
+            {"_id": key, "status": IN_PROGRESS, "lease_until": {"$lt": now}},
+            {"$set": {"owner": owner, "lease_until": now + timedelta(seconds=self.lease_seconds)}},
+        )
+        if taken is not None:
+            logger.warning("Took over idempotency key %s after its lease expired", key)
+        return taken is not None
+
+    async def _heartbeat(self, key: str, owner: str) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await self.get_db().idempotency_keys.update_one(
+                    {"_id": key, "owner": owner, "status": IN_PROGRESS},
+                    {"$set": {"lease_until": datetime.now(timezone.utc) + timedelta(seconds=self.lease_seconds)}},
+                )
+            except PyMongoError:
+                logger.exception("Could not extend the lease on %s", key)
+
+    async def _release(self, key: str, owner: str) -> None:
+        try:
+            await self.get_db().idempotency_keys.delete_one({"_id": key, "owner": owner, "status": IN_PROGRESS})
+        except Exception:
+            # The lease runs out on its own
+            logger.exception("Could not release idempotency key %s", key)
+
+    def _check(self, stored: dict, fingerprint: Optional[str]) -> dict:
+        if None not in (stored.get("fingerprint"), fingerprint) and stored["fingerprint"] != fingerprint:
+            return _json_response(422, "Idempotency-Key farklı bir istekle tekrar kullanıldı")
+        return stored
+
+    def _remember(self, key: str, doc: dict) -> None:
+        self._cache[key] = (time.monotonic() + self.ttl_seconds, doc)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def _finish(self, key: str, owner: str, fingerprint: Optional[str], response: dict) -> dict:
+        """Persist the response; concurrent duplicates are answered with the result"""
+        doc = {
+            "_id": key,
+            "status": COMPLETED,
+            "fingerprint": fingerprint,
+            "status_code": response["status_code"],
+            "headers": response["headers"],
+            "body": response["body"],
+            "created_at": datetime.now(timezone.utc),
+        }
+        db = self.get_db()
+        try:
+            if not should_store(response["status_code"]):
+                # Concurrent duplicates still get this answer, later retries run again
+                await db.idempotency_keys.delete_one({"_id": key, "owner": owner})
+                return {**doc, "status": IN_PROGRESS}
+            # A request whose lease was taken over leaves the record to the new owner
+            await db.idempotency_keys.replace_one({"_id": key, "owner": owner}, doc)
+            self._remember(key, doc)
+        except Exception:
+            logger.exception("Could not store idempotent response for %s", key)
+        return doc
+
+    async def _replay(self, send, stored: dict) -> None:
+        body = bytes(stored["body"])
+        headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in stored["headers"]]
+        headers.append((b"content-length", str(len(body)).encode()))
+        if stored.get("status") == COMPLETED:
+            headers.append((b"idempotent-replayed", b"true"))
+        await send({"type": "http.response.start", "status": stored["status_code"], "headers": headers})
+        await send({"type": "http.response.body", "body": body})
@@ -6,6 +6,10 @@ from datetime import datetime, timezone, timedelta
 import uuid
 from passlib.context import CryptContext
 
+import etags
+import geo
+import rating_summaries
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def hash_password(password: str) -> str:
@@ -267,7 +271,7 @@ async def init_data():
         "password_hash": hash_password("123456"),
         "role": "worker",
         "account_status": "active",
-        "created_at": datetime.now(timezone.utc).isoformat(),
+        "created_at": datetime.now(timezone.utc),
         "last_login": None
     })
     
@@ -295,7 +299,7 @@ async def init_data():
         "password_hash": hash_password("123456"),
         "role": "worker",
         "account_status": "active",
-        "created_at": datetime.now(timezone.utc).isoformat(),
+        "created_at": datetime.now(timezone.utc),
         "last_login": None
     })
     
@@ -323,7 +327,7 @@ async def init_data():
         "password_hash": hash_password("123456"),
         "role": "worker",
         "account_status": "active",
-        "created_at": datetime.now(timezone.utc).isoformat(),
+        "created_at": datetime.now(timezone.utc),
         "last_login": None
     })
     
@@ -351,7 +355,7 @@ async def init_data():
         "password_hash": hash_password("123456"),
         "role": "employer",
         "account_status": "active",
-        "created_at": datetime.now(timezone.utc).isoformat(),
+        "created_at": datetime.now(timezone.utc),
         "last_login": None
     })
     
@@ -377,7 +381,7 @@ async def init_data():
         "password_hash": hash_password("123456"),
         "role": "employer",
         "account_status": "active",
-        "created_at": datetime.now(timezone.utc).isoformat(),
+        "created_at": datetime.now(timezone.utc),
         "last_login": None
     })
     
@@ -412,12 +416,12 @@ async def init_data():
         "title": "Gazaltı Kaynakçısı Aranıyor",
         "description": "Paslanmaz çelik parçaların kaynağı için deneyimli gazaltı kaynakçısı aranmaktadır. Temiz ve güvenli çalışma ortamı.",
         "required_skills": [mig_kaynak["id"]] if mig_kaynak else [],
-        "start_date": (datetime.now(timezone.utc) + timedelta(days=2)).isoformat(),
-        "end_date": (datetime.now(timezone.utc) + timedelta(days=2, hours=8)).isoformat(),
+        "start_date": (datetime.now(timezone.utc) + timedelta(days=2)),
+        "end_date": (datetime.now(timezone.utc) + timedelta(days=2, hours=8)),
         "budget_info": "2.800 TL/gün",
         "job_status": "open",
-        "created_at": datetime.now(timezone.utc).isoformat(),
-        "expires_at": (datetime.now(timezone.utc) + timedelta(days=30)).isoformat(),
+        "created_at": datetime.now(timezone.utc),
+        "expires_at": (datetime.now(timezone.utc) + timedelta(days=30)),
         "view_count": 34
     })
     
@@ -429,12 +433,12 @@ async def init_data():
         "title": "CNC Torna Ustası - Acil",
         "description": "2 eksen CNC torna deneyimi olan usta aranıyor. Paslanmaz işleme deneyimi tercih sebebidir.",
         "required_skills": [cnc_2eksen["id"]] if cnc_2eksen else [],
-        "start_date": (datetime.now(timezone.utc) + timedelta(days=1)).isoformat(),
-        "end_date": (datetime.now(timezone.utc) + timedelta(days=1, hours=9)).isoformat(),
+        "start_date": (datetime.now(timezone.utc) + timedelta(days=1)),
+        "end_date": (datetime.now(timezone.utc) + timedelta(days=1, hours=9)),
         "budget_info": "3.200 TL/gün",
         "job_status": "open",
-        "created_at": datetime.now(timezone.utc).isoformat(),
-        "expires_at": (datetime.now(timezone.utc) + timedelta(days=30)).isoformat(),
+        "created_at": datetime.now(timezone.utc),
+        "expires_at": (datetime.now(timezone.utc) + timedelta(days=30)),
         "view_count": 52
     })
     
@@ -446,12 +450,12 @@ async def init_data():
         "title": "Makine Montaj Ustası",
         "description": "Hidrolik pres montajı için deneyimli montaj ustası aranmaktadır. 2 gün sürecek iş.",
         "required_skills": [],
-        "start_date": (datetime.now(timezone.utc) + timedelta(days=5)).isoformat(),
-        "end_date": (datetime.now(timezone.utc) + timedelta(days=7)).isoformat(),
+        "start_date": (datetime.now(timezone.utc) + timedelta(days=5)),
+        "end_date": (datetime.now(timezone.utc) + timedelta(days=7)),
         "budget_info": "3.000 TL/gün",
         "job_status": "open",
-        "created_at": datetime.now(timezone.utc).isoformat(),
-        "expires_at": (datetime.now(timezone.utc) + timedelta(days=30)).isoformat(),
+        "created_at": datetime.now(timezone.utc),
+        "expires_at": (datetime.now(timezone.utc) + timedelta(days=30)),
         "view_count": 21
     })
     
@@ -471,7 +475,7 @@ async def init_data():
         "on_time": True,
         "safety_compliance": 5,
         "professionalism": 5,
-        "created_at": (datetime.now(timezone.utc) - timedelta(days=10)).isoformat()
+        "created_at": (datetime.now(timezone.utc) - timedelta(days=10))
     })
     
     await db.ratings.insert_one({
@@ -484,11 +488,19 @@ async def init_data():
         "payment_made": True,
         "workplace_safety": 4,
         "communication_quality": 4,
-        "created_at": (datetime.now(timezone.utc) - timedelta(days=9)).isoformat()
+        "created_at": (datetime.now(timezone.utc) - timedelta(days=9))
     })
     
     print("2 örnek değerlendirme oluşturuldu")
     
+    # Place profiles on the map and copy employer cards and locations onto the jobs
+    await geo.backfill(db)
+    # The sample ratings were inserted directly, so build their summaries
+    await rating_summaries.backfill(db)
+    
+    # Cached list responses from before the reset must not validate
+    await etags.bump(db, "jobs", "worker_details", "employer_details", "skill_categories", "worker_skills")
+    
     print("\n✅ Veritabanı başlatma tamamlandı!")
     print("\nTest Kullanıcıları:")
     print("  Usta 1: mehmet_kaynakci / 123456")
@@ -0,0 +1,243 @@
+"""Invalidation bus for in-process caches and indexes.
+
+Tails a MongoDB change stream on the watched collections and hands each
+change to the consumers subscribed to that collection, so every uvicorn
+worker sees writes made by the others, by init_data.py or by hand. The
+resume token is saved in `change_stream_tokens`, so a reconnect or restart
+continues where the stream left off instead of missing changes.
+
+Any other failure (network, cursor, a bug in the loop itself) is logged and
+the stream is resubscribed from the saved token, backing off exponentially up
+to MAX_RETRY_DELAY while it keeps failing.
+
+Change streams need a replica set. On a standalone server the bus falls back
+to polling the `collection_versions` counters (see etags.py) and sends a
+`reload` event for every collection whose counter moved; writes that do not
+bump a counter are only picked up by the caches' own refreshes.
+
+Delete events only carry the _id. For collections listed in `pre_images`
+the bus turns on MongoDB 6.0's changeStreamPreAndPostImages and passes the
+deleted document along as `previous`, so consumers can update in place
+instead of rebuilding. Pre-images are stored until the oplog expires them;
+if collMod fails (older server, missing privilege) `previous` stays None.
+
+Consumers may be sync or async and must be idempotent: a process also sees
+its own writes, and events can repeat after a resume.
+"""
+import asyncio
+import inspect
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Union
+
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+INSERT = "insert"
+UPDATE = "update"
+REPLACE = "replace"
+DELETE = "delete"
+# Something in the collection changed but the bus cannot say what
+RELOAD = "reload"
+
+# Server error codes for "change streams are not available here"
+UNSUPPORTED_CODES = {40573, 40324, 136}
+# The resume token fell off the oplog
+HISTORY_LOST_CODES = {286, 280}
+
+MAX_RETRY_DELAY = 60.0  # seconds
+
+
+@dataclass(frozen=True)
+class ChangeEvent:
+    collection: str
+    operation: str
+    document_key: Any = None
+    # Current version of the document for insert/update/replace, if it still exists
+    document: Optional[dict] = None
+    # Version before the change, for collections with pre-images enabled
+    previous: Optional[dict] = None
+
+
+Consumer = Callable[[ChangeEvent], Union[None, Awaitable[None]]]
+
+
+def debounce(func: Callable[[], Awaitable[None]], delay: float) -> Callable[[], None]:
+    """Run func once, `delay` seconds after the first call of a burst"""
+    pending: Dict[str, Optional[asyncio.Task]] = {"task": None}
+
+    async def run() -> None:
+        await asyncio.sleep(delay)
+        pending["task"] = None
+        try:
+            await func()
+        except Exception:
+            logger.exception("Debounced %s failed", getattr(func, "__name__", func))
+
+    def schedule() -> None:
+        if pending["task"] is None:
+            pending["task"] = asyncio.create_task(run())
+
+    return schedule
+
+
+class InvalidationBus:
+    def __init__(
+        self,
+        db,
+        collections: Iterable[str],
+        name: str = "api",
+        poll_interval: float = 2.0,
+        token_flush_interval: float = 1.0,
+        pre_images: Iterable[str] = (),
+    ):
+        self.db = db
+        self.collections = list(collections)
+        self.name = name
+        self.poll_interval = poll_interval
+        self.token_flush_interval = token_flush_interval
+        self.pre_images = list(pre_images)
+        self._before_change: Optional[str] = None
+        self._pre_images_checked = False
+        self.consumers: Dict[str, List[Consumer]] = defaultdict(list)
+        self.mode: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        # Set once a stream is open, so a failure after a healthy run starts the backoff over
+        self._subscribed = False
+        self._retry_delay = 0.0
+        self._history_lost = False
+
+    def subscribe(self, *collections: str) -> Callable[[Consumer], Consumer]:
+        def register(func: Consumer) -> Consumer:
+            for collection in collections:
+                if collection not in self.collections:
+                    raise ValueError(f"{collection!r} is not watched by the invalidation bus")
+                self.consumers[collection].append(func)
+            return func
+        return register
+
+    def start(self, db=None) -> None:
+        if db is not None:
+            self.db = db
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def dispatch(self, event: ChangeEvent) -> None:
+        for consumer in self.consumers.get(event.collection, []):
+            try:
+                result = consumer(event)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception:
+                logger.exception("Invalidation consumer %s failed on %s", consumer.__name__, event)
+
+    async def _reload_all(self) -> None:
+        for collection in self.collections:
+            await self.dispatch(ChangeEvent(collection, RELOAD))
+
+    def _next_retry_delay(self) -> float:
+        if self._subscribed or not self._retry_delay:
+            self._retry_delay = self.poll_interval
+        else:
+            self._retry_delay = min(self._retry_delay * 2, MAX_RETRY_DELAY)
+        self._subscribed = False
+        return self._retry_delay
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._watch()
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as exc:
+                if exc.code in UNSUPPORTED_CODES:
+                    logger.info("Change streams unavailable (%s), polling collection versions", exc)
+                    return await self._poll()
+                if exc.code in HISTORY_LOST_CODES:
+                    logger.warning("Change stream history lost, reloading every consumer")
+                    self._history_lost = True
+                    continue
+                logger.exception("Change stream failed, resubscribing")
+            except Exception:
+                logger.exception("Change stream failed, resubscribing")
+            await asyncio.sleep(self._next_retry_delay())
+
+    async def _enable_pre_images(self) -> None:
+        # Anything but a refusal (e.g. a dropped connection) propagates and is retried with the stream
+        try:
+            for collection in self.pre_images:
+                await self.db.command("collMod", collection, changeStreamPreAndPostImages={"enabled": True})
+        except OperationFailure as exc:
+            logger.info("Pre-images unavailable (%s), deletes will trigger reloads", exc)
+            self._pre_images_checked = True
+            return
+        self._pre_images_checked = True
+        if self.pre_images:
+            self._before_change = "whenAvailable"
+
+    async def _watch(self) -> None:
+        if not self._pre_images_checked:
+            await self._enable_pre_images()
+        if self._history_lost:
+            await self.db.change_stream_tokens.delete_one({"_id": self.name})
+            await self._reload_all()
+            self._history_lost = False
+        saved = await self.db.change_stream_tokens.find_one({"_id": self.name})
+        pipeline = [{"$match": {
+            "ns.coll": {"$in": self.collections},
+            "operationType": {"$in": [INSERT, UPDATE, REPLACE, DELETE]},
+        }}]
+        async with self.db.watch(
+            pipeline,
+            full_document="updateLookup",
+            full_document_before_change=self._before_change,
+            resume_after=saved and saved["token"],
+        ) as stream:
+            self.mode = "change_stream"
+            self._subscribed = True
+            loop = asyncio.get_running_loop()
+            flushed_at = loop.time()
+            while stream.alive:
+                change = await stream.try_next()
+                if change is not None:
+                    await self.dispatch(ChangeEvent(
+                        collection=change["ns"]["coll"],
+                        operation=change["operationType"],
+                        document_key=change.get("documentKey", {}).get("_id"),
+                        document=change.get("fullDocument"),
+                        previous=change.get("fullDocumentBeforeChange"),
+                    ))
+                # try_next returns None when idle, so the token also advances past quiet periods
+                if loop.time() - flushed_at >= self.token_flush_interval and stream.resume_token is not None:
+                    await self.db.change_stream_tokens.update_one(
+                        {"_id": self.name},
+                        {"$set": {"token": stream.resume_token, "updated_at": datetime.now(timezone.utc)}},
+                        upsert=True,
+                    )
+                    flushed_at = loop.time()
+                if change is None:
+                    await asyncio.sleep(0.1)
+
+    async def _poll(self) -> None:
+        self.mode = "polling"
+        seen: Optional[Dict[str, int]] = None
+        while True:
+            try:
+                docs = await self.db.collection_versions.find({"_id": {"$in": self.collections}}).to_list(None)
+                versions = {doc["_id"]: doc["v"] for doc in docs}
+                if seen is not None:
+                    for collection in self.collections:
+                        if versions.get(collection, 0) != seen.get(collection, 0):
+                            await self.dispatch(ChangeEvent(collection, RELOAD))
+                seen = versions
+            except Exception:
+                logger.exception("Polling collection versions failed")
+            await asyncio.sleep(self.poll_interval)
@@ -0,0 +1,86 @@
+"""Employer summary embedded in job documents.
+
+Jobs carry a copy of the posting employer's card fields under `employer` so
+list and detail views are single-collection reads, and the employer's
+`location` point (see geo.py) so nearby job queries hit the jobs 2dsphere
+index directly. Whenever those fields change on employer_details,
+`refresh_employer_summaries` rewrites the copies with one update_many per
+employer, sent as a single bulk write.
+
+    python job_cards.py    # backfill every job
+"""
+import asyncio
+import logging
+import os
+from pathlib import Path
+from typing import Iterable, Optional
+
+from pymongo import UpdateMany
+
+import etags
+
+logger = logging.getLogger(__name__)
+
+EMPLOYER_SUMMARY_FIELDS = [
+    "company_name", "sector", "city", "district", "average_rating", "payment_reliability_score",
+]
+EMPLOYER_SUMMARY_PROJECTION = {
+    "_id": 0, "user_id": 1, "location": 1, **{field: 1 for field in EMPLOYER_SUMMARY_FIELDS}
+}
+
+
+def employer_summary(employer: Optional[dict]) -> Optional[dict]:
+    if not employer:
+        return None
+    return {field: employer.get(field) for field in EMPLOYER_SUMMARY_FIELDS}
+
+
+def job_update(employer: dict) -> dict:
+    """The update that re-embeds an employer's summary and location in a job"""
+    update = {"$set": {"employer": employer_summary(employer)}}
+    if employer.get("location"):
+        update["$set"]["location"] = employer["location"]
+    else:
+        update["$unset"] = {"location": ""}
+    return update
+
+
+async def refresh_employer_summaries(db, employer_ids: Optional[Iterable[str]] = None) -> int:
+    """Re-embed the summary of the given employers (all of them if None) in their jobs"""
+    query = {}
+    if employer_ids is not None:
+        employer_ids = list(set(employer_ids))
+        if not employer_ids:
+            return 0
+        query = {"user_id": {"$in": employer_ids}}
+
+    modified = 0
+    ops = []
+    async for employer in db.employer_details.find(query, EMPLOYER_SUMMARY_PROJECTION).batch_size(1000):
+        ops.append(UpdateMany({"employer_id": employer["user_id"]}, job_update(employer)))
+        if len(ops) >= 1000:
+            modified += (await db.jobs.bulk_write(ops, ordered=False)).modified_count
+            ops = []
+    if ops:
+        modified += (await db.jobs.bulk_write(ops, ordered=False)).modified_count
+    if modified:
+        await etags.bump(db, "jobs")
+    return modified
+
+
+async def main() -> None:
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    try:
+        modified = await refresh_employer_summaries(client[os.environ['DB_NAME']])
+        print({"jobs_updated": modified})
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,118 @@
+"""Job status state machine with an append-only event log.
+
+Every status change goes through `transition`, which is one conditional
+find_one_and_update: the filter only matches when the job is in one of the
+action's allowed source statuses (and the actor may perform it), so two
+racing requests cannot both move the same job and nothing is read first.
+The previous document comes back from the same call, and the change is
+appended to `job_events`.
+
+Counters derived from job status (total_jobs_completed, cancellation_count)
+are not touched here; the events are batched through the outbox and the
+affected users are recomputed from the source collections.
+"""
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, FrozenSet, Optional
+
+from pymongo import ReturnDocument
+
+OPEN = "open"
+MATCHED = "matched"
+IN_PROGRESS = "in_progress"
+COMPLETED = "completed"
+CANCELLED = "cancelled"
+DISPUTED = "disputed"
+
+# Who may trigger an action
+EMPLOYER = "employer"
+PARTY = "party"  # the employer or the assigned worker
+ADMIN = "admin"
+
+
+@dataclass(frozen=True)
+class Action:
+    sources: FrozenSet[str]
+    target: str
+    actor: str
+    extra: Dict[str, object] = field(default_factory=dict)
+
+
+ACTIONS: Dict[str, Action] = {
+    "match": Action(frozenset({OPEN}), MATCHED, EMPLOYER),
+    "start": Action(frozenset({MATCHED}), IN_PROGRESS, EMPLOYER),
+    "complete": Action(frozenset({MATCHED, IN_PROGRESS}), COMPLETED, EMPLOYER),
+    "cancel": Action(frozenset({OPEN, MATCHED}), CANCELLED, EMPLOYER),
+    "dispute": Action(frozenset({IN_PROGRESS, COMPLETED}), DISPUTED, PARTY, {"dispute_status": "worker_disputed"}),
+    "resolve_completed": Action(frozenset({DISPUTED}), COMPLETED, ADMIN, {"dispute_status": "resolved"}),
+    "resolve_cancelled": Action(frozenset({DISPUTED}), CANCELLED, ADMIN, {"dispute_status": "resolved"}),
+}
+
+JOB_PROJECTION = {
+    "_id": 0, "id": 1, "employer_id": 1, "assigned_worker_id": 1, "job_status": 1,
+    "required_skills": 1, "created_at": 1, "employer.city": 1, "expiry_recorded": 1,
+}
+
+
+class TransitionError(Exception):
+    def __init__(self, action: str, status: Optional[str], reason: str):
+        super().__init__(f"{action} not allowed from {status}: {reason}")
+        self.action = action
+        self.status = status
+        self.reason = reason  # not_found, forbidden or invalid_status
+
+
+async def ensure_indexes(db) -> None:
+    await db.job_events.create_index([("job_id", 1), ("created_at", -1), ("id", -1)])
+
+
+async def transition(
+    db,
+    job_id: str,
+    action: str,
+    actor_id: Optional[str],
+    reason: Optional[str] = None,
+    assign_worker_id: Optional[str] = None,
+) -> dict:
+    """Apply the action and log it; returns the event. Raises TransitionError."""
+    spec = ACTIONS[action]
+    now = datetime.now(timezone.utc)
+
+    guard = {"id": job_id, "job_status": {"$in": sorted(spec.sources)}}
+    if spec.actor == EMPLOYER:
+        guard["employer_id"] = actor_id
+    elif spec.actor == PARTY:
+        guard["$or"] = [{"employer_id": actor_id}, {"assigned_worker_id": actor_id}]
+
+    update = {"job_status": spec.target, "updated_at": now, **spec.extra}
+    if assign_worker_id is not None:
+        update["assigned_worker_id"] = assign_worker_id
+
+    job = await db.jobs.find_one_and_update(
+        guard, {"$set": update}, projection=JOB_PROJECTION, return_document=ReturnDocument.BEFORE
+    )
+    if job is None:
+        # Only the failure path pays for a second read, to say why
+        current = await db.jobs.find_one({"id": job_id}, {"_id": 0, "job_status": 1})
+        if current is None:
+            raise TransitionError(action, None, "not_found")
+        if current["job_status"] in spec.sources:
+            raise TransitionError(action, current["job_status"], "forbidden")
+        raise TransitionError(action, current["job_status"], "invalid_status")
+
+    event = {
+        "id": str(uuid.uuid4()),
+        "job_id": job_id,
+        "action": action,
+        "from_status": job["job_status"],
+        "to_status": spec.target,
+        "actor_id": actor_id,
+        "employer_id": job["employer_id"],
+        "worker_id": assign_worker_id or job.get("assigned_worker_id"),
+        "reason": reason,
+        "created_at": now,
+    }
+    await db.job_events.insert_one(dict(event))
+    event["job"] = job
+    return event
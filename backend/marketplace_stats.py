@@ -0,0 +1,385 @@
+"""Materialized marketplace statistics.
+
+`daily_stats` holds one document per UTC day with that day's flows (jobs
+posted per city, applications, matches and time-to-match, ratings per
+sector) plus the running totals and the open job count per city and skill.
+Write handlers apply small $inc updates as events happen, so reads never
+touch jobs, job_applications or ratings. Every write also increments the
+totals, so they are spread over CURRENT_SHARDS documents picked at random
+and summed on read; a single `current` document would serialize all writers.
+
+A job leaves the open counts when it is matched, closed by a transition, or
+when its listing expires while still open. Nothing writes at expiry, so
+`sweep_expired_jobs` claims such jobs (`expiry_recorded`) and counts each
+one once; a later transition of an expired job does not decrement again.
+
+`backfill` rebuilds everything from one aggregation pipeline.
+"""
+import asyncio
+import logging
+import os
+import random
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from pymongo import ReplaceOne
+
+logger = logging.getLogger(__name__)
+
+CURRENT_ID = "current"
+CURRENT_SHARDS = 16
+# Shard 0 keeps the original id, so totals written before sharding still count
+CURRENT_IDS = [CURRENT_ID] + [f"{CURRENT_ID}:{n}" for n in range(1, CURRENT_SHARDS)]
+UNKNOWN = "unknown"
+MAX_RANGE_DAYS = 366
+
+
+def as_utc(when: datetime) -> datetime:
+    """Naive datetimes (query parameters without an offset, legacy rows) are taken as UTC"""
+    if when.tzinfo is None:
+        return when.replace(tzinfo=timezone.utc)
+    return when.astimezone(timezone.utc)
+
+
+def day_key(when: datetime) -> str:
+    if when.tzinfo is not None:
+        when = when.astimezone(timezone.utc)
+    return when.strftime("%Y-%m-%d")
+
+
+def field_key(value: Optional[str]) -> str:
+    """Make a user-supplied value safe to use as a document field name"""
+    if not value:
+        return UNKNOWN
+    return value.replace(".", "_").lstrip("$") or UNKNOWN
+
+
+async def _inc(db, when: datetime, daily: Dict[str, float], current: Dict[str, float]) -> None:
+    day = day_key(when)
+    await asyncio.gather(
+        db.daily_stats.update_one(
+            {"_id": day},
+            {"$inc": daily, "$setOnInsert": {"date": datetime.strptime(day, "%Y-%m-%d").replace(tzinfo=timezone.utc)}},
+            upsert=True,
+        ),
+        db.daily_stats.update_one({"_id": random.choice(CURRENT_IDS)}, {"$inc": current}, upsert=True),
+    )
+
+
+async def record_job_created(db, city: Optional[str], skills: Iterable[str], when: datetime) -> None:
+    city = field_key(city)
+    open_jobs = {f"open_jobs.{city}.{field_key(skill)}": 1 for skill in skills}
+    await _inc(
+        db, when,
+        {"jobs_created": 1, f"jobs_created_by_city.{city}": 1},
+        {"jobs_total": 1, "open_jobs_total": 1, **open_jobs},
+    )
+
+
+async def record_job_closed(db, city: Optional[str], skills: Iterable[str], when: datetime) -> None:
+    """A job left the open state without a match, e.g. it was cancelled or expired"""
+    city = field_key(city)
+    open_jobs = {f"open_jobs.{city}.{field_key(skill)}": -1 for skill in skills}
+    await _inc(db, when, {"jobs_closed": 1}, {"open_jobs_total": -1, **open_jobs})
+
+
+async def record_application(db, when: datetime) -> None:
+    await _inc(db, when, {"applications": 1}, {"applications_total": 1})
+
+
+async def record_match(
+    db, city: Optional[str], skills: Iterable[str], job_created_at: datetime, when: datetime, was_open: bool = True
+) -> None:
+    """was_open=False for a job whose expiry already took it out of the open counts"""
+    city = field_key(city)
+    seconds = max((as_utc(when) - as_utc(job_created_at)).total_seconds(), 0.0)
+    current = {"matches_total": 1, "time_to_match_seconds": seconds}
+    if was_open:
+        current["open_jobs_total"] = -1
+        current.update({f"open_jobs.{city}.{field_key(skill)}": -1 for skill in skills})
+    await _inc(db, when, {"matches": 1, "time_to_match_seconds": seconds}, current)
+
+
+async def job_city(db, job: dict) -> Optional[str]:
+    """City of the job's employer, from the embedded summary when there is one"""
+    employer = job.get("employer")
+    if employer is None:
+        # Jobs from before the employer summary was embedded
+        employer = await db.employer_details.find_one({"user_id": job["employer_id"]}, {"_id": 0, "city": 1})
+    return employer and employer.get("city")
+
+
+async def sweep_expired_jobs(db, now: Optional[datetime] = None) -> int:
+    """Take jobs whose listing expired while open out of the open counts, once each"""
+    now = now or datetime.now(timezone.utc)
+    swept = 0
+    while True:
+        # The claim is the update itself, so concurrent sweeps never count a job twice
+        job = await db.jobs.find_one_and_update(
+            {"job_status": "open", "expires_at": {"$lte": now}, "expiry_recorded": {"$ne": True}},
+            {"$set": {"expiry_recorded": True}},
+            projection={"_id": 0, "employer_id": 1, "employer.city": 1, "required_skills": 1, "expires_at": 1},
+        )
+        if job is None:
+            return swept
+        await record_job_closed(db, await job_city(db, job), job.get("required_skills", []), as_utc(job["expires_at"]))
+        swept += 1
+
+
+async def run_expiry_sweeps(get_db: Callable, interval: float = 60.0) -> None:
+    while True:
+        try:
+            swept = await sweep_expired_jobs(get_db())
+            if swept:
+                logger.info("Recorded %d expired jobs in daily_stats", swept)
+        except Exception:
+            logger.exception("Expired job sweep failed")
+        await asyncio.sleep(interval)
+
+
+async def record_rating(db, sector: Optional[str], score: int, when: datetime) -> None:
+    sector = field_key(sector)
+    await _inc(
+        db, when,
+        {f"ratings_by_sector.{sector}.count": 1, f"ratings_by_sector.{sector}.sum": score},
+        {f"ratings_by_sector.{sector}.count": 1, f"ratings_by_sector.{sector}.sum": score},
+    )
+
+
+def _merge(into: dict, doc: dict) -> dict:
+    """Sum the numbers of a current shard into `into`, nested maps included"""
+    for key, value in doc.items():
+        if isinstance(value, dict):
+            _merge(into.setdefault(key, {}), value)
+        elif isinstance(value, (int, float)) and key != "_id":
+            into[key] = into.get(key, 0) + value
+    return into
+
+
+def _with_averages(doc: dict) -> dict:
+    doc = dict(doc)
+    matches = doc.get("matches_total", doc.get("matches", 0))
+    if matches:
+        doc["avg_time_to_match_hours"] = round(doc.get("time_to_match_seconds", 0) / matches / 3600, 2)
+    jobs = doc.get("jobs_total", doc.get("jobs_created", 0))
+    if jobs:
+        doc["applications_per_job"] = round(doc.get("applications_total", doc.get("applications", 0)) / jobs, 2)
+    for bucket in doc.get("ratings_by_sector", {}).values():
+        if bucket.get("count"):
+            bucket["average"] = round(bucket["sum"] / bucket["count"], 2)
+    return doc
+
+
+async def read_stats(db, start: datetime, end: datetime) -> dict:
+    """Current totals plus the daily documents in [start, end]"""
+    start, end = as_utc(start), as_utc(end)
+    if end - start > timedelta(days=MAX_RANGE_DAYS):
+        start = end - timedelta(days=MAX_RANGE_DAYS)
+    shards, days = await asyncio.gather(
+        db.daily_stats.find({"_id": {"$in": CURRENT_IDS}}).to_list(None),
+        db.daily_stats.find({"_id": {"$gte": day_key(start), "$lte": day_key(end)}}).sort("_id", 1).to_list(None),
+    )
+    current = {"_id": CURRENT_ID}
+    for shard in shards:
+        _merge(current, shard)
+    return {
+        "current": _with_averages(current),
+        "days": [_with_averages(day) for day in days],
+    }
+
+
+def _employer_field(field: str, user_field: str) -> List[dict]:
+    return [
+        {"$lookup": {
+            "from": "employer_details",
+            "localField": user_field,
+            "foreignField": "user_id",
+            "as": "_employer",
+        }},
+        {"$set": {field: {"$ifNull": [{"$arrayElemAt": [f"$_employer.{field}", 0]}, UNKNOWN]}}},
+    ]
+
+
+# Open and not yet counted as expired; sweep_expired_jobs handles the rest
+STILL_OPEN = {"job_status": "open", "expiry_recorded": {"$ne": True}}
+
+
+def as_date(expr) -> dict:
+    """Read expr as a date, including ISO strings migrate_dates.py has not converted yet"""
+    return {"$convert": {"input": expr, "to": "date", "onError": None, "onNull": None}}
+
+
+def day_of(field: str) -> dict:
+    return {"$dateToString": {"format": "%Y-%m-%d", "date": as_date(f"${field}")}}
+
+
+def build_backfill_pipeline() -> List[dict]:
+    """Run on jobs; emits rows of {kind, day, key, skill, count, sum}"""
+    day = day_of("created_at")
+    return [
+        *_employer_field("city", "employer_id"),
+        {"$group": {"_id": {"kind": "job", "day": day, "key": "$city"}, "count": {"$sum": 1}}},
+        {"$unionWith": {"coll": "jobs", "pipeline": [
+            {"$match": STILL_OPEN},
+            {"$group": {"_id": {"kind": "open_total"}, "count": {"$sum": 1}}},
+        ]}},
+        {"$unionWith": {"coll": "jobs", "pipeline": [
+            {"$match": STILL_OPEN},
+            *_employer_field("city", "employer_id"),
+            {"$unwind": "$required_skills"},
+            {"$group": {"_id": {"kind": "open", "key": "$city", "skill": "$required_skills"}, "count": {"$sum": 1}}},
+        ]}},
+        {"$unionWith": {"coll": "job_events", "pipeline": [
+            # Left the open pool without a match; record_job_closed counts the same
+            {"$match": {"from_status": "open", "to_status": {"$ne": "matched"}}},
+            {"$lookup": {"from": "jobs", "localField": "job_id", "foreignField": "id", "as": "_job"}},
+            # Jobs whose expiry was counted are closed on their expiry day below
+            {"$match": {"_job.expiry_recorded": {"$ne": True}}},
+            {"$group": {
+                "_id": {"kind": "closed", "day": day_of("created_at")},
+                "count": {"$sum": 1},
+            }},
+        ]}},
+        {"$unionWith": {"coll": "jobs", "pipeline": [
+            {"$match": {"expiry_recorded": True}},
+            {"$group": {
+                "_id": {"kind": "closed", "day": day_of("expires_at")},
+                "count": {"$sum": 1},
+            }},
+        ]}},
+        {"$unionWith": {"coll": "job_applications", "pipeline": [
+            {"$group": {
+                "_id": {"kind": "application", "day": day_of("applied_at")},
+                "count": {"$sum": 1},
+            }},
+        ]}},
+        {"$unionWith": {"coll": "job_applications", "pipeline": [
+            {"$match": {"status": "accepted", "responded_at": {"$ne": None}}},
+            {"$lookup": {"from": "jobs", "localField": "job_id", "foreignField": "id", "as": "_job"}},
+            {"$set": {
+                "responded_at": as_date("$responded_at"),
+                "_job_created": as_date({"$arrayElemAt": ["$_job.created_at", 0]}),
+            }},
+            {"$match": {"responded_at": {"$type": "date"}, "_job_created": {"$type": "date"}}},
+            {"$group": {
+                "_id": {"kind": "match", "day": day_of("responded_at")},
+                "count": {"$sum": 1},
+                "sum": {"$sum": {"$divide": [{"$subtract": ["$responded_at", "$_job_created"]}, 1000]}},
+            }},
+        ]}},
+        {"$unionWith": {"coll": "ratings", "pipeline": [
+            # The employer side of the rating decides the sector
+            {"$lookup": {
+                "from": "employer_details",
+                "let": {"users": ["$to_user_id", "$from_user_id"]},
+                "pipeline": [
+                    {"$match": {"$expr": {"$in": ["$user_id", "$$users"]}}},
+                    {"$project": {"_id": 0, "sector": 1}},
+                ],
+                "as": "_employer",
+            }},
+            {"$group": {
+                "_id": {
+                    "kind": "rating",
+                    "day": day_of("created_at"),
+                    "key": {"$ifNull": [{"$arrayElemAt": ["$_employer.sector", 0]}, UNKNOWN]},
+                },
+                "count": {"$sum": 1},
+                "sum": {"$sum": "$overall_score"},
+            }},
+        ]}},
+    ]
+
+
+async def backfill(db) -> dict:
+    """Rebuild daily_stats from scratch with one aggregation"""
+    # Expired open jobs are marked without counting; the rebuild closes them on their expiry day
+    await db.jobs.update_many(
+        {"job_status": "open", "expires_at": {"$lte": datetime.now(timezone.utc)}, "expiry_recorded": {"$ne": True}},
+        {"$set": {"expiry_recorded": True}},
+    )
+    days: Dict[str, dict] = defaultdict(lambda: defaultdict(float))
+    current: dict = defaultdict(float)
+    open_jobs: Dict[str, Dict[str, int]] = defaultdict(dict)
+    ratings_by_day: Dict[str, dict] = defaultdict(dict)
+    ratings_total: dict = {}
+
+    async for row in db.jobs.aggregate(build_backfill_pipeline(), allowDiskUse=True):
+        group = row["_id"]
+        kind, day = group["kind"], group.get("day")
+        if kind == "job":
+            city = field_key(group.get("key"))
+            days[day]["jobs_created"] += row["count"]
+            # Spellings that differ in the jobs can fold to the same key here
+            by_city = days[day].setdefault("jobs_created_by_city", {})
+            by_city[city] = by_city.get(city, 0) + row["count"]
+            current["jobs_total"] += row["count"]
+        elif kind == "open_total":
+            current["open_jobs_total"] = row["count"]
+        elif kind == "open":
+            city, skill = field_key(group.get("key")), field_key(group.get("skill"))
+            open_jobs[city][skill] = open_jobs[city].get(skill, 0) + row["count"]
+        elif kind == "closed":
+            days[day]["jobs_closed"] += row["count"]
+        elif kind == "application":
+            days[day]["applications"] += row["count"]
+            current["applications_total"] += row["count"]
+        elif kind == "match":
+            days[day]["matches"] += row["count"]
+            days[day]["time_to_match_seconds"] += row["sum"]
+            current["matches_total"] += row["count"]
+            current["time_to_match_seconds"] += row["sum"]
+        elif kind == "rating":
+            sector = field_key(group.get("key"))
+            bucket = ratings_by_day[day].setdefault(sector, {"count": 0, "sum": 0})
+            bucket["count"] += row["count"]
+            bucket["sum"] += row["sum"]
+            total = ratings_total.setdefault(sector, {"count": 0, "sum": 0})
+            total["count"] += row["count"]
+            total["sum"] += row["sum"]
+
+    ops = []
+    day_ids = [day for day in set(days) | set(ratings_by_day) if day is not None]
+    for day in day_ids:
+        doc = {
+            "_id": day,
+            "date": datetime.strptime(day, "%Y-%m-%d").replace(tzinfo=timezone.utc),
+            **days.get(day, {}),
+        }
+        if ratings_by_day.get(day):
+            doc["ratings_by_sector"] = ratings_by_day[day]
+        ops.append(ReplaceOne({"_id": day}, doc, upsert=True))
+
+    ops.append(ReplaceOne({"_id": CURRENT_ID}, {
+        "_id": CURRENT_ID,
+        "open_jobs_total": 0,
+        **current,
+        "open_jobs": open_jobs,
+        "ratings_by_sector": ratings_total,
+    }, upsert=True))
+
+    await db.daily_stats.bulk_write(ops, ordered=False)
+    # Also drops the other current shards; their totals are in shard 0 now
+    await db.daily_stats.delete_many({"_id": {"$nin": [*day_ids, CURRENT_ID]}})
+    result = {"days": len(day_ids)}
+    logger.info("daily_stats backfill finished: %s", result)
+    return result
+
+
+async def main() -> None:
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    try:
+        print(await backfill(client[os.environ['DB_NAME']]))
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
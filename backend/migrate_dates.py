@@ -0,0 +1,126 @@
+"""Rewrite ISO-8601 timestamp strings as native BSON dates.
+
+Runs online: documents are scanned in _id order in small batches, each update
+only applies while the field still holds the string that was read, and the
+last processed _id of every collection is stored in `migration_state` so an
+interrupted run continues where it stopped.
+
+A finished run clears that position, so every run rescans all collections
+for strings written since (older deploys, imports, manual edits). The scan
+only returns documents that still hold a string, so a rerun on migrated data
+is one pass that updates nothing; schedule it as often as you like.
+
+    python migrate_dates.py [--batch-size 500] [--pause 0.05] [--restart]
+"""
+import argparse
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_ID = "iso_dates_to_bson"
+
+DATE_FIELDS = {
+    "users": ["created_at", "last_login"],
+    "worker_skills": ["added_at"],
+    "portfolio": ["upload_date"],
+    "jobs": ["created_at", "updated_at", "expires_at", "start_date", "end_date"],
+    "job_applications": ["applied_at", "responded_at", "updated_at"],
+    "ratings": ["created_at"],
+    "notifications": ["created_at"],
+    "pipeline_checkpoints": ["last_run_at"],
+}
+
+
+def parse_iso(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    # Naive strings were always written from UTC clocks
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+async def migrate_collection(db, name: str, fields: list, batch_size: int, pause: float) -> int:
+    state_id = f"{MIGRATION_ID}:{name}"
+    state = await db.migration_state.find_one({"_id": state_id}) or {}
+
+    query = {"$or": [{field: {"$type": "string"}} for field in fields]}
+    projection = {field: 1 for field in fields}
+    last_id = state.get("last_id")
+    migrated = 0
+
+    while True:
+        batch_query = {**query, "_id": {"$gt": last_id}} if last_id is not None else query
+        batch = await db[name].find(batch_query, projection).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+
+        ops = []
+        for doc in batch:
+            for field in fields:
+                value = doc.get(field)
+                if not isinstance(value, str):
+                    continue
+                try:
+                    converted = parse_iso(value)
+                except ValueError:
+                    logger.warning("%s %s: unparseable %s=%r", name, doc["_id"], field, value)
+                    continue
+                # Guarded on the old value so a concurrent write always wins
+                ops.append(UpdateOne({"_id": doc["_id"], field: value}, {"$set": {field: converted}}))
+
+        if ops:
+            result = await db[name].bulk_write(ops, ordered=False)
+            migrated += result.modified_count
+
+        last_id = batch[-1]["_id"]
+        await db.migration_state.update_one(
+            {"_id": state_id}, {"$set": {"last_id": last_id}}, upsert=True
+        )
+        if pause:
+            await asyncio.sleep(pause)
+
+    await db.migration_state.update_one(
+        {"_id": state_id},
+        {"$set": {"finished_at": datetime.now(timezone.utc), "migrated": migrated}, "$unset": {"last_id": ""}},
+        upsert=True,
+    )
+    logger.info("%s: %d fields migrated", name, migrated)
+    return migrated
+
+
+async def migrate(db, batch_size: int = 500, pause: float = 0.0, restart: bool = False) -> dict:
+    if restart:
+        await db.migration_state.delete_many({"_id": {"$regex": f"^{MIGRATION_ID}:"}})
+    results = {}
+    for name, fields in DATE_FIELDS.items():
+        results[name] = await migrate_collection(db, name, fields, batch_size, pause)
+    return results
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--pause", type=float, default=0.05, help="seconds to sleep between batches")
+    parser.add_argument("--restart", action="store_true", help="ignore the position of an interrupted run")
+    args = parser.parse_args()
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    try:
+        results = await migrate(client[os.environ['DB_NAME']], args.batch_size, args.pause, args.restart)
+        print(results)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,50 @@
+"""Remove duplicate worker skills and create the unique (worker, skill) index.
+
+Older add_worker_skill calls could insert the same skill twice. This keeps
+the most recently added copy of every (worker_id, skill_category_id) pair,
+then builds the unique index the API relies on. Run it once, with the API
+up or down, before the first deploy that expects the index; it is safe to
+run again.
+
+    python migrate_worker_skills.py
+"""
+import asyncio
+import logging
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+logger = logging.getLogger(__name__)
+
+UNIQUE_KEYS = [("worker_id", 1), ("skill_category_id", 1)]
+
+
+async def migrate(db) -> dict:
+    duplicates = db.worker_skills.aggregate([
+        {"$sort": {"added_at": -1}},
+        {"$group": {"_id": {"w": "$worker_id", "s": "$skill_category_id"}, "ids": {"$push": "$_id"}}},
+        {"$match": {"ids.1": {"$exists": True}}},
+    ], allowDiskUse=True)
+    deleted = 0
+    async for group in duplicates:
+        result = await db.worker_skills.delete_many({"_id": {"$in": group["ids"][1:]}})
+        deleted += result.deleted_count
+    await db.worker_skills.create_index(UNIQUE_KEYS, unique=True)
+    logger.info("worker_skills: %d duplicates removed, unique index in place", deleted)
+    return {"duplicates_removed": deleted}
+
+
+async def main() -> None:
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    try:
+        print(await migrate(client[os.environ['DB_NAME']]))
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
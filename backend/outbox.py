@@ -0,0 +1,171 @@
+"""Mongo-backed outbox for write-side effects.
+
+Handlers commit their primary write and enqueue the derived work here. A pool
+of background workers claims pending entries in batches, groups them by kind
+and hands each group to the registered handler in one call, so derived
+updates can be applied with bulk writes. Failed batches are retried with
+exponential backoff; entries with a dedupe_key are only ever enqueued once.
+
+Handlers must be idempotent: an entry can run again if a worker dies after
+applying it but before marking it done.
+"""
+import asyncio
+import logging
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+PROCESSING = "processing"
+DONE = "done"
+FAILED = "failed"
+
+Handler = Callable[[List[dict]], Awaitable[None]]
+
+
+async def ensure_indexes(db) -> None:
+    await db.outbox.create_index([("status", 1), ("available_at", 1)])
+    await db.outbox.create_index("claim_token")
+    await db.outbox.create_index("dedupe_key", unique=True, sparse=True)
+    # Keep finished entries around for a week for debugging
+    await db.outbox.create_index("done_at", expireAfterSeconds=7 * 24 * 3600)
+
+
+class Outbox:
+    def __init__(
+        self,
+        db,
+        concurrency: int = 2,
+        batch_size: int = 100,
+        poll_interval: float = 1.0,
+        lease_seconds: int = 60,
+        max_attempts: int = 8,
+    ):
+        self.db = db
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease = timedelta(seconds=lease_seconds)
+        self.max_attempts = max_attempts
+        self.handlers: Dict[str, Handler] = {}
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = False
+
+    def handler(self, kind: str) -> Callable[[Handler], Handler]:
+        def register(func: Handler) -> Handler:
+            self.handlers[kind] = func
+            return func
+        return register
+
+    async def enqueue(self, kind: str, payload: dict, dedupe_key: Optional[str] = None) -> None:
+        if kind not in self.handlers:
+            raise ValueError(f"No outbox handler registered for {kind!r}")
+        now = datetime.now(timezone.utc)
+        entry = {
+            "kind": kind,
+            "payload": payload,
+            "status": PENDING,
+            "attempts": 0,
+            "created_at": now,
+            "available_at": now,
+        }
+        if dedupe_key is not None:
+            entry["dedupe_key"] = dedupe_key
+        try:
+            await self.db.outbox.insert_one(entry)
+        except DuplicateKeyError:
+            return
+        self._wakeup.set()
+
+    def start(self, db=None) -> None:
+        if db is not None:
+            self.db = db
+        self._stopping = False
+        self._tasks = [asyncio.create_task(self._run(i)) for i in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        self._stopping = True
+        self._wakeup.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run(self, worker_no: int) -> None:
+        while not self._stopping:
+            try:
+                processed = await self.drain_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Outbox worker %d failed to drain", worker_no)
+                processed = 0
+            if processed:
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _claim(self) -> List[dict]:
+        now = datetime.now(timezone.utc)
+        claimable = {"$or": [
+            {"status": PENDING, "available_at": {"$lte": now}},
+            # Entries whose worker died mid-batch
+            {"status": PROCESSING, "lease_until": {"$lt": now}},
+        ]}
+        candidates = await self.db.outbox.find(claimable, {"_id": 1}).sort("available_at", 1).limit(self.batch_size).to_list(self.batch_size)
+        if not candidates:
+            return []
+
+        token = uuid.uuid4().hex
+        # Re-checking the claimable filter makes the claim atomic per entry
+        await self.db.outbox.update_many(
+            {"_id": {"$in": [c["_id"] for c in candidates]}, **claimable},
+            {"$set": {"status": PROCESSING, "claim_token": token, "lease_until": now + self.lease}},
+        )
+        return await self.db.outbox.find({"claim_token": token}).to_list(None)
+
+    async def drain_once(self) -> int:
+        """Claim one batch and run it, returning the number of entries processed"""
+        entries = await self._claim()
+        by_kind = defaultdict(list)
+        for entry in entries:
+            by_kind[entry["kind"]].append(entry)
+
+        for kind, group in by_kind.items():
+            ids = [entry["_id"] for entry in group]
+            try:
+                await self.handlers[kind]([entry["payload"] for entry in group])
+            except Exception as exc:
+                logger.exception("Outbox handler %s failed for %d entries", kind, len(group))
+                await self._retry(group, exc)
+                continue
+            await self.db.outbox.update_many(
+                {"_id": {"$in": ids}},
+                {"$set": {"status": DONE, "done_at": datetime.now(timezone.utc)},
+                 "$unset": {"claim_token": "", "lease_until": ""}},
+            )
+        return len(entries)
+
+    async def _retry(self, group: List[dict], exc: Exception) -> None:
+        now = datetime.now(timezone.utc)
+        for entry in group:
+            attempts = entry["attempts"] + 1
+            update = {"attempts": attempts, "last_error": repr(exc)}
+            if attempts >= self.max_attempts:
+                update["status"] = FAILED
+            else:
+                update["status"] = PENDING
+                update["available_at"] = now + timedelta(seconds=min(2 ** attempts, 300))
+            await self.db.outbox.update_one(
+                {"_id": entry["_id"]},
+                {"$set": update, "$unset": {"claim_token": "", "lease_until": ""}},
+            )
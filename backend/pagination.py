@@ -0,0 +1,76 @@
+"""Keyset pagination over a (date, id) sort.
+
+Listings sort newest first on a date field with a unique field (usually `id`)
+as the tie breaker, and hand out an opaque cursor holding the last (date, id) pair they
+returned. The next page starts strictly after that pair, so it is one index
+range scan regardless of how deep the client has paged, and rows inserted
+meanwhile do not shift the pages.
+
+Rows that migrate_dates.py has not converted yet still hold ISO strings. BSON
+sorts every string below every date, so a newest-first listing returns the
+dates first and the strings after them. A cursor taken on a date row
+therefore also admits all string rows, and a cursor taken on a string row
+remembers that (the `s:` prefix) and continues among the strings.
+"""
+import base64
+from datetime import datetime
+from typing import List, Optional, Tuple, Union
+
+MAX_PAGE_SIZE = 500
+
+
+LEGACY_PREFIX = "s:"
+
+
+def encode_cursor(when: Union[datetime, str], doc_id: str) -> str:
+    if isinstance(when, str):
+        # Validated like a date, but kept as the string the row holds
+        datetime.fromisoformat(when)
+        raw = f"{LEGACY_PREFIX}{when}|{doc_id}"
+    else:
+        raw = f"{when.isoformat()}|{doc_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Union[datetime, str], str]:
+    """Raises ValueError for anything encode_cursor did not produce"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        when, doc_id = raw.split("|", 1)
+        if when.startswith(LEGACY_PREFIX):
+            when = when[len(LEGACY_PREFIX):]
+            datetime.fromisoformat(when)
+            return when, doc_id
+        return datetime.fromisoformat(when), doc_id
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ValueError(f"Invalid cursor {cursor!r}") from exc
+
+
+def page_query(query: dict, date_field: str, cursor: Optional[str], tie_field: str = "id") -> dict:
+    """Add the 'after this cursor' condition for a descending (date, tie) sort"""
+    if not cursor:
+        return query
+    when, doc_id = decode_cursor(cursor)
+    after = [
+        {date_field: {"$lt": when}},
+        {date_field: when, tie_field: {"$lt": doc_id}},
+    ]
+    if isinstance(when, datetime):
+        # Unmigrated string dates sort after every date
+        after.append({date_field: {"$type": "string"}})
+    return {**query, "$or": after}
+
+
+def sort_keys(date_field: str, tie_field: str = "id") -> List[Tuple[str, int]]:
+    return [(date_field, -1), (tie_field, -1)]
+
+
+def split_page(
+    rows: List[dict], date_field: str, limit: int, tie_field: str = "id"
+) -> Tuple[List[dict], Optional[str]]:
+    """Callers fetch limit + 1 rows; the extra row only says whether there is a next page"""
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    last = page[-1]
+    return page, encode_cursor(last[date_field], last[tie_field])
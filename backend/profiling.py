@@ -0,0 +1,263 @@
+"""Opt-in sampling profiler for individual requests.
+
+A profiled request registers its asyncio task with a background sampler
+thread. Every `interval` seconds the sampler records the task's stack:
+
+* while the task is running on the event loop, the loop thread's real stack
+  (so synchronous work such as bcrypt or serialization shows up), trimmed to
+  the task's own frames;
+* while it is suspended, the chain of awaiting coroutines ending in an
+  `[await ...]` leaf, so time spent waiting on Motor or other I/O is counted
+  against the line that awaited it.
+
+Samples are wall clock, not CPU time. Finished profiles are written in
+speedscope's sampled format (https://www.speedscope.app) to a directory that
+keeps only the newest `max_files` profiles.
+"""
+import asyncio
+import logging
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+HEADER = b"x-profile"
+PROFILE_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+Frame = Tuple[str, str, int]
+
+
+class Profile:
+    def __init__(self, name: str, task: asyncio.Task, loop_thread_id: int):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.task = task
+        self.loop_thread_id = loop_thread_id
+        self.started_at = datetime.now(timezone.utc)
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.frames: List[Frame] = []
+        self._frame_index: Dict[Frame, int] = {}
+        self.samples: List[List[int]] = []
+        self.weights: List[float] = []
+        self._last_sample = self.started
+
+    def _index(self, frame: Frame) -> int:
+        index = self._frame_index.get(frame)
+        if index is None:
+            index = self._frame_index[frame] = len(self.frames)
+            self.frames.append(frame)
+        return index
+
+    def add_sample(self, stack: List[Frame], now: float) -> None:
+        """Record a root-first stack covering the time since the last sample"""
+        self.samples.append([self._index(frame) for frame in stack])
+        self.weights.append(now - self._last_sample)
+        self._last_sample = now
+
+    def to_speedscope(self) -> dict:
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": self.name,
+            "exporter": "ustabul-profiling",
+            "shared": {"frames": [{"name": name, "file": file, "line": line} for name, file, line in self.frames]},
+            "profiles": [{
+                "type": "sampled",
+                "name": self.name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": self.duration,
+                "samples": self.samples,
+                "weights": self.weights,
+            }],
+        }
+
+
+def _frame_key(frame) -> Frame:
+    code = frame.f_code
+    return (code.co_qualname if hasattr(code, "co_qualname") else code.co_name, code.co_filename, frame.f_lineno)
+
+
+def _awaitable_frame(obj):
+    return getattr(obj, "cr_frame", None) or getattr(obj, "gi_frame", None) or getattr(obj, "ag_frame", None)
+
+
+def _awaited(obj):
+    for attr in ("cr_await", "gi_yieldfrom", "ag_await"):
+        if hasattr(obj, attr):
+            return getattr(obj, attr)
+    return None
+
+
+def suspended_stack(task: asyncio.Task) -> List[Frame]:
+    """Root-first stack of a task waiting on the event loop"""
+    stack: List[Frame] = []
+    obj = task.get_coro()
+    for _ in range(256):
+        if obj is None:
+            break
+        if isinstance(obj, asyncio.Task):
+            # Awaiting another task directly (e.g. a shielded one): follow it
+            obj = obj.get_coro()
+            continue
+        frame = _awaitable_frame(obj)
+        if frame is None:
+            # Future.__await__ returns an iterator named FutureIter in CPython
+            label = "Future" if type(obj).__name__ == "FutureIter" else type(obj).__name__
+            stack.append((f"[await {label}]", "", 0))
+            break
+        stack.append(_frame_key(frame))
+        obj = _awaited(obj)
+    return stack
+
+
+def running_stack(task: asyncio.Task, thread_frame) -> List[Frame]:
+    """Root-first stack of the loop thread, trimmed to the task's frames"""
+    root = _awaitable_frame(task.get_coro())
+    stack = []
+    frame = thread_frame
+    while frame is not None:
+        stack.append(frame)
+        if frame is root:
+            break
+        frame = frame.f_back
+    return [_frame_key(f) for f in reversed(stack)]
+
+
+class Sampler:
+    """Background thread sampling every registered task"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self._profiles: Dict[str, Profile] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start_profile(self, name: str) -> Profile:
+        profile = Profile(name, asyncio.current_task(), threading.get_ident())
+        with self._lock:
+            self._profiles[profile.id] = profile
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self._thread.start()
+        return profile
+
+    def stop_profile(self, profile: Profile) -> None:
+        with self._lock:
+            self._profiles.pop(profile.id, None)
+        profile.duration = time.perf_counter() - profile.started
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            # Sampling under the lock keeps stop_profile from racing a sample
+            with self._lock:
+                if not self._profiles:
+                    self._thread = None
+                    return
+                thread_frames = sys._current_frames()
+                now = time.perf_counter()
+                for profile in self._profiles.values():
+                    try:
+                        coro = profile.task.get_coro()
+                        if getattr(coro, "cr_running", False):
+                            stack = running_stack(profile.task, thread_frames.get(profile.loop_thread_id))
+                        else:
+                            stack = suspended_stack(profile.task)
+                        profile.add_sample(stack, now)
+                    except Exception:
+                        # Frames can change under us; drop the sample rather than the profile
+                        logger.debug("Dropped profiler sample", exc_info=True)
+
+
+class ProfileStore:
+    """Ring buffer of speedscope files on disk"""
+
+    def __init__(self, directory: Path, max_files: int = 50):
+        self.directory = Path(directory)
+        self.max_files = max_files
+
+    def _files(self) -> List[Path]:
+        if not self.directory.exists():
+            return []
+        return sorted(self.directory.glob("*.speedscope.json"), key=lambda p: p.name)
+
+    def save(self, profile: Profile) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", profile.name).strip("_")[:60]
+        stamp = profile.started_at.strftime("%Y%m%dT%H%M%S%f")
+        path = self.directory / f"{stamp}-{profile.id}-{slug}.speedscope.json"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(orjson.dumps(profile.to_speedscope()))
+        tmp.replace(path)
+        for old in self._files()[:-self.max_files]:
+            old.unlink(missing_ok=True)
+
+    def list(self) -> List[dict]:
+        profiles = []
+        for path in reversed(self._files()):
+            stamp, profile_id, name = path.name[:-len(".speedscope.json")].split("-", 2)
+            profiles.append({
+                "id": profile_id,
+                "name": name,
+                "started_at": datetime.strptime(stamp, "%Y%m%dT%H%M%S%f").replace(tzinfo=timezone.utc),
+                "size": path.stat().st_size,
+            })
+        return profiles
+
+    def path(self, profile_id: str) -> Optional[Path]:
+        if not PROFILE_ID_RE.match(profile_id):
+            return None
+        return next(self.directory.glob(f"*-{profile_id}-*.speedscope.json"), None) if self.directory.exists() else None
+
+
+class ProfilingMiddleware:
+    """Profile requests sent with `X-Profile: 1` by an admin, or a random fraction of all requests"""
+
+    def __init__(
+        self,
+        app,
+        store: ProfileStore,
+        is_admin: Callable[[dict], bool],
+        sample_rate: float = 0.0,
+        interval: float = 0.005,
+    ):
+        self.app = app
+        self.store = store
+        self.is_admin = is_admin
+        self.sample_rate = sample_rate
+        self.sampler = Sampler(interval)
+
+    def _wanted(self, scope) -> bool:
+        if dict(scope["headers"]).get(HEADER) in (b"1", b"true"):
+            return self.is_admin(scope)
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wanted(scope):
+            return await self.app(scope, receive, send)
+
+        profile = self.sampler.start_profile(f"{scope['method']} {scope['path']}")
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile.id.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            self.sampler.stop_profile(profile)
+            try:
+                await asyncio.to_thread(self.store.save, profile)
+            except Exception:
+                logger.exception("Could not write profile %s", profile.id)
@@ -0,0 +1,167 @@
+"""Token-bucket admission control for expensive routes.
+
+Each route has a budget (sustained rate and burst) applied separately to every
+key of a request, typically the acting user and the client IP. A global cap on
+in-flight expensive requests rejects immediately instead of queueing, so a
+burst cannot pile up on the event loop or the Mongo pool.
+
+Every bucket is checked before any is charged, and tokens are only taken once
+the concurrency cap has let the request in, so a 429 never costs tokens.
+
+Some budgets only slow requests down instead of rejecting them: `charge`
+takes a token for an event such as a failed login, and `delay` says how long
+the next request on that key should wait once the bucket is empty. Keys
+anyone can name (a username) use these, so an attacker cannot lock the owner
+out.
+
+Buckets live in a BucketStore. InMemoryBucketStore is per process; a shared
+store (e.g. Redis) only needs to implement `peek` and `take`.
+"""
+import math
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class Budget:
+    rate: float  # tokens per second
+    burst: int
+
+    @classmethod
+    def per_minute(cls, count: int, burst: Optional[int] = None) -> "Budget":
+        return cls(rate=count / 60.0, burst=burst or count)
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, retry_after: float, reason: str):
+        super().__init__(reason)
+        self.retry_after = retry_after
+        self.reason = reason
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class BucketStore:
+    async def peek(self, key: str, budget: Budget, cost: float = 1.0) -> Tuple[bool, float]:
+        """Like take, without consuming anything"""
+        raise NotImplementedError
+
+    async def take(self, key: str, budget: Budget, cost: float = 1.0) -> Tuple[bool, float]:
+        """Consume tokens, returning (allowed, seconds until enough tokens)"""
+        raise NotImplementedError
+
+
+class InMemoryBucketStore(BucketStore):
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def _refill(self, key: str, budget: Budget, now: float) -> float:
+        tokens, updated = self._buckets.get(key, (float(budget.burst), now))
+        return min(float(budget.burst), tokens + (now - updated) * budget.rate)
+
+    async def peek(self, key: str, budget: Budget, cost: float = 1.0) -> Tuple[bool, float]:
+        tokens = self._refill(key, budget, time.monotonic())
+        allowed = tokens >= cost
+        return allowed, 0.0 if allowed else (cost - tokens) / budget.rate
+
+    async def take(self, key: str, budget: Budget, cost: float = 1.0) -> Tuple[bool, float]:
+        now = time.monotonic()
+        tokens = self._refill(key, budget, now)
+        self._buckets.pop(key, None)
+
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        self._buckets[key] = (tokens, now)
+        # Least recently used keys are the ones that have refilled the longest
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+        return allowed, 0.0 if allowed else (cost - tokens) / budget.rate
+
+
+class RateLimiter:
+    def __init__(self, store: BucketStore, budgets: Dict[str, Budget], max_concurrent: int):
+        self.store = store
+        self.budgets = budgets
+        self.max_concurrent = max_concurrent
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.allowed = defaultdict(int)
+        self.limited = defaultdict(int)
+        self.concurrency_rejected = defaultdict(int)
+        self.delayed = defaultdict(int)
+
+    async def check(self, route: str, keys: Iterable[str]) -> None:
+        """Raise if any bucket is empty, without charging any of them"""
+        budget = self.budgets[route]
+        for key in keys:
+            allowed, retry_after = await self.store.peek(f"{route}:{key}", budget)
+            if not allowed:
+                self.limited[route] += 1
+                raise RateLimitExceeded(retry_after, "rate")
+
+    async def admit(self, route: str, keys: Iterable[str]) -> None:
+        """Check every bucket, take a concurrency slot, then charge the buckets.
+        The caller must release() once the request is done."""
+        keys = list(keys)
+        budget = self.budgets[route]
+        await self.check(route, keys)
+        self.acquire(route)
+        try:
+            for key in keys:
+                # Only fails if a shared store was drained by another process since the check
+                allowed, retry_after = await self.store.take(f"{route}:{key}", budget)
+                if not allowed:
+                    self.limited[route] += 1
+                    raise RateLimitExceeded(retry_after, "rate")
+        except BaseException:
+            self.release()
+            raise
+        self.allowed[route] += 1
+
+    async def charge(self, route: str, key: str) -> None:
+        """Take a token without admitting anything; an empty bucket stays empty"""
+        await self.store.take(f"{route}:{key}", self.budgets[route])
+
+    async def delay(self, route: str, key: str, max_delay: float) -> float:
+        """Seconds to hold the request until the bucket has a token, at most max_delay.
+        Never rejects and never charges."""
+        allowed, retry_after = await self.store.peek(f"{route}:{key}", self.budgets[route])
+        if allowed:
+            return 0.0
+        self.delayed[route] += 1
+        return min(retry_after, max_delay)
+
+    def acquire(self, route: str) -> None:
+        if self.in_flight >= self.max_concurrent:
+            self.concurrency_rejected[route] += 1
+            raise RateLimitExceeded(1.0, "concurrency")
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def release(self) -> None:
+        self.in_flight -= 1
+
+    def metrics(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "max_concurrent": self.max_concurrent,
+            "routes": {
+                route: {
+                    "rate_per_minute": round(budget.rate * 60, 2),
+                    "burst": budget.burst,
+                    "allowed": self.allowed[route],
+                    "limited": self.limited[route],
+                    "concurrency_rejected": self.concurrency_rejected[route],
+                    "delayed": self.delayed[route],
+                }
+                for route, budget in self.budgets.items()
+            },
+        }
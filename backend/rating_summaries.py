@@ -0,0 +1,208 @@
+"""Per-user rating summaries.
+
+`rating_summaries` holds one document per rated user (`_id` is the user id)
+with running counters: the overall_score histogram, sum/count per scored
+dimension, true/answered counts per yes/no question, and the same totals
+bucketed by month. Each rating is folded in with a single $inc upsert, which
+Mongo applies atomically to the document, so concurrent ratings never lose
+an update and reads are one _id lookup.
+
+`backfill` rebuilds every summary from the ratings collection. It is a
+deploy step, not part of startup: run it once when the summaries are
+introduced or suspected to have drifted, while rating writes are quiet,
+because a summary replaced by the rebuild drops any $inc from a rating
+created after the aggregation read it.
+
+    python rating_summaries.py
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from pymongo import ReplaceOne
+
+logger = logging.getLogger(__name__)
+
+SCORES = range(1, 6)
+# Scored 1-5, averaged
+SCORE_DIMENSIONS = [
+    "workplace_safety", "communication_quality",
+    "technical_competence", "safety_compliance", "professionalism",
+]
+# Yes/no questions, reported as the share of "yes" answers
+BOOLEAN_DIMENSIONS = ["payment_made", "on_time"]
+TREND_MONTHS = 12
+
+
+def month_key(when: datetime) -> str:
+    if when.tzinfo is not None:
+        when = when.astimezone(timezone.utc)
+    return when.strftime("%Y-%m")
+
+
+def _counters(rating: dict) -> Dict[str, int]:
+    inc = {"count": 1, "sum": rating["overall_score"]}
+    if rating["overall_score"] in SCORES:
+        inc[f"histogram.{rating['overall_score']}"] = 1
+    for name in SCORE_DIMENSIONS:
+        if rating.get(name) is not None:
+            inc[f"dimensions.{name}.sum"] = rating[name]
+            inc[f"dimensions.{name}.count"] = 1
+    for name in BOOLEAN_DIMENSIONS:
+        if rating.get(name) is not None:
+            inc[f"flags.{name}.yes"] = int(rating[name])
+            inc[f"flags.{name}.count"] = 1
+    return inc
+
+
+async def record_rating(db, rating: dict) -> None:
+    month = month_key(rating["created_at"])
+    await db.rating_summaries.update_one(
+        {"_id": rating["to_user_id"]},
+        {
+            "$inc": {
+                **_counters(rating),
+                f"months.{month}.count": 1,
+                f"months.{month}.sum": rating["overall_score"],
+            },
+            "$max": {"last_rating_at": rating["created_at"]},
+        },
+        upsert=True,
+    )
+
+
+def _average(bucket: Optional[dict]) -> Optional[float]:
+    if not bucket or not bucket.get("count"):
+        return None
+    return round(bucket["sum"] / bucket["count"], 2)
+
+
+def format_summary(user_id: str, doc: Optional[dict], now: Optional[datetime] = None) -> dict:
+    doc = doc or {}
+    now = now or datetime.now(timezone.utc)
+    histogram = doc.get("histogram", {})
+
+    # The last TREND_MONTHS calendar months, oldest first, including empty ones
+    months = []
+    year, month = now.year, now.month
+    for _ in range(TREND_MONTHS):
+        months.append(f"{year:04d}-{month:02d}")
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    stored = doc.get("months", {})
+    trend = [
+        {"month": key, "count": stored.get(key, {}).get("count", 0), "average": _average(stored.get(key))}
+        for key in reversed(months)
+    ]
+
+    return {
+        "user_id": user_id,
+        "count": doc.get("count", 0),
+        "average": _average(doc),
+        "histogram": {str(score): histogram.get(str(score), 0) for score in SCORES},
+        "dimensions": {
+            name: {"average": _average(bucket), "count": bucket.get("count", 0)}
+            for name in SCORE_DIMENSIONS
+            for bucket in [doc.get("dimensions", {}).get(name, {})]
+        },
+        "ratios": {
+            name: {
+                "ratio": round(bucket["yes"] / bucket["count"], 3) if bucket.get("count") else None,
+                "count": bucket.get("count", 0),
+            }
+            for name in BOOLEAN_DIMENSIONS
+            for bucket in [doc.get("flags", {}).get(name, {})]
+        },
+        "trend": trend,
+        "last_rating_at": doc.get("last_rating_at"),
+    }
+
+
+async def read_summary(db, user_id: str) -> dict:
+    return format_summary(user_id, await db.rating_summaries.find_one({"_id": user_id}))
+
+
+def build_backfill_pipeline() -> List[dict]:
+    """Run on ratings; emits one fully built summary document per user"""
+    month_fields = {
+        "count": {"$sum": 1},
+        "sum": {"$sum": "$overall_score"},
+        "last_rating_at": {"$max": "$created_at"},
+        **{f"h{score}": {"$sum": {"$cond": [{"$eq": ["$overall_score", score]}, 1, 0]}} for score in SCORES},
+    }
+    for name in SCORE_DIMENSIONS:
+        answered = {"$ne": [{"$ifNull": [f"${name}", None]}, None]}
+        month_fields[f"{name}_sum"] = {"$sum": {"$ifNull": [f"${name}", 0]}}
+        month_fields[f"{name}_count"] = {"$sum": {"$cond": [answered, 1, 0]}}
+    for name in BOOLEAN_DIMENSIONS:
+        month_fields[f"{name}_yes"] = {"$sum": {"$cond": [{"$eq": [f"${name}", True]}, 1, 0]}}
+        month_fields[f"{name}_count"] = {"$sum": {"$cond": [{"$in": [f"${name}", [True, False]]}, 1, 0]}}
+
+    user_fields = {key: {"$max" if key == "last_rating_at" else "$sum": f"${key}"} for key in month_fields}
+    user_fields["months"] = {"$push": {"k": "$_id.month", "v": {"count": "$count", "sum": "$sum"}}}
+
+    return [
+        {"$group": {
+            "_id": {
+                "user": "$to_user_id",
+                # $convert also reads ISO strings migrate_dates.py has not converted yet
+                "month": {"$dateToString": {"format": "%Y-%m", "date": {
+                    "$convert": {"input": "$created_at", "to": "date", "onError": None, "onNull": None},
+                }}},
+            },
+            **month_fields,
+        }},
+        {"$group": {"_id": "$_id.user", **user_fields}},
+        {"$project": {
+            "count": 1,
+            "sum": 1,
+            "last_rating_at": 1,
+            "histogram": {str(score): f"$h{score}" for score in SCORES},
+            "dimensions": {
+                name: {"sum": f"${name}_sum", "count": f"${name}_count"} for name in SCORE_DIMENSIONS
+            },
+            "flags": {
+                name: {"yes": f"${name}_yes", "count": f"${name}_count"} for name in BOOLEAN_DIMENSIONS
+            },
+            "months": {"$arrayToObject": "$months"},
+        }},
+    ]
+
+
+async def backfill(db) -> dict:
+    """Rebuild rating_summaries from scratch with one aggregation"""
+    started_at = datetime.now(timezone.utc)
+    users = 0
+    ops = []
+    async for doc in db.ratings.aggregate(build_backfill_pipeline(), allowDiskUse=True):
+        users += 1
+        ops.append(ReplaceOne({"_id": doc["_id"]}, {**doc, "rebuilt_at": started_at}, upsert=True))
+        if len(ops) >= 1000:
+            await db.rating_summaries.bulk_write(ops, ordered=False)
+            ops = []
+    if ops:
+        await db.rating_summaries.bulk_write(ops, ordered=False)
+    # Users whose ratings are all gone; summaries only written live have no rebuilt_at
+    await db.rating_summaries.delete_many({"rebuilt_at": {"$lt": started_at}})
+    result = {"users": users}
+    logger.info("rating_summaries backfill finished: %s", result)
+    return result
+
+
+async def main() -> None:
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    try:
+        print(await backfill(client[os.environ['DB_NAME']]))
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,246 @@
+"""Reliability score pipeline for worker and employer profiles.
+
+Worker counters (ghosting_count, rejected_job_count, total_jobs_completed) and
+employer counters (cancellation_count, payment_reliability_score) are derived
+from job_applications, jobs and ratings. A full rebuild runs one aggregation
+over all three collections; an incremental run only re-aggregates the users
+touched since the last checkpoint.
+
+Withdrawn applications are split on responded_at, which only
+accept_application sets. Withdrawing after the employer accepted is
+ghosting. Withdrawing before any response means the worker turned the job
+down, and that is what rejected_job_count counts. Applications the employer
+rejected (status "rejected") are not held against the worker.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from pymongo import UpdateOne
+
+import etags
+import job_cards
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_ID = "reliability_scores"
+DEFAULT_PAYMENT_RELIABILITY = 5.0
+
+
+def _flag(condition: dict) -> dict:
+    return {"$cond": [condition, 1, 0]}
+
+
+def build_score_pipeline(user_ids: Optional[List[str]] = None) -> List[dict]:
+    """Aggregation run on job_applications that unions jobs and ratings.
+
+    Emits one row per user with the raw counters needed to compute scores.
+    """
+    def match(field: str) -> List[dict]:
+        return [{"$match": {field: {"$in": user_ids}}}] if user_ids is not None else []
+
+    withdrawn = {"$eq": ["$status", "withdrawn"]}
+    was_accepted = {"$ne": [{"$ifNull": ["$responded_at", None]}, None]}
+
+    return [
+        *match("worker_id"),
+        {"$lookup": {
+            "from": "jobs",
+            "localField": "job_id",
+            "foreignField": "id",
+            "as": "job",
+        }},
+        {"$project": {
+            "_id": 0,
+            "user_id": "$worker_id",
+            # responded_at is only set on acceptance (see the module docstring)
+            "ghosting": _flag({"$and": [withdrawn, was_accepted]}),
+            "rejected": _flag({"$and": [withdrawn, {"$not": [was_accepted]}]}),
+            "completed": _flag({"$and": [
+                {"$eq": ["$status", "accepted"]},
+                {"$eq": [{"$arrayElemAt": ["$job.job_status", 0]}, "completed"]},
+            ]}),
+        }},
+        {"$unionWith": {
+            "coll": "jobs",
+            "pipeline": [
+                *match("employer_id"),
+                {"$project": {
+                    "_id": 0,
+                    "user_id": "$employer_id",
+                    "cancelled": _flag({"$eq": ["$job_status", "cancelled"]}),
+                }},
+            ],
+        }},
+        {"$unionWith": {
+            "coll": "ratings",
+            "pipeline": [
+                {"$match": {
+                    "payment_made": {"$ne": None},
+                    **({"to_user_id": {"$in": user_ids}} if user_ids is not None else {}),
+                }},
+                {"$project": {
+                    "_id": 0,
+                    "user_id": "$to_user_id",
+                    "paid": _flag({"$eq": ["$payment_made", True]}),
+                    "payment_rated": {"$literal": 1},
+                }},
+            ],
+        }},
+        {"$group": {
+            "_id": "$user_id",
+            "ghosting": {"$sum": "$ghosting"},
+            "rejected": {"$sum": "$rejected"},
+            "completed": {"$sum": "$completed"},
+            "cancelled": {"$sum": "$cancelled"},
+            "paid": {"$sum": "$paid"},
+            "payment_rated": {"$sum": "$payment_rated"},
+        }},
+    ]
+
+
+def payment_reliability(paid: int, rated: int) -> float:
+    """Share of worker ratings confirming payment, on the 0-5 rating scale."""
+    if not rated:
+        return DEFAULT_PAYMENT_RELIABILITY
+    return round(DEFAULT_PAYMENT_RELIABILITY * paid / rated, 2)
+
+
+async def _profile_ids(db) -> Set[str]:
+    ids = set()
+    for collection in (db.worker_details, db.employer_details):
+        async for doc in collection.find({}, {"_id": 0, "user_id": 1}).batch_size(5000):
+            ids.add(doc["user_id"])
+    return ids
+
+
+async def _write_back(db, rows: Iterable[dict], reset_ids: Set[str], full: bool = False) -> Dict[str, int]:
+    worker_ops = []
+    employer_ops = []
+    seen = set()
+
+    for row in rows:
+        user_id = row["_id"]
+        seen.add(user_id)
+        worker_ops.append(UpdateOne({"user_id": user_id}, {"$set": {
+            "ghosting_count": row.get("ghosting", 0),
+            "rejected_job_count": row.get("rejected", 0),
+            "total_jobs_completed": row.get("completed", 0),
+        }}))
+        employer_ops.append(UpdateOne({"user_id": user_id}, {"$set": {
+            "cancellation_count": row.get("cancelled", 0),
+            "payment_reliability_score": payment_reliability(
+                row.get("paid", 0), row.get("payment_rated", 0)
+            ),
+        }}))
+
+    # Users with no remaining activity (touched ones, or everyone on a full run) fall back to the defaults
+    for user_id in reset_ids - seen:
+        worker_ops.append(UpdateOne({"user_id": user_id}, {"$set": {
+            "ghosting_count": 0,
+            "rejected_job_count": 0,
+            "total_jobs_completed": 0,
+        }}))
+        employer_ops.append(UpdateOne({"user_id": user_id}, {"$set": {
+            "cancellation_count": 0,
+            "payment_reliability_score": DEFAULT_PAYMENT_RELIABILITY,
+        }}))
+
+    # A user id only has a profile in one of the two collections, so the
+    # update against the other one simply matches nothing.
+    counts = {"workers_updated": 0, "employers_updated": 0}
+    if worker_ops:
+        worker_result, employer_result = await asyncio.gather(
+            db.worker_details.bulk_write(worker_ops, ordered=False),
+            db.employer_details.bulk_write(employer_ops, ordered=False),
+        )
+        counts["workers_updated"] = worker_result.modified_count
+        counts["employers_updated"] = employer_result.modified_count
+        await etags.bump(db, "worker_details", "employer_details")
+    if counts["employers_updated"]:
+        # Jobs embed payment_reliability_score in their employer summary
+        await job_cards.refresh_employer_summaries(db, None if full else seen | reset_ids)
+    return counts
+
+
+async def recompute_for_users(db, user_ids: Iterable[str]) -> Dict[str, int]:
+    """Re-aggregate and write back the scores of the given users."""
+    ids = sorted(set(user_ids))
+    if not ids:
+        return {"users": 0, "workers_updated": 0, "employers_updated": 0}
+    rows = await db.job_applications.aggregate(build_score_pipeline(ids)).to_list(None)
+    counts = await _write_back(db, rows, set(ids))
+    return {"users": len(ids), **counts}
+
+
+async def _changed_user_ids(db, since: datetime) -> Set[str]:
+    changed = {"updated_at": {"$gt": since}}
+    app_workers, job_ids, job_employers, rated_users = await asyncio.gather(
+        db.job_applications.distinct("worker_id", changed),
+        db.jobs.distinct("id", changed),
+        db.jobs.distinct("employer_id", changed),
+        db.ratings.distinct("to_user_id", {
+            "created_at": {"$gt": since},
+            "payment_made": {"$ne": None},
+        }),
+    )
+    # A job status change also moves the counters of its accepted worker
+    job_workers = []
+    if job_ids:
+        job_workers = await db.job_applications.distinct(
+            "worker_id", {"job_id": {"$in": job_ids}, "status": "accepted"}
+        )
+    return set(app_workers) | set(job_employers) | set(rated_users) | set(job_workers)
+
+
+async def run_scoring(db, full: bool = False) -> Dict[str, int]:
+    """Run the scoring pipeline and advance the checkpoint.
+
+    Without a checkpoint, or with full=True, every user is rebuilt.
+    """
+    started_at = datetime.now(timezone.utc)
+    checkpoint = await db.pipeline_checkpoints.find_one({"_id": CHECKPOINT_ID})
+
+    if full or not checkpoint:
+        rows, profile_ids = await asyncio.gather(
+            db.job_applications.aggregate(build_score_pipeline()).to_list(None),
+            _profile_ids(db),
+        )
+        counts = await _write_back(db, rows, profile_ids, full=True)
+        result = {"mode": "full", "users": len(rows), **counts}
+    else:
+        user_ids = await _changed_user_ids(db, checkpoint["last_run_at"])
+        result = {"mode": "incremental", **await recompute_for_users(db, user_ids)}
+
+    # Only advance once the write-back succeeded; anything written while we
+    # were running is newer than started_at and is picked up next time.
+    await db.pipeline_checkpoints.update_one(
+        {"_id": CHECKPOINT_ID},
+        {"$set": {"last_run_at": started_at}},
+        upsert=True,
+    )
+    logger.info("Reliability scoring finished: %s", result)
+    return result
+
+
+async def main(full: bool) -> None:
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    try:
+        result = await run_scoring(client[os.environ['DB_NAME']], full=full)
+        print(result)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(full="--full" in sys.argv[1:]))
@@ -0,0 +1,133 @@
+"""In-process inverted index for Turkish text search.
+
+Text is folded before tokenizing: Turkish-aware lower casing (I -> ı,
+İ -> i) followed by stripping diacritics (ş -> s, ğ -> g, ı -> i, ...), so
+"KAYNAKÇI", "kaynakci" and "Kaynakçı" all hit the same term. Query tokens also match as prefixes,
+which covers Turkish suffixes ("usta" finds "ustası") and search-as-you-type.
+
+All operations are synchronous and touch only in-memory structures, so they
+are safe to call from the event loop without locking.
+"""
+import heapq
+import math
+import re
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+_TURKISH_UPPER = str.maketrans({"I": "ı", "İ": "i"})
+_STRIP_DIACRITICS = str.maketrans({
+    "ı": "i", "ş": "s", "ğ": "g", "ü": "u", "ö": "o", "ç": "c",
+    "â": "a", "î": "i", "û": "u",
+    # lower() turns İ into i + combining dot when not translated first
+    "\u0307": None,
+})
+_TOKEN_RE = re.compile(r"\w+")
+
+# Matches on a prefix count less than a full term match
+PREFIX_WEIGHT = 0.6
+MIN_PREFIX_LENGTH = 2
+
+DocKey = Tuple[str, str]
+
+
+def fold(text: str) -> str:
+    return text.translate(_TURKISH_UPPER).lower().translate(_STRIP_DIACRITICS)
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(fold(text))
+
+
+class SearchIndex:
+    def __init__(self):
+        self._postings: Dict[str, Dict[DocKey, float]] = defaultdict(dict)
+        self._doc_terms: Dict[DocKey, Dict[str, float]] = {}
+        self._doc_meta: Dict[DocKey, dict] = {}
+        self._sorted_terms: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def add(self, doc_type: str, doc_id: str, fields: Iterable[Tuple[str, float]], meta: Optional[dict] = None) -> None:
+        """Index (or re-index) a document from (text, weight) pairs"""
+        key = (doc_type, doc_id)
+        self.remove(doc_type, doc_id)
+
+        weights: Dict[str, float] = defaultdict(float)
+        for text, weight in fields:
+            if text:
+                for term in tokenize(text):
+                    weights[term] += weight
+
+        for term, weight in weights.items():
+            postings = self._postings[term]
+            if not postings:
+                insort(self._sorted_terms, term)
+            postings[key] = weight
+        self._doc_terms[key] = dict(weights)
+        self._doc_meta[key] = meta or {}
+
+    def doc_ids(self, doc_type: str) -> Set[str]:
+        return {doc_id for kind, doc_id in self._doc_terms if kind == doc_type}
+
+    def remove(self, doc_type: str, doc_id: str) -> None:
+        key = (doc_type, doc_id)
+        terms = self._doc_terms.pop(key, None)
+        if terms is None:
+            return
+        self._doc_meta.pop(key, None)
+        for term in terms:
+            postings = self._postings[term]
+            postings.pop(key, None)
+            if not postings:
+                del self._postings[term]
+                del self._sorted_terms[bisect_left(self._sorted_terms, term)]
+
+    def _expand_prefix(self, prefix: str) -> List[str]:
+        start = bisect_left(self._sorted_terms, prefix)
+        end = bisect_left(self._sorted_terms, prefix + "\uffff")
+        return self._sorted_terms[start:end]
+
+    def _term_scores(self, term: str, factor: float, scores: Dict[DocKey, float]) -> None:
+        postings = self._postings.get(term)
+        if not postings:
+            return
+        scale = factor * math.log(1 + len(self._doc_terms) / len(postings))
+        get = scores.get
+        for key, weight in postings.items():
+            # Saturating term frequency, BM25 style
+            score = scale * weight / (weight + 1.2)
+            if score > get(key, 0.0):
+                scores[key] = score
+
+    def search(self, query: str, doc_type: Optional[str] = None, limit: int = 20) -> List[dict]:
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        totals: Optional[Dict[DocKey, float]] = None
+        for token in tokens:
+            token_scores: Dict[DocKey, float] = {}
+            self._term_scores(token, 1.0, token_scores)
+            if len(token) >= MIN_PREFIX_LENGTH:
+                for term in self._expand_prefix(token):
+                    if term != token:
+                        self._term_scores(term, PREFIX_WEIGHT, token_scores)
+
+            # Every query token has to match
+            if totals is None:
+                totals = token_scores
+            else:
+                totals = {key: totals[key] + score for key, score in token_scores.items() if key in totals}
+            if not totals:
+                return []
+
+        ranked = heapq.nsmallest(
+            limit,
+            ((-score, key) for key, score in totals.items() if doc_type is None or key[0] == doc_type),
+        )
+        return [
+            {"type": key[0], "id": key[1], "score": round(-neg_score, 4), **self._doc_meta[key]}
+            for neg_score, key in ranked
+        ]
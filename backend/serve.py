@@ -0,0 +1,91 @@
+"""Production entry point: N uvicorn worker processes on one port.
+
+Workers share nothing. Each one opens its own Mongo pool, builds its own
+search index, candidate pool and caches, and keeps them current through the
+invalidation bus (invalidation.py). Writes made in one worker therefore reach
+the others within a change-stream hop, or a poll interval on a standalone
+server.
+
+The sizing variables in .env are read here as budgets for the whole machine
+and split evenly between the workers. server.py reads the same names as
+per-process values, so running `uvicorn server:app` directly behaves like
+a single worker:
+
+    MONGO_MAX_POOL_SIZE        connections, all workers together (default 100)
+    MONGO_MIN_POOL_SIZE        warm connections, all workers together (default 10)
+    BCRYPT_THREADS             concurrent bcrypt hashes (default: one per core)
+    CPU_PROCESSES              process pool for other CPU-heavy work (default: one per core,
+                               at least one per worker; 0 hashes uploads on threads)
+    EXPENSIVE_MAX_CONCURRENT   admission control for expensive routes (default 32)
+
+Rate limit buckets are kept in memory in each worker, and the kernel spreads
+connections across workers, so a single client can get up to N times its
+per-minute budget.
+
+    python serve.py [--workers 8] [--host 0.0.0.0] [--port 8001]
+"""
+import argparse
+import logging
+import os
+from pathlib import Path
+from typing import Dict
+
+import uvicorn
+from dotenv import load_dotenv
+
+ROOT_DIR = Path(__file__).parent
+
+logger = logging.getLogger(__name__)
+
+
+def cpu_processes(workers: int, cpus: int, env: Dict[str, str]) -> int:
+    """Per-worker process pool size; an explicit 0 turns the pools off"""
+    budget = int(env.get('CPU_PROCESSES', cpus))
+    return max(1, budget // workers) if budget > 0 else 0
+
+
+def worker_settings(workers: int, cpus: int, env: Dict[str, str]) -> Dict[str, str]:
+    """Per-worker values for the machine-wide budgets in env"""
+    def share(name: str, default: int, minimum: int = 1) -> int:
+        return max(minimum, int(env.get(name, default)) // workers)
+
+    max_pool = share('MONGO_MAX_POOL_SIZE', 100)
+    return {
+        'MONGO_MAX_POOL_SIZE': str(max_pool),
+        'MONGO_MIN_POOL_SIZE': str(min(max_pool, share('MONGO_MIN_POOL_SIZE', 10, minimum=0))),
+        'BCRYPT_THREADS': str(share('BCRYPT_THREADS', cpus)),
+        'CPU_PROCESSES': str(cpu_processes(workers, cpus, env)),
+        'EXPENSIVE_MAX_CONCURRENT': str(share('EXPENSIVE_MAX_CONCURRENT', 32)),
+    }
+
+
+def main() -> None:
+    load_dotenv(ROOT_DIR / '.env')
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=int(os.environ.get('WEB_CONCURRENCY', cpus)))
+    parser.add_argument("--host", default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument("--port", type=int, default=int(os.environ.get('PORT', '8001')))
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+    workers = max(1, args.workers)
+
+    settings = worker_settings(workers, cpus, dict(os.environ))
+    # Workers inherit the environment, and server.py's load_dotenv does not override it
+    os.environ.update(settings)
+    logger.info("Starting %d workers on %d cores, each with %s", workers, cpus, settings)
+
+    uvicorn.run(
+        "server:app",
+        app_dir=str(ROOT_DIR),
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        proxy_headers=True,
+        log_level=args.log_level,
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
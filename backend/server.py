@@ -1,33 +1,71 @@
-from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Form, Depends, status
-from fastapi.staticfiles import StaticFiles
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Form, Depends, Header, Request, status
+from fastapi.responses import FileResponse, ORJSONResponse, Response, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import asyncio
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict, field_validator
 from typing import List, Optional, Dict, Any
 from enum import Enum
 import uuid
+import time
 from datetime import datetime, timezone, timedelta
-import hashlib
+import mimetypes
+import csv
+import io
+import orjson
 import shutil
+import functools
 from passlib.context import CryptContext
 import jwt
 from bson import ObjectId
+from pymongo import DeleteMany, UpdateOne
+from pymongo.errors import OperationFailure
+
+import candidate_pool
+import compression
+import cpu_pool
+import etags
+import geo
+import idempotency
+import invalidation
+import job_cards
+import job_states
+import marketplace_stats
+import migrate_worker_skills
+import outbox
+import pagination
+import profiling
+import rating_summaries
+import ratelimit
+import reliability
+import search_index
+import storage
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
+# MongoDB connection, opened by the lifespan handler
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '10'))
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', '100'))
+client: Optional[AsyncIOMotorClient] = None
+db = None
+
+# Background queue for derived writes, bound to the database on startup
+outbox_queue = outbox.Outbox(None, concurrency=int(os.environ.get('OUTBOX_WORKERS', '2')))
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Capped bcrypt threads and the optional process pool for other CPU-heavy work,
+# sized per process (serve.py splits the machine between workers)
+cpu = cpu_pool.from_env()
+
 # JWT settings
 SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'ustabul-secret-key-change-in-production')
 ALGORITHM = "HS256"
@@ -35,13 +73,100 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 
 # Upload directory
 UPLOAD_DIR = Path("/app/uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
+# Uploads land here first and are moved into the sharded layout once hashed
+UPLOAD_INCOMING_DIR = UPLOAD_DIR / ".incoming"
+blob_store = storage.create_blob_store(UPLOAD_DIR)
+
+# Request profiles, kept as a ring buffer of speedscope files
+profile_store = profiling.ProfileStore(
+    Path(os.environ.get('PROFILE_DIR', '/app/profiles')),
+    max_files=int(os.environ.get('PROFILE_MAX_FILES', '50')),
+)
 
-# Create the main app without a prefix
-app = FastAPI(title="UstaBul API")
+# Full-text search over jobs, skill categories and employers
+text_index = search_index.SearchIndex()
+
+# Worker counts per skill and location, shown to employers when posting
+candidates = candidate_pool.CandidatePool()
 
-# Mount uploads directory
-app.mount("/uploads", StaticFiles(directory=str(UPLOAD_DIR)), name="uploads")
+# Change feed for the in-memory caches above, bound to the database on startup
+invalidation_bus = invalidation.InvalidationBus(
+    None,
+    ["jobs", "employer_details", "worker_details", "worker_skills", "skill_categories"],
+    # The candidate pool needs the worker id of deleted documents
+    pre_images=["worker_details", "worker_skills"],
+)
+
+# Admission control for expensive routes
+rate_limiter = ratelimit.RateLimiter(
+    store=ratelimit.InMemoryBucketStore(),
+    budgets={
+        # Hard limit per IP and per username+IP
+        "login": ratelimit.Budget.per_minute(10, burst=5),
+        # Failed logins per username, which only slow further attempts down
+        "login_failures": ratelimit.Budget.per_minute(5, burst=5),
+        "upload": ratelimit.Budget.per_minute(20, burst=5),
+        "apply": ratelimit.Budget.per_minute(30, burst=10),
+        "rating": ratelimit.Budget.per_minute(10, burst=5),
+    },
+    max_concurrent=int(os.environ.get('EXPENSIVE_MAX_CONCURRENT', '32')),
+)
+MAX_USER_DELAY = 5.0  # seconds
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open and warm every shared resource before the app reports ready"""
+    global client, db
+    app.state.ready = False
+    started = time.perf_counter()
+    
+    UPLOAD_INCOMING_DIR.mkdir(parents=True, exist_ok=True)
+    cpu.start()
+    
+    # tz_aware so stored dates come back as UTC-aware datetimes
+    client = AsyncIOMotorClient(
+        mongo_url,
+        tz_aware=True,
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+    )
+    db = client[os.environ['DB_NAME']]
+    await db.command("ping")
+    
+    await create_indexes()
+    await asyncio.gather(
+        get_skill_categories_by_id(),
+        build_search_index(),
+        load_candidate_pool(),
+        # First bcrypt call loads the backend; pay for it before traffic arrives
+        cpu.bcrypt(hash_password, "warm-up"),
+        cpu.warm_up(),
+    )
+    outbox_queue.start(db)
+    invalidation_bus.start(db)
+    expiry_sweeps = asyncio.create_task(marketplace_stats.run_expiry_sweeps(lambda: db))
+    
+    app.state.ready = True
+    logger.info("Startup finished in %.2f s", time.perf_counter() - started)
+    try:
+        yield
+    finally:
+        # Fail readiness first so the load balancer drains us
+        app.state.ready = False
+        expiry_sweeps.cancel()
+        await asyncio.gather(expiry_sweeps, return_exceptions=True)
+        await outbox_queue.stop()
+        await invalidation_bus.stop()
+        client.close()
+        await cpu.shutdown()
+
+# Retried POSTs carrying an Idempotency-Key are answered from the stored response
+IDEMPOTENT_PATHS = ["/api/jobs", "/api/jobs/apply", "/api/ratings", "/api/portfolio/upload"]
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', str(24 * 3600)))
+
+# Create the main app without a prefix
+app = FastAPI(title="UstaBul API", default_response_class=ORJSONResponse, lifespan=lifespan)
+app.add_exception_handler(etags.NotModified, etags.not_modified_handler)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -133,6 +258,8 @@ class WorkerDetails(BaseModel):
     rejected_job_count: int = 0
     total_jobs_completed: int = 0
     average_rating: float = 0.0
+    location: Optional[Dict[str, Any]] = None
+    location_precision: Optional[str] = None
 
 class EmployerDetailsCreate(BaseModel):
     company_name: str
@@ -154,6 +281,8 @@ class EmployerDetails(BaseModel):
     cancellation_count: int = 0
     total_jobs_posted: int = 0
     average_rating: float = 0.0
+    location: Optional[Dict[str, Any]] = None
+    location_precision: Optional[str] = None
 
 class SkillCategory(BaseModel):
     id: str
@@ -215,6 +344,14 @@ class Job(BaseModel):
     created_at: datetime
     expires_at: datetime
     view_count: int = 0
+    employer: Optional[Dict[str, Any]] = None
+    location: Optional[Dict[str, Any]] = None
+    assigned_worker_id: Optional[str] = None
+    dispute_status: DisputeStatus = DisputeStatus.NONE
+
+class JobTransitionCreate(BaseModel):
+    action: str
+    reason: Optional[str] = None
 
 class JobApplicationCreate(BaseModel):
     job_id: str
@@ -292,22 +429,466 @@ async def get_current_user(token: str) -> dict:
         return {"user_id": user_id, "role": payload.get("role")}
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
-    except jwt.JWTError:
+    except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-def calculate_image_hash(file_path: Path) -> str:
-    """Calculate SHA256 hash of image file"""
-    sha256_hash = hashlib.sha256()
-    with open(file_path, "rb") as f:
-        for byte_block in iter(lambda: f.read(4096), b""):
-            sha256_hash.update(byte_block)
-    return sha256_hash.hexdigest()
+async def require_admin(authorization: Optional[str] = Header(None)) -> dict:
+    if not authorization or not authorization.lower().startswith("bearer "):
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    current_user = await get_current_user(authorization.split(" ", 1)[1])
+    if current_user["role"] != UserRole.ADMIN.value:
+        raise HTTPException(status_code=403, detail="Bu işlem için yetkiniz yok")
+    return current_user
+
+def is_admin_scope(scope: dict) -> bool:
+    """Admin check for ASGI middleware, which runs outside the dependency system"""
+    authorization = dict(scope["headers"]).get(b"authorization", b"").decode("latin-1")
+    if not authorization.lower().startswith("bearer "):
+        return False
+    try:
+        payload = jwt.decode(authorization.split(" ", 1)[1], SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.InvalidTokenError:
+        return False
+    return payload.get("role") == UserRole.ADMIN.value
+
+def client_ip(request: Request) -> str:
+    # uvicorn's proxy_headers already applied X-Forwarded-For from trusted proxies only
+    return request.client.host if request.client else "unknown"
+
+def query_user_key(request: Request) -> Optional[str]:
+    """Acting user of a request when the route takes it as a query parameter"""
+    for name in ("worker_id", "from_user_id", "employer_id", "user_id"):
+        if name in request.query_params:
+            return request.query_params[name]
+    return None
+
+async def body_user_key(request: Request) -> Optional[str]:
+    """Acting user of a request when the route takes it as a form or JSON field"""
+    content_type = request.headers.get("content-type", "")
+    # Both are cached on the request, so the handler does not re-read the body
+    if content_type.startswith(("multipart/form-data", "application/x-www-form-urlencoded")):
+        return (await request.form()).get("worker_id")
+    if content_type.startswith("application/json"):
+        try:
+            body = await request.json()
+        except ValueError:
+            return None
+        return body.get("username") if isinstance(body, dict) else None
+    return None
+
+def admission(route: str, delay_route: Optional[str] = None):
+    """Per-user and per-IP token buckets plus the global concurrency cap.
+
+    With delay_route the user bucket is keyed on user and IP together, and the
+    user alone only delays the request (up to MAX_USER_DELAY) while its
+    delay_route bucket is empty, so nobody can get another user rejected.
+    """
+    async def dependency(request: Request):
+        ip = client_ip(request)
+        keys = [f"ip:{ip}"]
+        user_key = query_user_key(request)
+        try:
+            if user_key is None:
+                # Reject on the IP bucket before reading a possibly large body for the user
+                await rate_limiter.check(route, keys)
+                user_key = await body_user_key(request)
+            if user_key and delay_route:
+                keys.append(f"user:{user_key}|ip:{ip}")
+                await rate_limiter.check(route, keys)
+                # Waits before taking a concurrency slot, so delayed requests do not hold one
+                await asyncio.sleep(await rate_limiter.delay(delay_route, f"user:{user_key}", MAX_USER_DELAY))
+            elif user_key:
+                keys.append(f"user:{user_key}")
+            await rate_limiter.admit(route, keys)
+        except ratelimit.RateLimitExceeded as exc:
+            raise HTTPException(
+                status_code=429,
+                detail="Çok fazla istek gönderdiniz, lütfen daha sonra tekrar deneyin",
+                headers={"Retry-After": exc.retry_after_header},
+            )
+        try:
+            yield
+        finally:
+            rate_limiter.release()
+    return dependency
+
+def as_datetime(value: Any) -> Optional[datetime]:
+    """Accept legacy ISO strings for documents not yet migrated by migrate_dates.py"""
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return value
+
+def fast_json(content: Any, headers: Optional[Dict[str, str]] = None) -> ORJSONResponse:
+    """Serialize trusted DB reads with orjson, skipping jsonable_encoder"""
+    return ORJSONResponse(content, headers=headers)
+
+LIST_CHUNK_BYTES = 64 * 1024
+
+async def json_array_stream(cursor):
+    """Encode cursor rows as one JSON array in ~64KB chunks; only one batch is held in memory"""
+    chunk = bytearray(b"[")
+    separator = b""
+    async for doc in cursor:
+        chunk += separator
+        chunk += orjson.dumps(doc)
+        separator = b","
+        if len(chunk) >= LIST_CHUNK_BYTES:
+            yield bytes(chunk)
+            chunk.clear()
+    chunk += b"]"
+    yield bytes(chunk)
+
+async def fetch_page(
+    collection,
+    query: dict,
+    date_field: str,
+    limit: Optional[int],
+    cursor: Optional[str],
+    tie_field: str = "id",
+    projection: Optional[dict] = None,
+):
+    """One newest-first keyset page: (rows, next cursor or None, total count)"""
+    try:
+        paged_query = pagination.page_query(query, date_field, cursor, tie_field)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Geçersiz sayfa imleci")
+    limit = max(1, min(limit or pagination.MAX_PAGE_SIZE, pagination.MAX_PAGE_SIZE))
+    total, rows = await asyncio.gather(
+        collection.count_documents(query),
+        collection.find(paged_query, projection or {"_id": 0})
+        .sort(pagination.sort_keys(date_field, tie_field)).limit(limit + 1).to_list(limit + 1),
+    )
+    page, next_cursor = pagination.split_page(rows, date_field, limit, tie_field)
+    return page, next_cursor, total
+
+async def list_response(
+    collection,
+    query: dict,
+    date_field: str,
+    limit: Optional[int],
+    cursor: Optional[str],
+    tie_field: str = "id",
+    headers: Optional[Dict[str, str]] = None,
+    projection: Optional[dict] = None,
+):
+    """Newest-first listing: a keyset page when limit or cursor is given, else the
+    whole listing streamed as a JSON array. X-Total-Count always counts everything."""
+    headers = dict(headers or {})
+    projection = projection or {"_id": 0}
+    
+    if limit is None and cursor is None:
+        headers["X-Total-Count"] = str(await collection.count_documents(query))
+        rows = collection.find(query, projection).sort(pagination.sort_keys(date_field, tie_field)).batch_size(500)
+        return StreamingResponse(json_array_stream(rows), media_type="application/json", headers=headers)
+    
+    page, next_cursor, total = await fetch_page(collection, query, date_field, limit, cursor, tie_field, projection)
+    headers["X-Total-Count"] = str(total)
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return fast_json(page, headers)
+
+def model_defaults(model: type) -> dict:
+    return {
+        name: field.default
+        for name, field in model.model_fields.items()
+        if not field.is_required()
+    }
+
+def fields_projection(fields: Optional[str], allowed: set) -> dict:
+    """Build a Mongo projection from a comma separated `fields` query parameter"""
+    if not fields:
+        return {"_id": 0}
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Geçersiz alan: {', '.join(unknown)}")
+    return {"_id": 0, **{f: 1 for f in requested}}
+
+def near_center(
+    lat: Optional[float], lon: Optional[float], city: Optional[str], district: Optional[str], radius_km: float
+) -> Optional[geo.LonLat]:
+    """Centre of a nearby query from lat/lon or a city/district name, None when not asked for"""
+    if radius_km <= 0:
+        raise HTTPException(status_code=400, detail="Yarıçap sıfırdan büyük olmalı")
+    try:
+        return geo.resolve_near(lat, lon, city, district)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Geçersiz konum")
+
+async def find_nearby(collection, center: geo.LonLat, radius_km: float, query: dict, projection: dict, skip: int, limit: int):
+    """Documents within radius_km of center, nearest first, each with distance_km"""
+    if len(projection) > 1:
+        projection = {**projection, "distance_km": 1}
+    pipeline = [
+        geo.near_stage(center, radius_km, query),
+        {"$skip": skip},
+        {"$limit": limit},
+        {"$project": projection},
+    ]
+    return await collection.aggregate(pipeline).to_list(limit)
+
+# Fields that Pydantic would fill in for documents written before they existed
+WORKER_DETAILS_DEFAULTS = model_defaults(WorkerDetails)
+EMPLOYER_DETAILS_DEFAULTS = model_defaults(EmployerDetails)
+
+# Skill categories change rarely, so lookups are served from memory
+SKILL_CATEGORY_CACHE_TTL = 300  # seconds
+# `version` is the skill_categories counter read before the documents were loaded
+_skill_category_cache = {"by_id": {}, "tree": [], "loaded_at": None, "version": None}
+
+def build_skill_tree(categories: List[dict]) -> List[dict]:
+    tree = []
+    category_map = {cat["id"]: {**cat, "children": []} for cat in categories}
+    
+    for cat in categories:
+        if cat["parent_id"] is None:
+            tree.append(category_map[cat["id"]])
+        else:
+            if cat["parent_id"] in category_map:
+                category_map[cat["parent_id"]]["children"].append(category_map[cat["id"]])
+    
+    return tree
+
+async def _load_skill_categories(version: Optional[int] = None):
+    """Reload after the TTL, or at once when the caller saw a newer version"""
+    loaded_at = _skill_category_cache["loaded_at"]
+    moved = version is not None and version != _skill_category_cache["version"]
+    if moved or loaded_at is None or time.monotonic() - loaded_at > SKILL_CATEGORY_CACHE_TTL:
+        if version is None:
+            version = (await etags.read_versions(db, ["skill_categories"])).get("skill_categories", 0)
+        categories = await db.skill_categories.find({}, {"_id": 0}).sort("display_order", 1).to_list(None)
+        _skill_category_cache["by_id"] = {cat["id"]: cat for cat in categories}
+        _skill_category_cache["tree"] = build_skill_tree(categories)
+        _skill_category_cache["loaded_at"] = time.monotonic()
+        _skill_category_cache["version"] = version
+
+async def get_skill_categories_by_id() -> Dict[str, dict]:
+    await _load_skill_categories()
+    return _skill_category_cache["by_id"]
+
+def invalidate_skill_category_cache():
+    _skill_category_cache["loaded_at"] = None
+
+async def validate_skill_category_ids(category_ids: List[str]):
+    known = await get_skill_categories_by_id()
+    unknown = sorted(set(category_ids) - known.keys())
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Geçersiz yetenek kategorisi: {', '.join(unknown)}")
+
+# Search indexing
+def index_job(job: dict, into: Optional[search_index.SearchIndex] = None):
+    (text_index if into is None else into).add(
+        "job", job["id"],
+        [(job.get("title"), 3.0), (job.get("description"), 1.0)],
+        {"title": job.get("title"), "job_status": job.get("job_status")},
+    )
+
+def index_employer(employer: dict, into: Optional[search_index.SearchIndex] = None):
+    (text_index if into is None else into).add(
+        "employer", employer["user_id"],
+        [(employer.get("company_name"), 3.0), (employer.get("sector"), 1.0)],
+        {"title": employer.get("company_name"), "city": employer.get("city")},
+    )
+
+def index_skill_category(category: dict, into: Optional[search_index.SearchIndex] = None):
+    (text_index if into is None else into).add(
+        "skill", category["id"],
+        [(category.get("category_name"), 3.0)],
+        {"title": category.get("category_name"), "category_level": category.get("category_level")},
+    )
+
+# Collection -> (doc type, indexer, id field) for everything in the search index
+SEARCH_SOURCES = {
+    "jobs": ("job", index_job, "id"),
+    "employer_details": ("employer", index_employer, "user_id"),
+    "skill_categories": ("skill", index_skill_category, "id"),
+}
+SEARCH_PROJECTION = {"_id": 0, "id": 1, "user_id": 1, "title": 1, "description": 1, "job_status": 1,
+                     "company_name": 1, "sector": 1, "city": 1, "category_name": 1, "category_level": 1}
+
+async def build_search_index():
+    """Build a fresh index and swap it in, so searches keep working during a rebuild"""
+    global text_index
+    fresh = search_index.SearchIndex()
+    for collection, (_, index, _) in SEARCH_SOURCES.items():
+        async for doc in db[collection].find({}, SEARCH_PROJECTION).batch_size(1000):
+            index(doc, fresh)
+    text_index = fresh
+    logger.info("Search index built with %d documents", len(text_index))
+
+async def reindex_collection(collection: str):
+    """Re-read one collection into the live index and drop its documents that are gone"""
+    doc_type, index, id_field = SEARCH_SOURCES[collection]
+    stale = text_index.doc_ids(doc_type)
+    async for doc in db[collection].find({}, SEARCH_PROJECTION).batch_size(1000):
+        index(doc)
+        stale.discard(doc[id_field])
+    for doc_id in stale:
+        text_index.remove(doc_type, doc_id)
+    logger.info("Search index: %s reindexed, %d removed", collection, len(stale))
+
+async def load_candidate_pool():
+    """Stream the workers into a fresh pool and swap it in, like build_search_index"""
+    global candidates
+    loader = candidate_pool.PoolLoader(await get_skill_categories_by_id())
+    async for worker in db.worker_details.find({}, {"_id": 0, "user_id": 1, "city": 1, "district": 1}).batch_size(5000):
+        loader.add_worker(worker)
+    async for skill in db.worker_skills.find({}, {"_id": 0, "worker_id": 1, "skill_category_id": 1}).batch_size(5000):
+        loader.add_skill(skill)
+    candidates = loader.finish()
+
+# Invalidation consumers: keep this process's caches in step with writes made elsewhere.
+# Deletes only carry the _id; without a pre-image they fall back to a (debounced) reload
+# of the collection that changed.
+reindex_search = {
+    collection: invalidation.debounce(functools.partial(reindex_collection, collection), 5.0)
+    for collection in SEARCH_SOURCES
+}
+reload_candidate_pool = invalidation.debounce(load_candidate_pool, 5.0)
+
+@invalidation_bus.subscribe("jobs")
+def on_job_change(event: invalidation.ChangeEvent):
+    if event.document is not None:
+        index_job(event.document)
+    else:
+        reindex_search["jobs"]()
+
+@invalidation_bus.subscribe("employer_details")
+def on_employer_change(event: invalidation.ChangeEvent):
+    if event.document is not None:
+        index_employer(event.document)
+    else:
+        reindex_search["employer_details"]()
+
+@invalidation_bus.subscribe("skill_categories")
+def on_skill_category_change(event: invalidation.ChangeEvent):
+    invalidate_skill_category_cache()
+    reindex_search["skill_categories"]()
+    # Category parents decide which ancestor bitsets a skill sets
+    reload_candidate_pool()
+
+@invalidation_bus.subscribe("worker_details")
+def on_worker_change(event: invalidation.ChangeEvent):
+    if event.document is not None:
+        candidates.set_location(event.document["user_id"], event.document.get("city"), event.document.get("district"))
+    elif event.previous is not None:
+        # The profile is gone
+        candidates.remove_worker(event.previous["user_id"])
+    else:
+        reload_candidate_pool()
+
+@invalidation_bus.subscribe("worker_skills")
+async def on_worker_skill_change(event: invalidation.ChangeEvent):
+    source = event.document or event.previous
+    if source is None:
+        reload_candidate_pool()
+        return
+    # Re-read the worker's skills, so a delete and a later insert land the same way
+    worker_id = source["worker_id"]
+    skills = await db.worker_skills.find({"worker_id": worker_id}, {"_id": 0, "skill_category_id": 1}).to_list(None)
+    candidates.set_skills(worker_id, [skill["skill_category_id"] for skill in skills])
+
+# Outbox handlers, applied in bulk by the background workers
+@outbox_queue.handler("employer_job_posted")
+async def refresh_jobs_posted(payloads: List[dict]):
+    employer_ids = list({p["employer_id"] for p in payloads})
+    counts = await db.jobs.aggregate([
+        {"$match": {"employer_id": {"$in": employer_ids}}},
+        {"$group": {"_id": "$employer_id", "count": {"$sum": 1}}},
+    ]).to_list(None)
+    # Counting from the jobs collection keeps retries idempotent
+    ops = [UpdateOne({"user_id": row["_id"]}, {"$set": {"total_jobs_posted": row["count"]}}) for row in counts]
+    if ops:
+        await db.employer_details.bulk_write(ops, ordered=False)
+        await etags.bump(db, "employer_details")
+
+@outbox_queue.handler("new_application")
+async def notify_new_applications(payloads: List[dict]):
+    job_ids = list({p["job_id"] for p in payloads})
+    jobs = await db.jobs.find({"id": {"$in": job_ids}}, {"_id": 0, "id": 1, "employer_id": 1, "title": 1}).to_list(None)
+    jobs_by_id = {job["id"]: job for job in jobs}
+    
+    ops = []
+    for p in payloads:
+        job = jobs_by_id.get(p["job_id"])
+        if not job:
+            continue
+        notif_dict = {
+            # Derived from the application so a retried batch does not notify twice
+            "id": str(uuid.uuid5(uuid.NAMESPACE_URL, f"new_application:{p['application_id']}")),
+            "user_id": job["employer_id"],
+            "type": "new_application",
+            "title": "Yeni Başvuru",
+            "message": f"{job['title']} ilanınıza yeni bir başvuru yapıldı",
+            "related_job_id": job["id"],
+            "is_read": False,
+            "created_at": p["applied_at"]
+        }
+        ops.append(UpdateOne({"id": notif_dict["id"]}, {"$setOnInsert": notif_dict}, upsert=True))
+    if ops:
+        await db.notifications.bulk_write(ops, ordered=False)
+        await etags.bump(db, *(f"notifications:{job['employer_id']}" for job in jobs))
+
+@outbox_queue.handler("job_event")
+async def apply_job_events(payloads: List[dict]):
+    """Recompute the status-derived counters of everyone the events touched"""
+    events = await db.job_events.find(
+        {"id": {"$in": [p["event_id"] for p in payloads]}},
+        {"_id": 0, "job_id": 1, "employer_id": 1, "worker_id": 1},
+    ).to_list(None)
+    user_ids = {event["employer_id"] for event in events}
+    user_ids.update(event["worker_id"] for event in events if event.get("worker_id"))
+    # Jobs matched before the worker was stored on the job document
+    legacy_job_ids = [event["job_id"] for event in events if not event.get("worker_id")]
+    if legacy_job_ids:
+        user_ids.update(await db.job_applications.distinct(
+            "worker_id", {"job_id": {"$in": legacy_job_ids}, "status": ApplicationStatus.ACCEPTED.value}
+        ))
+    await reliability.recompute_for_users(db, user_ids)
+
+@outbox_queue.handler("rating_created")
+async def refresh_average_ratings(payloads: List[dict]):
+    user_ids = list({p["to_user_id"] for p in payloads})
+    # The summaries already hold the running sum and count
+    summaries = await db.rating_summaries.find(
+        {"_id": {"$in": user_ids}, "count": {"$gt": 0}}, {"count": 1, "sum": 1}
+    ).to_list(None)
+    # A user has details in only one of the collections, the other update is a no-op
+    ops = [
+        UpdateOne({"user_id": row["_id"]}, {"$set": {"average_rating": row["sum"] / row["count"]}})
+        for row in summaries
+    ]
+    if ops:
+        await asyncio.gather(
+            db.worker_details.bulk_write(ops, ordered=False),
+            db.employer_details.bulk_write(ops, ordered=False),
+        )
+        await etags.bump(db, "worker_details", "employer_details")
+        await job_cards.refresh_employer_summaries(db, user_ids)
 
 # Routes
 @api_router.get("/")
 async def root():
     return {"message": "UstaBul API v1.0", "status": "running"}
 
+# Health routes
+@api_router.get("/health/live")
+async def health_live():
+    return {"status": "ok"}
+
+@api_router.get("/health/ready")
+async def health_ready(request: Request):
+    if not getattr(request.app.state, "ready", False):
+        return ORJSONResponse({"status": "starting"}, status_code=503)
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(db.command("ping"), timeout=2)
+    except Exception as exc:
+        # The probe is unauthenticated, so the reason only goes to the log
+        logger.warning("Readiness check failed: %r", exc)
+        return ORJSONResponse({"status": "unavailable"}, status_code=503)
+    return {"status": "ready", "db_ping_ms": round((time.perf_counter() - started) * 1000, 2)}
+
 # Auth routes
 @api_router.post("/auth/register", response_model=Token)
 async def register(user_create: UserCreate):
@@ -320,10 +901,10 @@ async def register(user_create: UserCreate):
     user_dict = {
         "id": user_id,
         "username": user_create.username,
-        "password_hash": hash_password(user_create.password),
+        "password_hash": await cpu.bcrypt(hash_password, user_create.password),
         "role": user_create.role.value,
         "account_status": AccountStatus.ACTIVE.value,
-        "created_at": datetime.now(timezone.utc).isoformat(),
+        "created_at": datetime.now(timezone.utc),
         "last_login": None
     }
     
@@ -342,16 +923,17 @@ async def register(user_create: UserCreate):
     
     return Token(access_token=access_token, token_type="bearer", user=user)
 
-@api_router.post("/auth/login", response_model=Token)
+@api_router.post("/auth/login", response_model=Token, dependencies=[Depends(admission("login", "login_failures"))])
 async def login(user_login: UserLogin):
     user_doc = await db.users.find_one({"username": user_login.username})
-    if not user_doc or not verify_password(user_login.password, user_doc["password_hash"]):
+    if not user_doc or not await cpu.bcrypt(verify_password, user_login.password, user_doc["password_hash"]):
+        await rate_limiter.charge("login_failures", f"user:{user_login.username}")
         raise HTTPException(status_code=401, detail="Kullanıcı adı veya şifre hatalı")
     
     # Update last login
     await db.users.update_one(
         {"id": user_doc["id"]},
-        {"$set": {"last_login": datetime.now(timezone.utc).isoformat()}}
+        {"$set": {"last_login": datetime.now(timezone.utc)}}
     )
     
     access_token = create_access_token({"sub": user_doc["id"], "role": user_doc["role"]})
@@ -361,8 +943,8 @@ async def login(user_login: UserLogin):
         username=user_doc["username"],
         role=UserRole(user_doc["role"]),
         account_status=AccountStatus(user_doc["account_status"]),
-        created_at=datetime.fromisoformat(user_doc["created_at"]),
-        last_login=datetime.fromisoformat(user_doc["last_login"]) if user_doc.get("last_login") else None
+        created_at=as_datetime(user_doc["created_at"]),
+        last_login=as_datetime(user_doc.get("last_login"))
     )
     
     return Token(access_token=access_token, token_type="bearer", user=user)
@@ -377,8 +959,11 @@ async def create_worker_details(details: WorkerDetailsCreate, user_id: str):
     details_dict["rejected_job_count"] = 0
     details_dict["total_jobs_completed"] = 0
     details_dict["average_rating"] = 0.0
+    details_dict.update(geo.location_fields(details.city, details.district))
     
     await db.worker_details.insert_one(details_dict)
+    await etags.bump(db, "worker_details")
+    candidates.set_location(user_id, details.city, details.district)
     return {"message": "Usta profili oluşturuldu", "user_id": user_id}
 
 @api_router.get("/workers/{worker_id}", response_model=WorkerDetails)
@@ -386,12 +971,29 @@ async def get_worker_details(worker_id: str):
     worker = await db.worker_details.find_one({"user_id": worker_id}, {"_id": 0})
     if not worker:
         raise HTTPException(status_code=404, detail="Usta bulunamadı")
-    return WorkerDetails(**worker)
+    return fast_json({**WORKER_DETAILS_DEFAULTS, **worker})
 
 @api_router.get("/workers")
-async def get_all_workers(skip: int = 0, limit: int = 50):
-    workers = await db.worker_details.find({}, {"_id": 0}).skip(skip).limit(limit).to_list(limit)
-    return workers
+async def get_all_workers(
+    request: Request,
+    skip: int = 0,
+    limit: int = 50,
+    fields: Optional[str] = None,
+    near_lat: Optional[float] = None,
+    near_lon: Optional[float] = None,
+    near_city: Optional[str] = None,
+    near_district: Optional[str] = None,
+    radius_km: float = geo.DEFAULT_RADIUS_KM,
+):
+    """With a near_* point, workers within radius_km, nearest first with distance_km"""
+    center = near_center(near_lat, near_lon, near_city, near_district, radius_km)
+    headers = await etags.check(db, request, "worker_details")
+    projection = fields_projection(fields, set(WorkerDetails.model_fields))
+    if center:
+        workers = await find_nearby(db.worker_details, center, radius_km, {}, projection, skip, limit)
+    else:
+        workers = await db.worker_details.find({}, projection).skip(skip).limit(limit).to_list(limit)
+    return fast_json(workers, headers)
 
 # Employer routes
 @api_router.post("/employers/details")
@@ -402,8 +1004,12 @@ async def create_employer_details(details: EmployerDetailsCreate, user_id: str):
     details_dict["cancellation_count"] = 0
     details_dict["total_jobs_posted"] = 0
     details_dict["average_rating"] = 0.0
+    details_dict.update(geo.location_fields(details.city, details.district))
     
     await db.employer_details.insert_one(details_dict)
+    index_employer(details_dict)
+    await etags.bump(db, "employer_details")
+    await job_cards.refresh_employer_summaries(db, [user_id])
     return {"message": "İşveren profili oluşturuldu", "user_id": user_id}
 
 @api_router.get("/employers/{employer_id}", response_model=EmployerDetails)
@@ -411,54 +1017,83 @@ async def get_employer_details(employer_id: str):
     employer = await db.employer_details.find_one({"user_id": employer_id}, {"_id": 0})
     if not employer:
         raise HTTPException(status_code=404, detail="İşveren bulunamadı")
-    return EmployerDetails(**employer)
+    return fast_json({**EMPLOYER_DETAILS_DEFAULTS, **employer})
 
 @api_router.get("/employers")
-async def get_all_employers(skip: int = 0, limit: int = 50):
-    employers = await db.employer_details.find({}, {"_id": 0}).skip(skip).limit(limit).to_list(limit)
-    return employers
+async def get_all_employers(request: Request, skip: int = 0, limit: int = 50, fields: Optional[str] = None):
+    headers = await etags.check(db, request, "employer_details")
+    projection = fields_projection(fields, set(EmployerDetails.model_fields))
+    employers = await db.employer_details.find({}, projection).skip(skip).limit(limit).to_list(limit)
+    return fast_json(employers, headers)
 
 # Skill categories routes
 @api_router.get("/skills/categories")
-async def get_skill_categories():
+async def get_skill_categories(request: Request):
+    headers = await etags.check(db, request, "skill_categories")
     categories = await db.skill_categories.find({}, {"_id": 0}).to_list(1000)
-    return categories
+    return fast_json(categories, headers)
 
 @api_router.get("/skills/categories/tree")
-async def get_skill_categories_tree():
+async def get_skill_categories_tree(request: Request):
     """Get hierarchical skill categories"""
-    categories = await db.skill_categories.find({}, {"_id": 0}).sort("display_order", 1).to_list(1000)
-    
-    # Build tree structure
-    tree = []
-    category_map = {cat["id"]: {**cat, "children": []} for cat in categories}
-    
-    for cat in categories:
-        if cat["parent_id"] is None:
-            tree.append(category_map[cat["id"]])
-        else:
-            if cat["parent_id"] in category_map:
-                category_map[cat["parent_id"]]["children"].append(category_map[cat["id"]])
-    
-    return tree
+    version = (await etags.read_versions(db, ["skill_categories"])).get("skill_categories", 0)
+    await _load_skill_categories(version)
+    # Tag the response with the version the cached tree was loaded at, never a newer one
+    tree, loaded_version = _skill_category_cache["tree"], _skill_category_cache["version"]
+    headers = await etags.check(db, request, "skill_categories", versions={"skill_categories": loaded_version})
+    return fast_json(tree, headers)
 
 # Worker skills routes
+def upsert_worker_skill(worker_id: str, skill: WorkerSkillCreate, now: datetime) -> UpdateOne:
+    return UpdateOne(
+        {"worker_id": worker_id, "skill_category_id": skill.skill_category_id},
+        {
+            "$set": {"years_of_experience": skill.years_of_experience, "is_primary": skill.is_primary},
+            "$setOnInsert": {"added_at": now},
+        },
+        upsert=True,
+    )
+
 @api_router.post("/workers/{worker_id}/skills")
 async def add_worker_skill(worker_id: str, skill: WorkerSkillCreate):
-    skill_dict = skill.model_dump()
-    skill_dict["worker_id"] = worker_id
-    skill_dict["added_at"] = datetime.now(timezone.utc).isoformat()
-    
-    await db.worker_skills.insert_one(skill_dict)
+    await validate_skill_category_ids([skill.skill_category_id])
+    # Re-adding a skill updates it instead of creating a duplicate
+    await db.worker_skills.bulk_write([upsert_worker_skill(worker_id, skill, datetime.now(timezone.utc))])
+    await etags.bump(db, "worker_skills")
+    candidates.add_skill(worker_id, skill.skill_category_id)
     return {"message": "Yetenek eklendi"}
 
+@api_router.put("/workers/{worker_id}/skills")
+async def replace_worker_skills(worker_id: str, skills: List[WorkerSkillCreate]):
+    """Replace the worker's whole skill set in one bulk write"""
+    category_ids = [skill.skill_category_id for skill in skills]
+    if len(set(category_ids)) != len(category_ids):
+        raise HTTPException(status_code=400, detail="Aynı yetenek birden fazla kez gönderildi")
+    await validate_skill_category_ids(category_ids)
+    
+    now = datetime.now(timezone.utc)
+    ops = [upsert_worker_skill(worker_id, skill, now) for skill in skills]
+    ops.append(DeleteMany({"worker_id": worker_id, "skill_category_id": {"$nin": category_ids}}))
+    result = await db.worker_skills.bulk_write(ops, ordered=False)
+    await etags.bump(db, "worker_skills")
+    candidates.set_skills(worker_id, category_ids)
+    
+    return {
+        "message": "Yetenekler güncellendi",
+        "upserted": result.upserted_count,
+        "modified": result.modified_count,
+        "deleted": result.deleted_count,
+    }
+
 @api_router.get("/workers/{worker_id}/skills")
-async def get_worker_skills(worker_id: str):
-    skills = await db.worker_skills.find({"worker_id": worker_id}, {"_id": 0}).to_list(100)
-    return skills
+async def get_worker_skills(worker_id: str, limit: Optional[int] = None, cursor: Optional[str] = None):
+    # (worker_id, skill_category_id) is unique, so it breaks ties on added_at
+    return await list_response(
+        db.worker_skills, {"worker_id": worker_id}, "added_at", limit, cursor, tie_field="skill_category_id"
+    )
 
 # Portfolio routes
-@api_router.post("/portfolio/upload")
+@api_router.post("/portfolio/upload", dependencies=[Depends(admission("upload"))])
 async def upload_portfolio(
     worker_id: str = Form(...),
     description: str = Form(...),
@@ -471,30 +1106,34 @@ async def upload_portfolio(
     if not file.content_type or not file.content_type.startswith('image/'):
         raise HTTPException(status_code=400, detail="Sadece resim dosyaları yüklenebilir")
     
-    # Create unique filename
-    file_ext = file.filename.split('.')[-1] if '.' in file.filename else 'jpg'
     portfolio_id = str(uuid.uuid4())
-    filename = f"{portfolio_id}.{file_ext}"
-    file_path = UPLOAD_DIR / filename
+    incoming_path = UPLOAD_INCOMING_DIR / portfolio_id
     
     # Save file
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    def save_upload():
+        with open(incoming_path, "wb") as buffer:
+            shutil.copyfileobj(file.file, buffer)
+    await asyncio.to_thread(save_upload)
     
     # Calculate hash
-    image_hash = calculate_image_hash(file_path)
+    image_hash = await cpu.run(storage.sha256_file, incoming_path)
     
     # Check for duplicate
-    existing = await db.portfolio.find_one({"image_hash": image_hash})
-    if existing and existing["worker_id"] != worker_id:
-        os.remove(file_path)
+    existing = await db.portfolio.find_one({"image_hash": image_hash, "worker_id": {"$ne": worker_id}})
+    if existing:
+        os.remove(incoming_path)
         raise HTTPException(status_code=400, detail="Bu fotoğraf başka bir kullanıcı tarafından kullanılıyor")
     
+    # Identical photos share one stored blob
+    key = await storage.acquire_blob(
+        db, blob_store, image_hash, storage.safe_extension(file.filename), incoming_path, file.content_type
+    )
+    
     portfolio_dict = {
         "id": portfolio_id,
         "worker_id": worker_id,
-        "photo_url": f"/uploads/{filename}",
-        "thumbnail_url": f"/uploads/{filename}",
+        "photo_url": f"/uploads/{key}",
+        "thumbnail_url": f"/uploads/{key}",
         "description": description,
         "material_tag": material_tag,
         "technique_tag": technique_tag,
@@ -502,7 +1141,7 @@ async def upload_portfolio(
         "is_verified_shot": verification_source == "camera",
         "has_exif_data": True,
         "image_hash": image_hash,
-        "upload_date": datetime.now(timezone.utc).isoformat(),
+        "upload_date": datetime.now(timezone.utc),
         "view_count": 0,
         "like_count": 0
     }
@@ -510,10 +1149,19 @@ async def upload_portfolio(
     await db.portfolio.insert_one(portfolio_dict)
     return {"message": "Portfolyo fotoğrafı yüklendi", "portfolio_id": portfolio_id}
 
+@api_router.delete("/portfolio/{portfolio_id}")
+async def delete_portfolio(portfolio_id: str, worker_id: str):
+    item = await db.portfolio.find_one_and_delete({"id": portfolio_id, "worker_id": worker_id})
+    if not item:
+        raise HTTPException(status_code=404, detail="Portfolyo fotoğrafı bulunamadı")
+    # Legacy flat uploads were never reference counted
+    if storage.content_hash(item["photo_url"].removeprefix("/uploads/")):
+        await storage.release_blob(db, blob_store, item["image_hash"])
+    return {"message": "Portfolyo fotoğrafı silindi"}
+
 @api_router.get("/portfolio/{worker_id}")
-async def get_worker_portfolio(worker_id: str):
-    portfolio = await db.portfolio.find({"worker_id": worker_id}, {"_id": 0}).to_list(100)
-    return portfolio
+async def get_worker_portfolio(worker_id: str, limit: Optional[int] = None, cursor: Optional[str] = None):
+    return await list_response(db.portfolio, {"worker_id": worker_id}, "upload_date", limit, cursor)
 
 # Job routes
 @api_router.post("/jobs")
@@ -523,30 +1171,77 @@ async def create_job(job: JobCreate, employer_id: str):
     job_dict["id"] = job_id
     job_dict["employer_id"] = employer_id
     job_dict["job_status"] = JobStatus.OPEN.value
-    job_dict["created_at"] = datetime.now(timezone.utc).isoformat()
-    job_dict["expires_at"] = (datetime.now(timezone.utc) + timedelta(days=30)).isoformat()
+    job_dict["created_at"] = datetime.now(timezone.utc)
+    job_dict["updated_at"] = job_dict["created_at"]
+    job_dict["expires_at"] = datetime.now(timezone.utc) + timedelta(days=30)
     job_dict["view_count"] = 0
-    job_dict["start_date"] = job.start_date.isoformat()
-    job_dict["end_date"] = job.end_date.isoformat()
+    
+    employer = await db.employer_details.find_one({"user_id": employer_id}, job_cards.EMPLOYER_SUMMARY_PROJECTION)
+    job_dict["employer"] = job_cards.employer_summary(employer)
+    if employer and employer.get("location"):
+        job_dict["location"] = employer["location"]
     
     await db.jobs.insert_one(job_dict)
+    await etags.bump(db, "jobs")
+    index_job(job_dict)
     
-    # Update employer stats
-    await db.employer_details.update_one(
-        {"user_id": employer_id},
-        {"$inc": {"total_jobs_posted": 1}}
+    await marketplace_stats.record_job_created(
+        db, employer and employer.get("city"), job.required_skills, job_dict["created_at"]
     )
     
-    return {"message": "İş ilanı oluşturuldu", "job_id": job_id}
+    # Update employer stats
+    await outbox_queue.enqueue("employer_job_posted", {"employer_id": employer_id})
+    
+    return {
+        "message": "İş ilanı oluşturuldu",
+        "job_id": job_id,
+        "candidate_pool": candidates.count(job.required_skills, city=employer and employer.get("city")),
+    }
 
 @api_router.get("/jobs")
-async def get_all_jobs(skip: int = 0, limit: int = 50, status: Optional[str] = None):
+async def get_all_jobs(
+    request: Request,
+    skip: int = 0,
+    limit: int = 50,
+    status: Optional[str] = None,
+    fields: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    active_only: bool = False,
+    near_lat: Optional[float] = None,
+    near_lon: Optional[float] = None,
+    near_city: Optional[str] = None,
+    near_district: Optional[str] = None,
+    radius_km: float = geo.DEFAULT_RADIUS_KM,
+):
+    """With a near_* point, jobs within radius_km sorted nearest first with distance_km,
+    otherwise newest first"""
+    center = near_center(near_lat, near_lon, near_city, near_district, radius_km)
     query = {}
     if status:
         query["job_status"] = status
+    if created_from or created_to:
+        query["created_at"] = {}
+        if created_from:
+            query["created_at"]["$gte"] = created_from
+        if created_to:
+            query["created_at"]["$lt"] = created_to
+    if active_only:
+        query["expires_at"] = {"$gt": datetime.now(timezone.utc)}
     
-    jobs = await db.jobs.find(query, {"_id": 0}).skip(skip).limit(limit).sort("created_at", -1).to_list(limit)
-    return jobs
+    # View counts are not versioned, so cached lists may show them slightly behind
+    salt = ""
+    if active_only:
+        # The list also changes when its soonest-expiring job expires
+        next_expiry = await db.jobs.find_one(query, {"_id": 0, "expires_at": 1}, sort=[("expires_at", 1)])
+        salt = str(next_expiry and next_expiry.get("expires_at"))
+    headers = await etags.check(db, request, "jobs", salt=salt)
+    projection = fields_projection(fields, set(Job.model_fields))
+    if center:
+        jobs = await find_nearby(db.jobs, center, radius_km, query, projection, skip, limit)
+    else:
+        jobs = await db.jobs.find(query, projection).skip(skip).limit(limit).sort("created_at", -1).to_list(limit)
+    return fast_json(jobs, headers)
 
 @api_router.get("/jobs/{job_id}")
 async def get_job(job_id: str):
@@ -557,10 +1252,10 @@ async def get_job(job_id: str):
     # Increment view count
     await db.jobs.update_one({"id": job_id}, {"$inc": {"view_count": 1}})
     
-    return job
+    return fast_json(job)
 
 # Job application routes
-@api_router.post("/jobs/apply")
+@api_router.post("/jobs/apply", dependencies=[Depends(admission("apply"))])
 async def apply_to_job(application: JobApplicationCreate, worker_id: str):
     # Check if already applied
     existing = await db.job_applications.find_one({
@@ -576,34 +1271,82 @@ async def apply_to_job(application: JobApplicationCreate, worker_id: str):
         "job_id": application.job_id,
         "worker_id": worker_id,
         "status": ApplicationStatus.APPLIED.value,
-        "applied_at": datetime.now(timezone.utc).isoformat(),
+        "applied_at": datetime.now(timezone.utc),
         "responded_at": None,
         "withdrawal_reason": None
     }
+    app_dict["updated_at"] = app_dict["applied_at"]
     
     await db.job_applications.insert_one(app_dict)
+    await marketplace_stats.record_application(db, app_dict["applied_at"])
     
     # Create notification for employer
-    job = await db.jobs.find_one({"id": application.job_id})
-    if job:
-        notif_dict = {
-            "id": str(uuid.uuid4()),
-            "user_id": job["employer_id"],
-            "type": "new_application",
-            "title": "Yeni Başvuru",
-            "message": f"{job['title']} ilanınıza yeni bir başvuru yapıldı",
-            "related_job_id": application.job_id,
-            "is_read": False,
-            "created_at": datetime.now(timezone.utc).isoformat()
-        }
-        await db.notifications.insert_one(notif_dict)
+    await outbox_queue.enqueue(
+        "new_application",
+        {"application_id": app_id, "job_id": application.job_id, "applied_at": app_dict["applied_at"]},
+        dedupe_key=f"new_application:{app_id}",
+    )
     
     return {"message": "Başvurunuz alındı", "application_id": app_id}
 
 @api_router.get("/jobs/{job_id}/applications")
-async def get_job_applications(job_id: str):
-    applications = await db.job_applications.find({"job_id": job_id}, {"_id": 0}).to_list(100)
-    return applications
+async def get_job_applications(job_id: str, limit: Optional[int] = None, cursor: Optional[str] = None):
+    return await list_response(db.job_applications, {"job_id": job_id}, "applied_at", limit, cursor)
+
+TRANSITION_ERRORS = {
+    "not_found": (404, "İş ilanı bulunamadı"),
+    "forbidden": (403, "Bu işlem için yetkiniz yok"),
+    "invalid_status": (409, "İş ilanının mevcut durumunda bu işlem yapılamaz"),
+}
+
+async def apply_job_transition(
+    job_id: str,
+    action: str,
+    actor_id: Optional[str],
+    reason: Optional[str] = None,
+    assign_worker_id: Optional[str] = None,
+) -> dict:
+    try:
+        event = await job_states.transition(db, job_id, action, actor_id, reason, assign_worker_id)
+    except job_states.TransitionError as exc:
+        status_code, detail = TRANSITION_ERRORS[exc.reason]
+        raise HTTPException(status_code=status_code, detail=detail)
+    await etags.bump(db, "jobs")
+    await outbox_queue.enqueue("job_event", {"event_id": event["id"]}, dedupe_key=f"job_event:{event['id']}")
+    
+    job = event.pop("job")
+    if event["from_status"] == JobStatus.OPEN.value:
+        # The job leaves the open pool either way, unless its expiry already counted that
+        was_open = not job.get("expiry_recorded")
+        city = await marketplace_stats.job_city(db, job)
+        if action == "match":
+            await marketplace_stats.record_match(
+                db, city, job.get("required_skills", []), as_datetime(job["created_at"]), event["created_at"], was_open
+            )
+        elif was_open:
+            await marketplace_stats.record_job_closed(db, city, job.get("required_skills", []), event["created_at"])
+    return event
+
+@api_router.post("/jobs/{job_id}/transitions")
+async def transition_job(
+    job_id: str,
+    transition: JobTransitionCreate,
+    actor_id: str,
+    authorization: Optional[str] = Header(None)
+):
+    """Move a job to its next status: start, complete, cancel, dispute, resolve_*"""
+    spec = job_states.ACTIONS.get(transition.action)
+    if spec is None or transition.action == "match":
+        # Matching only happens by accepting an application
+        raise HTTPException(status_code=400, detail="Geçersiz işlem")
+    if spec.actor == job_states.ADMIN:
+        actor_id = (await require_admin(authorization))["user_id"]
+    event = await apply_job_transition(job_id, transition.action, actor_id, transition.reason)
+    return fast_json(event)
+
+@api_router.get("/jobs/{job_id}/events")
+async def get_job_events(job_id: str, limit: Optional[int] = None, cursor: Optional[str] = None):
+    return await list_response(db.job_events, {"job_id": job_id}, "created_at", limit, cursor)
 
 @api_router.put("/applications/{application_id}/accept")
 async def accept_application(application_id: str, employer_id: str):
@@ -611,21 +1354,20 @@ async def accept_application(application_id: str, employer_id: str):
     if not app:
         raise HTTPException(status_code=404, detail="Başvuru bulunamadı")
     
+    # Only one application can win the open -> matched transition
+    await apply_job_transition(app["job_id"], "match", employer_id, assign_worker_id=app["worker_id"])
+    now = datetime.now(timezone.utc)
+    
     # Update application status
     await db.job_applications.update_one(
         {"id": application_id},
         {"$set": {
             "status": ApplicationStatus.ACCEPTED.value,
-            "responded_at": datetime.now(timezone.utc).isoformat()
+            "responded_at": now,
+            "updated_at": now
         }}
     )
     
-    # Update job status
-    await db.jobs.update_one(
-        {"id": app["job_id"]},
-        {"$set": {"job_status": JobStatus.MATCHED.value}}
-    )
-    
     # Create notification for worker
     notif_dict = {
         "id": str(uuid.uuid4()),
@@ -635,71 +1377,388 @@ async def accept_application(application_id: str, employer_id: str):
         "message": "İşveren başvurunuzu kabul etti. İletişim bilgilerine ulaşabilirsiniz.",
         "related_job_id": app["job_id"],
         "is_read": False,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     }
     await db.notifications.insert_one(notif_dict)
+    await etags.bump(db, f"notifications:{app['worker_id']}")
     
     return {"message": "Başvuru kabul edildi"}
 
 # Rating routes
-@api_router.post("/ratings")
+@api_router.post("/ratings", dependencies=[Depends(admission("rating"))])
 async def create_rating(rating: RatingCreate, from_user_id: str):
     rating_id = str(uuid.uuid4())
     rating_dict = rating.model_dump()
     rating_dict["id"] = rating_id
     rating_dict["from_user_id"] = from_user_id
-    rating_dict["created_at"] = datetime.now(timezone.utc).isoformat()
+    rating_dict["created_at"] = datetime.now(timezone.utc)
     
     await db.ratings.insert_one(rating_dict)
+    await rating_summaries.record_rating(db, rating_dict)
+    
+    # The employer side of the rating decides the sector
+    employer = await db.employer_details.find_one(
+        {"user_id": {"$in": [rating.to_user_id, from_user_id]}}, {"_id": 0, "sector": 1}
+    )
+    await marketplace_stats.record_rating(
+        db, employer and employer.get("sector"), rating.overall_score, rating_dict["created_at"]
+    )
     
     # Update average rating
-    user_ratings = await db.ratings.find({"to_user_id": rating.to_user_id}, {"_id": 0}).to_list(1000)
-    avg_rating = sum(r["overall_score"] for r in user_ratings) / len(user_ratings) if user_ratings else 0
-    
-    # Update user details
-    user = await db.users.find_one({"id": rating.to_user_id})
-    if user:
-        if user["role"] == "worker":
-            await db.worker_details.update_one(
-                {"user_id": rating.to_user_id},
-                {"$set": {"average_rating": avg_rating}}
-            )
-        elif user["role"] == "employer":
-            await db.employer_details.update_one(
-                {"user_id": rating.to_user_id},
-                {"$set": {"average_rating": avg_rating}}
-            )
+    await outbox_queue.enqueue("rating_created", {"to_user_id": rating.to_user_id})
     
     return {"message": "Değerlendirme kaydedildi", "rating_id": rating_id}
 
 @api_router.get("/ratings/user/{user_id}")
-async def get_user_ratings(user_id: str):
-    ratings = await db.ratings.find({"to_user_id": user_id}, {"_id": 0}).sort("created_at", -1).to_list(100)
-    return ratings
+async def get_user_ratings(user_id: str, limit: int = 100, cursor: Optional[str] = None):
+    """Newest first; pass the X-Next-Cursor header back as `cursor` for the next page"""
+    limit = max(1, min(limit, pagination.MAX_PAGE_SIZE))
+    try:
+        query = pagination.page_query({"to_user_id": user_id}, "created_at", cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Geçersiz sayfa imleci")
+    rows = await db.ratings.find(query, {"_id": 0}).sort(pagination.sort_keys("created_at")).limit(limit + 1).to_list(limit + 1)
+    ratings, next_cursor = pagination.split_page(rows, "created_at", limit)
+    return fast_json(ratings, {"X-Next-Cursor": next_cursor} if next_cursor else None)
+
+@api_router.get("/ratings/user/{user_id}/summary")
+async def get_user_rating_summary(user_id: str):
+    """Score histogram, per-dimension averages, yes/no ratios and the monthly trend"""
+    return fast_json(await rating_summaries.read_summary(db, user_id))
 
 # Notification routes
 @api_router.get("/notifications/{user_id}")
-async def get_notifications(user_id: str):
-    notifications = await db.notifications.find({"user_id": user_id}, {"_id": 0}).sort("created_at", -1).to_list(100)
-    return notifications
+async def get_notifications(
+    request: Request, user_id: str, limit: Optional[int] = None, cursor: Optional[str] = None
+):
+    headers = await etags.check(db, request, f"notifications:{user_id}")
+    return await list_response(db.notifications, {"user_id": user_id}, "created_at", limit, cursor, headers=headers)
 
 @api_router.put("/notifications/{notification_id}/read")
 async def mark_notification_read(notification_id: str):
-    await db.notifications.update_one(
+    notification = await db.notifications.find_one_and_update(
         {"id": notification_id},
-        {"$set": {"is_read": True}}
+        {"$set": {"is_read": True}},
+        projection={"_id": 0, "user_id": 1}
     )
+    if notification:
+        await etags.bump(db, f"notifications:{notification['user_id']}")
     return {"message": "Bildirim okundu olarak işaretlendi"}
 
+# Candidate pool routes
+@api_router.get("/candidates/count")
+async def count_candidates(skills: str, city: Optional[str] = None, district: Optional[str] = None):
+    """Workers having all / any of the comma separated skill category ids"""
+    category_ids = [s.strip() for s in skills.split(",") if s.strip()]
+    return candidates.count(category_ids, city=city, district=district)
+
+# Search routes
+@api_router.get("/search")
+async def search(q: str, type: Optional[str] = None, limit: int = 20):
+    """Ranked search; type is one of job, employer, skill"""
+    if type is not None and type not in ("job", "employer", "skill"):
+        raise HTTPException(status_code=400, detail="Geçersiz arama türü")
+    return fast_json(text_index.search(q, doc_type=type, limit=min(limit, 100)))
+
+# Dashboard routes
+DASHBOARD_JOB_PROJECTION = {
+    "_id": 0,
+    "id": 1,
+    "title": 1,
+    # Cards only show a two-line preview of the description. Expressions in a find
+    # projection need MongoDB 4.4+, which the $unionWith in reliability.py requires too.
+    "description": {"$substrCP": ["$description", 0, 200]},
+    "required_skills": 1,
+    "start_date": 1,
+    "end_date": 1,
+    "budget_info": 1,
+    "job_status": 1,
+    "created_at": 1,
+    "view_count": 1,
+}
+
+def dashboard_section(name: str, page: tuple) -> dict:
+    """The first page of a listing plus what the client needs to fetch the rest"""
+    rows, next_cursor, total = page
+    return {name: rows, f"{name}_total": total, f"{name}_next_cursor": next_cursor}
+
+@api_router.get("/dashboard/worker/{worker_id}")
+async def get_worker_dashboard(worker_id: str):
+    """Worker details plus the first page of skills and portfolio in one round trip;
+    the *_next_cursor values continue on the skills and portfolio listings"""
+    details, skills, portfolio = await asyncio.gather(
+        db.worker_details.find_one({"user_id": worker_id}, {"_id": 0}),
+        fetch_page(db.worker_skills, {"worker_id": worker_id}, "added_at", None, None, tie_field="skill_category_id"),
+        fetch_page(db.portfolio, {"worker_id": worker_id}, "upload_date", None, None),
+    )
+    return fast_json({
+        "details": details and {**WORKER_DETAILS_DEFAULTS, **details},
+        **dashboard_section("skills", skills),
+        **dashboard_section("portfolio", portfolio),
+    })
+
+@api_router.get("/employers/{employer_id}/jobs")
+async def get_employer_jobs(employer_id: str, limit: Optional[int] = None, cursor: Optional[str] = None):
+    """The employer's own jobs as dashboard cards, newest first"""
+    return await list_response(
+        db.jobs, {"employer_id": employer_id}, "created_at", limit, cursor, projection=DASHBOARD_JOB_PROJECTION
+    )
+
+@api_router.get("/dashboard/employer/{employer_id}")
+async def get_employer_dashboard(employer_id: str):
+    """Employer details and the first page of own jobs with application counts in one
+    round trip; jobs_next_cursor continues on /employers/{id}/jobs"""
+    details, jobs_page = await asyncio.gather(
+        db.employer_details.find_one({"user_id": employer_id}, {"_id": 0}),
+        fetch_page(db.jobs, {"employer_id": employer_id}, "created_at", None, None, projection=DASHBOARD_JOB_PROJECTION),
+    )
+    jobs = jobs_page[0]
+    
+    application_counts = {}
+    if jobs:
+        counts = await db.job_applications.aggregate([
+            {"$match": {"job_id": {"$in": [job["id"] for job in jobs]}}},
+            {"$group": {"_id": "$job_id", "count": {"$sum": 1}}},
+        ]).to_list(None)
+        application_counts = {row["_id"]: row["count"] for row in counts}
+    
+    for job in jobs:
+        job["application_count"] = application_counts.get(job["id"], 0)
+    
+    return fast_json({
+        "details": details and {**EMPLOYER_DETAILS_DEFAULTS, **details},
+        **dashboard_section("jobs", jobs_page),
+    })
+
+# Admin routes
+@api_router.post("/admin/scores/recompute")
+async def recompute_reliability_scores(full: bool = False, admin: dict = Depends(require_admin)):
+    """Recompute reliability counters for users changed since the last run"""
+    return await reliability.run_scoring(db, full=full)
+
+@api_router.get("/admin/stats")
+async def get_marketplace_stats(
+    from_date: Optional[datetime] = None,
+    to_date: Optional[datetime] = None,
+    admin: dict = Depends(require_admin)
+):
+    """Marketplace supply/demand numbers from the materialized daily_stats"""
+    to_date = marketplace_stats.as_utc(to_date or datetime.now(timezone.utc))
+    from_date = marketplace_stats.as_utc(from_date or to_date - timedelta(days=30))
+    return fast_json(await marketplace_stats.read_stats(db, from_date, to_date))
+
+@api_router.post("/admin/stats/backfill")
+async def backfill_marketplace_stats(admin: dict = Depends(require_admin)):
+    return await marketplace_stats.backfill(db)
+
+@api_router.post("/admin/ratings/summaries/backfill")
+async def backfill_rating_summaries(admin: dict = Depends(require_admin)):
+    return await rating_summaries.backfill(db)
+
+@api_router.get("/admin/metrics/rate-limits")
+async def get_rate_limit_metrics(admin: dict = Depends(require_admin)):
+    return rate_limiter.metrics()
+
+@api_router.get("/admin/profiles")
+async def list_profiles(admin: dict = Depends(require_admin)):
+    """Stored request profiles, newest first"""
+    return fast_json(await asyncio.to_thread(profile_store.list))
+
+@api_router.get("/admin/profiles/{profile_id}")
+async def download_profile(profile_id: str, admin: dict = Depends(require_admin)):
+    """Speedscope JSON; open it at https://www.speedscope.app"""
+    path = profile_store.path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profil bulunamadı")
+    return FileResponse(path, media_type="application/json", filename=path.name)
+
+# Admin exports
+EXPORTS = {
+    "jobs": {
+        "collection": "jobs",
+        "date_field": "created_at",
+        "filters": {"status": "job_status", "employer_id": "employer_id"},
+        "columns": ["id", "employer_id", "title", "required_skills", "job_status", "start_date",
+                    "end_date", "budget_info", "created_at", "expires_at", "view_count"],
+    },
+    "applications": {
+        "collection": "job_applications",
+        "date_field": "applied_at",
+        "filters": {"status": "status", "job_id": "job_id", "worker_id": "worker_id"},
+        "columns": ["id", "job_id", "worker_id", "status", "applied_at", "responded_at", "withdrawal_reason"],
+    },
+    "ratings": {
+        "collection": "ratings",
+        "date_field": "created_at",
+        "filters": {"to_user_id": "to_user_id", "from_user_id": "from_user_id", "job_id": "job_id"},
+        "columns": ["id", "job_id", "from_user_id", "to_user_id", "overall_score", "payment_made",
+                    "workplace_safety", "communication_quality", "technical_competence", "on_time",
+                    "safety_compliance", "professionalism", "created_at", "comment"],
+    },
+}
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+def csv_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, list):
+        return "|".join(str(v) for v in value)
+    return value
+
+async def export_rows(cursor, columns: List[str], fmt: str):
+    """Encode cursor rows into ~64KB chunks; only one batch is held in memory"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == "csv":
+        writer.writerow(["_cursor", *columns])
+    chunk = bytearray(buffer.getvalue().encode())
+    buffer.seek(0)
+    buffer.truncate()
+    
+    async for doc in cursor:
+        # _cursor lets a client resume an interrupted export with ?after=
+        doc_cursor = str(doc.pop("_id"))
+        if fmt == "csv":
+            writer.writerow([doc_cursor, *(csv_value(doc.get(column)) for column in columns)])
+            chunk += buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        else:
+            chunk += orjson.dumps({"_cursor": doc_cursor, **doc}, option=orjson.OPT_APPEND_NEWLINE)
+        if len(chunk) >= EXPORT_CHUNK_BYTES:
+            yield bytes(chunk)
+            chunk.clear()
+    if chunk:
+        yield bytes(chunk)
+
+@api_router.get("/admin/export/{dataset}")
+async def export_dataset(
+    dataset: str,
+    request: Request,
+    format: str = "ndjson",
+    after: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    batch_size: int = 1000,
+    admin: dict = Depends(require_admin)
+):
+    """Stream a full dataset as NDJSON or CSV in _id order"""
+    spec = EXPORTS.get(dataset)
+    if spec is None:
+        raise HTTPException(status_code=404, detail="Bilinmeyen veri seti")
+    if format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="Desteklenmeyen format")
+    
+    query = {
+        field: request.query_params[param]
+        for param, field in spec["filters"].items()
+        if param in request.query_params
+    }
+    if created_from or created_to:
+        query[spec["date_field"]] = {}
+        if created_from:
+            query[spec["date_field"]]["$gte"] = created_from
+        if created_to:
+            query[spec["date_field"]]["$lt"] = created_to
+    if after:
+        if not ObjectId.is_valid(after):
+            raise HTTPException(status_code=400, detail="Geçersiz devam imleci")
+        query["_id"] = {"$gt": ObjectId(after)}
+    
+    projection = {"_id": 1, **{column: 1 for column in spec["columns"]}}
+    cursor = db[spec["collection"]].find(query, projection).sort("_id", 1).batch_size(max(1, min(batch_size, 10000)))
+    
+    media_type = "text/csv; charset=utf-8" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        export_rows(cursor, spec["columns"], format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{dataset}.{format}"'},
+    )
+
+# Uploaded files
+def parse_range(range_header: str, size: int) -> Optional[tuple]:
+    """Parse a single `bytes=` range, returning inclusive (start, end)"""
+    unit, _, spec = range_header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+    start_s, _, end_s = spec.strip().partition("-")
+    if not start_s:
+        # Suffix range: the last N bytes
+        length = int(end_s)
+        return (max(size - length, 0), size - 1) if length else None
+    start = int(start_s)
+    end = min(int(end_s), size - 1) if end_s else size - 1
+    return (start, end) if start <= end else None
+
+@app.api_route("/uploads/{key:path}", methods=["GET", "HEAD"])
+async def serve_upload(key: str, request: Request):
+    info = await blob_store.stat(key) if storage.is_blob_key(key) else None
+    if info is None:
+        raise HTTPException(status_code=404, detail="Dosya bulunamadı")
+    
+    etag = f'"{info.etag}"'
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        # Content-addressed keys never change, so clients can cache them forever
+        "Cache-Control": "public, max-age=31536000, immutable" if info.immutable else "public, max-age=86400",
+    }
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    
+    media_type = mimetypes.guess_type(key)[0] or "application/octet-stream"
+    start, end = 0, info.size - 1
+    status_code = 200
+    range_header = request.headers.get("range")
+    if range_header and request.headers.get("if-range", etag) == etag:
+        try:
+            byte_range = parse_range(range_header, info.size)
+        except ValueError:
+            byte_range = None
+        if byte_range is None or byte_range[0] >= info.size:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{info.size}"})
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{info.size}"
+    
+    headers["Content-Length"] = str(end - start + 1)
+    if request.method == "HEAD" or info.size == 0:
+        return Response(status_code=status_code, headers=headers, media_type=media_type)
+    return StreamingResponse(
+        blob_store.iter_range(key, start, end), status_code=status_code, headers=headers, media_type=media_type
+    )
+
 # Include the router in the main app
 app.include_router(api_router)
 
+app.add_middleware(
+    idempotency.IdempotencyMiddleware,
+    get_db=lambda: db,
+    paths=IDEMPOTENT_PATHS,
+    ttl_seconds=IDEMPOTENCY_TTL_SECONDS,
+)
+
+# Admins send X-Profile: 1 to profile a request; PROFILE_SAMPLE_RATE profiles a share of all traffic
+app.add_middleware(
+    profiling.ProfilingMiddleware,
+    store=profile_store,
+    is_admin=is_admin_scope,
+    sample_rate=float(os.environ.get('PROFILE_SAMPLE_RATE', '0')),
+)
+
+# Outside the idempotency layer so stored responses stay uncompressed
+app.add_middleware(
+    compression.CompressionMiddleware,
+    minimum_size=int(os.environ.get('COMPRESSION_MIN_SIZE', '1024')),
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count"],
 )
 
 # Configure logging
@@ -709,6 +1768,39 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
+DUPLICATE_KEY_ERROR = 11000
+
+async def ensure_worker_skills_unique_index():
+    try:
+        await db.worker_skills.create_index(migrate_worker_skills.UNIQUE_KEYS, unique=True)
+    except OperationFailure as exc:
+        if exc.code != DUPLICATE_KEY_ERROR:
+            raise
+        # Deleting user rows is not something every worker should race to do on boot
+        logger.error("worker_skills has duplicate skills; run migrate_worker_skills.py to build the unique index")
+
+async def create_indexes():
+    """Create (or verify) every index the handlers rely on"""
+    # Index builds are independent, so run them concurrently to keep startup short
+    await asyncio.gather(
+        outbox.ensure_indexes(db),
+        job_states.ensure_indexes(db),
+        geo.ensure_indexes(db),
+        idempotency.ensure_indexes(db, IDEMPOTENCY_TTL_SECONDS),
+        # Change detection for the incremental reliability scoring
+        db.job_applications.create_index("updated_at"),
+        db.job_applications.create_index([("job_id", 1), ("applied_at", -1), ("id", -1)]),
+        db.jobs.create_index("updated_at"),
+        db.ratings.create_index("created_at"),
+        db.jobs.create_index("created_at"),
+        db.jobs.create_index("expires_at"),
+        # Open jobs past their expiry, for marketplace_stats.sweep_expired_jobs
+        db.jobs.create_index([("job_status", 1), ("expires_at", 1)]),
+        db.notifications.create_index([("user_id", 1), ("created_at", -1), ("id", -1)]),
+        db.ratings.create_index([("to_user_id", 1), ("created_at", -1), ("id", -1)]),
+        db.jobs.create_index([("employer_id", 1), ("created_at", -1), ("id", -1)]),
+        ensure_worker_skills_unique_index(),
+        db.portfolio.create_index([("worker_id", 1), ("upload_date", -1), ("id", -1)]),
+        db.worker_skills.create_index([("worker_id", 1), ("added_at", -1), ("skill_category_id", -1)]),
+        db.portfolio.create_index("image_hash"),
+    )
@@ -0,0 +1,287 @@
+"""Content-addressed upload storage.
+
+Blobs are keyed by their SHA-256 and laid out as `ab/cd/<sha256>.<ext>` so no
+directory grows past 256 entries per level. The `blobs` collection keeps a
+reference count per hash; the file is only written on the first reference and
+removed when the last one is released (see release_blob for how that is kept
+safe against a concurrent acquire).
+"""
+import asyncio
+import hashlib
+import os
+import re
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+from pymongo import ReturnDocument
+
+CHUNK_SIZE = 64 * 1024
+# A tombstone older than this belongs to a release that died mid-way
+STALE_DELETE_SECONDS = 30.0
+CONTENT_KEY_RE = re.compile(r"^[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})\.[a-z0-9]{1,5}$")
+# Uploads from before content addressing: one file directly under the root
+LEGACY_KEY_RE = re.compile(r"^[A-Za-z0-9_-][A-Za-z0-9_.-]*$")
+
+
+@dataclass
+class BlobInfo:
+    size: int
+    etag: str
+    immutable: bool
+
+
+def blob_key(sha256: str, ext: str) -> str:
+    return f"{sha256[:2]}/{sha256[2:4]}/{sha256}.{ext}"
+
+
+def safe_extension(filename: Optional[str]) -> str:
+    ext = filename.rsplit('.', 1)[-1].lower() if filename and '.' in filename else ''
+    return ext if re.fullmatch(r"[a-z0-9]{1,5}", ext) else 'jpg'
+
+
+def content_hash(key: str) -> Optional[str]:
+    """SHA-256 of a content-addressed key, None for legacy flat uploads"""
+    match = CONTENT_KEY_RE.match(key)
+    return match.group(1) if match else None
+
+
+def is_blob_key(key: str) -> bool:
+    """Whether key names a stored blob; everything else (e.g. .incoming/) is never served"""
+    return bool(CONTENT_KEY_RE.match(key) or LEGACY_KEY_RE.match(key))
+
+
+def sha256_file(path: Path) -> str:
+    """Hex SHA-256 of a file; module-level so it can run in the CPU process pool"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BlobStore(ABC):
+    @abstractmethod
+    async def put(self, key: str, source: Path, content_type: str) -> None:
+        ...
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    async def stat(self, key: str) -> Optional[BlobInfo]:
+        """Size and validator of a blob, None if it does not exist"""
+
+    @abstractmethod
+    def iter_range(self, key: str, start: int, end: int) -> AsyncIterator[bytes]:
+        """Yield bytes start..end (inclusive)"""
+
+
+class LocalBlobStore(BlobStore):
+    def __init__(self, root: Path):
+        self.root = root.resolve()
+
+    def _path(self, key: str) -> Path:
+        if not is_blob_key(key):
+            raise FileNotFoundError(key)
+        path = (self.root / key).resolve()
+        if self.root not in path.parents:
+            raise FileNotFoundError(key)
+        return path
+
+    async def put(self, key: str, source: Path, content_type: str) -> None:
+        path = self._path(key)
+
+        def _move():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Same filesystem as the incoming dir, so this is an atomic rename
+            os.replace(source, path)
+
+        await asyncio.to_thread(_move)
+
+    async def exists(self, key: str) -> bool:
+        return await asyncio.to_thread(self._path(key).is_file)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._path(key).unlink, missing_ok=True)
+
+    async def stat(self, key: str) -> Optional[BlobInfo]:
+        try:
+            st = await asyncio.to_thread(os.stat, self._path(key))
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        sha256 = content_hash(key)
+        etag = sha256 or f"{st.st_mtime_ns:x}-{st.st_size:x}"
+        return BlobInfo(size=st.st_size, etag=etag, immutable=sha256 is not None)
+
+    async def iter_range(self, key: str, start: int, end: int) -> AsyncIterator[bytes]:
+        f = await asyncio.to_thread(open, self._path(key), "rb")
+        try:
+            await asyncio.to_thread(f.seek, start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = await asyncio.to_thread(f.read, min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+        finally:
+            await asyncio.to_thread(f.close)
+
+
+class S3BlobStore(BlobStore):
+    """S3 compatible store, e.g. a local MinIO standing in for S3"""
+
+    def __init__(self, bucket: str, endpoint_url: Optional[str] = None, prefix: str = "uploads/"):
+        import boto3
+        from botocore.exceptions import ClientError
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self._client = boto3.client("s3", endpoint_url=endpoint_url)
+        self._client_error = ClientError
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    async def put(self, key: str, source: Path, content_type: str) -> None:
+        await asyncio.to_thread(
+            self._client.upload_file, str(source), self.bucket, self._key(key),
+            ExtraArgs={"ContentType": content_type},
+        )
+        await asyncio.to_thread(source.unlink, missing_ok=True)
+
+    async def exists(self, key: str) -> bool:
+        return await self.stat(key) is not None
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._client.delete_object, Bucket=self.bucket, Key=self._key(key))
+
+    async def stat(self, key: str) -> Optional[BlobInfo]:
+        try:
+            head = await asyncio.to_thread(self._client.head_object, Bucket=self.bucket, Key=self._key(key))
+        except self._client_error:
+            return None
+        sha256 = content_hash(key)
+        etag = sha256 or head["ETag"].strip('"')
+        return BlobInfo(size=head["ContentLength"], etag=etag, immutable=sha256 is not None)
+
+    async def iter_range(self, key: str, start: int, end: int) -> AsyncIterator[bytes]:
+        obj = await asyncio.to_thread(
+            self._client.get_object, Bucket=self.bucket, Key=self._key(key), Range=f"bytes={start}-{end}"
+        )
+        body = obj["Body"]
+        try:
+            while True:
+                chunk = await asyncio.to_thread(body.read, CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            body.close()
+
+
+def create_blob_store(upload_dir: Path) -> BlobStore:
+    backend = os.environ.get('UPLOAD_STORAGE', 'local')
+    if backend == 's3':
+        return S3BlobStore(
+            bucket=os.environ['UPLOAD_S3_BUCKET'],
+            endpoint_url=os.environ.get('UPLOAD_S3_ENDPOINT'),
+        )
+    return LocalBlobStore(upload_dir)
+
+
+async def _clear_tombstone(db, sha256: str, token: str) -> None:
+    await db.blobs.update_one({"_id": sha256, "deleting": token}, {"$unset": {"deleting": "", "deleting_at": ""}})
+
+
+async def _wait_for_delete(db, sha256: str, token: str) -> None:
+    """Wait until the release that tombstoned this blob has deleted the file"""
+    deadline = asyncio.get_running_loop().time() + STALE_DELETE_SECONDS
+    while asyncio.get_running_loop().time() < deadline:
+        doc = await db.blobs.find_one({"_id": sha256}, {"deleting": 1})
+        if doc is None or doc.get("deleting") != token:
+            return
+        await asyncio.sleep(0.05)
+    # The releasing process died between tombstoning and cleaning up
+    await _clear_tombstone(db, sha256, token)
+
+
+async def acquire_blob(db, store: BlobStore, sha256: str, ext: str, source: Path, content_type: str) -> str:
+    """Add a reference to the blob with this hash, storing it on first use.
+
+    Returns the storage key. The source file is consumed or removed.
+    """
+    key = blob_key(sha256, ext)
+    previous = await db.blobs.find_one_and_update(
+        {"_id": sha256},
+        {
+            "$inc": {"refcount": 1},
+            "$setOnInsert": {
+                "key": key,
+                "content_type": content_type,
+                "size": source.stat().st_size,
+                "created_at": datetime.now(timezone.utc),
+            },
+        },
+        upsert=True,
+        return_document=ReturnDocument.BEFORE,
+    )
+    if previous is not None:
+        key = previous["key"]
+        if previous.get("deleting"):
+            # A release is deleting the file; putting it back before that
+            # finishes would let the delete remove the new copy
+            await _wait_for_delete(db, sha256, previous["deleting"])
+    if previous is None or not await store.exists(key):
+        await store.put(key, source, content_type)
+    else:
+        await asyncio.to_thread(source.unlink, missing_ok=True)
+    return key
+
+
+async def release_blob(db, store: BlobStore, sha256: str) -> None:
+    """Drop a reference, deleting the blob once nothing points at it.
+
+    The last reference turns the record into a tombstone (refcount 0 plus a
+    `deleting` token) instead of removing it. The file is deleted next, and
+    only then the record, and only if no acquire revived it meanwhile. An
+    acquire that finds a tombstone waits for the token to clear before it
+    checks and puts the file, so the delete can never remove its copy.
+    """
+    token = uuid.uuid4().hex
+    while True:
+        shared = await db.blobs.find_one_and_update(
+            {"_id": sha256, "refcount": {"$gt": 1}},
+            {"$inc": {"refcount": -1}},
+        )
+        if shared is not None:
+            return
+        last = await db.blobs.find_one_and_update(
+            {"_id": sha256, "refcount": {"$lte": 1}, "deleting": None},
+            {"$set": {"refcount": 0, "deleting": token, "deleting_at": datetime.now(timezone.utc)}},
+        )
+        if last is not None:
+            break
+        doc = await db.blobs.find_one({"_id": sha256}, {"deleting": 1, "deleting_at": 1})
+        if doc is None:
+            return
+        if doc.get("deleting") and doc["deleting_at"] < datetime.now(timezone.utc) - timedelta(seconds=STALE_DELETE_SECONDS):
+            await _clear_tombstone(db, sha256, doc["deleting"])
+        # An acquire raised the count between the two operations, or another
+        # release is still finishing; try again
+        await asyncio.sleep(0.05)
+
+    await store.delete(last["key"])
+    removed = await db.blobs.find_one_and_delete({"_id": sha256, "deleting": token, "refcount": 0})
+    if removed is None:
+        # Revived by an acquire, which is waiting for this to put the file back
+        await _clear_tombstone(db, sha256, token)
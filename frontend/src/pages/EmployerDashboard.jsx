@@ -19,6 +19,9 @@ const EmployerDashboard = ({ user, onLogout }) => {
   const navigate = useNavigate();
   const [employerDetails, setEmployerDetails] = useState(null);
   const [jobs, setJobs] = useState([]);
+  const [jobsTotal, setJobsTotal] = useState(0);
+  const [jobsCursor, setJobsCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [createJobOpen, setCreateJobOpen] = useState(false);
 
@@ -43,20 +46,13 @@ const EmployerDashboard = ({ user, onLogout }) => {
       const token = localStorage.getItem('token');
       const headers = { Authorization: `Bearer ${token}` };
 
-      // Fetch employer details
-      try {
-        const detailsRes = await axios.get(`${API}/employers/${user.id}`, { headers });
-        setEmployerDetails(detailsRes.data);
-      } catch (error) {
-        if (error.response?.status === 404) {
-          setEmployerDetails(null);
-        }
-      }
-
-      // Fetch employer's jobs
-      const jobsRes = await axios.get(`${API}/jobs`, { headers });
-      const myJobs = jobsRes.data.filter(job => job.employer_id === user.id);
-      setJobs(myJobs);
+      // Fetch employer details and own jobs in one request
+      const dashboardRes = await axios.get(`${API}/dashboard/employer/${user.id}`, { headers });
+      // Employer details are null until the profile is created
+      setEmployerDetails(dashboardRes.data.details);
+      setJobs(dashboardRes.data.jobs);
+      setJobsTotal(dashboardRes.data.jobs_total);
+      setJobsCursor(dashboardRes.data.jobs_next_cursor);
 
       setLoading(false);
     } catch (error) {
@@ -65,6 +61,25 @@ const EmployerDashboard = ({ user, onLogout }) => {
     }
   };
 
+  const loadMoreJobs = async () => {
+    setLoadingMore(true);
+    try {
+      const token = localStorage.getItem('token');
+      // The dashboard only carries the first page; the cursor continues on the jobs listing
+      const res = await axios.get(`${API}/employers/${user.id}/jobs`, {
+        headers: { Authorization: `Bearer ${token}` },
+        params: { cursor: jobsCursor },
+      });
+      setJobs((current) => [...current, ...res.data]);
+      setJobsCursor(res.headers['x-next-cursor'] || null);
+    } catch (error) {
+      console.error('Error fetching more jobs:', error);
+      toast.error('İlanlar yüklenemedi');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleCreateJob = async (e) => {
     e.preventDefault();
 
@@ -215,7 +230,7 @@ const EmployerDashboard = ({ user, onLogout }) => {
             </CardHeader>
             <CardContent>
               <div className="text-3xl font-bold text-blue-600">
-                {employerDetails?.total_jobs_posted || jobs.length}
+                {jobsTotal}
               </div>
             </CardContent>
           </Card>
@@ -250,7 +265,7 @@ const EmployerDashboard = ({ user, onLogout }) => {
         <Card>
           <CardHeader>
             <CardTitle>İlanlarım</CardTitle>
-            <CardDescription>Oluşturduğunuz iş ilanları</CardDescription>
+            <CardDescription>Oluşturduğunuz iş ilanları ({jobsTotal})</CardDescription>
           </CardHeader>
           <CardContent>
             {jobs.length > 0 ? (
@@ -284,6 +299,16 @@ const EmployerDashboard = ({ user, onLogout }) => {
                     </div>
                   </div>
                 ))}
+                {jobsCursor && (
+                  <Button
+                    variant="outline"
+                    className="w-full"
+                    disabled={loadingMore}
+                    onClick={loadMoreJobs}
+                  >
+                    {loadingMore ? 'Yükleniyor...' : `Daha Fazla Göster (${jobs.length}/${jobsTotal})`}
+                  </Button>
+                )}
               </div>
             ) : (
               <div className="text-center py-12">
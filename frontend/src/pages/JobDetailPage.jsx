@@ -36,9 +36,13 @@ const JobDetailPage = ({ user, onLogout }) => {
       const jobRes = await axios.get(`${API}/jobs/${jobId}`, { headers });
       setJob(jobRes.data);
 
-      // Fetch employer details
-      const employerRes = await axios.get(`${API}/employers/${jobRes.data.employer_id}`, { headers });
-      setEmployer(employerRes.data);
+      // Jobs embed the employer summary; older ones need the separate fetch
+      if (jobRes.data.employer) {
+        setEmployer(jobRes.data.employer);
+      } else {
+        const employerRes = await axios.get(`${API}/employers/${jobRes.data.employer_id}`, { headers });
+        setEmployer(employerRes.data);
+      }
 
       // If user is employer, fetch applications
       if (user && user.role === 'employer' && user.id === jobRes.data.employer_id) {
@@ -16,7 +16,10 @@ const WorkerDashboard = ({ user, onLogout }) => {
   const navigate = useNavigate();
   const [workerDetails, setWorkerDetails] = useState(null);
   const [skills, setSkills] = useState([]);
-  const [portfolio, setPortfolio] = useState([]);
+  const [skillsTotal, setSkillsTotal] = useState(0);
+  const [skillsCursor, setSkillsCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [portfolioTotal, setPortfolioTotal] = useState(0);
   const [applications, setApplications] = useState([]);
   const [loading, setLoading] = useState(true);
 
@@ -33,24 +36,15 @@ const WorkerDashboard = ({ user, onLogout }) => {
       const token = localStorage.getItem('token');
       const headers = { Authorization: `Bearer ${token}` };
 
-      // Fetch worker details
-      try {
-        const detailsRes = await axios.get(`${API}/workers/${user.id}`, { headers });
-        setWorkerDetails(detailsRes.data);
-      } catch (error) {
-        if (error.response?.status === 404) {
-          // Worker details not created yet
-          setWorkerDetails(null);
-        }
-      }
-
-      // Fetch skills
-      const skillsRes = await axios.get(`${API}/workers/${user.id}/skills`, { headers });
-      setSkills(skillsRes.data);
-
-      // Fetch portfolio
-      const portfolioRes = await axios.get(`${API}/portfolio/${user.id}`, { headers });
-      setPortfolio(portfolioRes.data);
+      // Fetch details, skills and portfolio in one request
+      const dashboardRes = await axios.get(`${API}/dashboard/worker/${user.id}`, { headers });
+      // Worker details are null until the profile is created
+      setWorkerDetails(dashboardRes.data.details);
+      setSkills(dashboardRes.data.skills);
+      setSkillsTotal(dashboardRes.data.skills_total);
+      setSkillsCursor(dashboardRes.data.skills_next_cursor);
+      // Only the count is shown here; the portfolio page lists the photos
+      setPortfolioTotal(dashboardRes.data.portfolio_total);
 
       setLoading(false);
     } catch (error) {
@@ -59,6 +53,25 @@ const WorkerDashboard = ({ user, onLogout }) => {
     }
   };
 
+  const loadMoreSkills = async () => {
+    setLoadingMore(true);
+    try {
+      const token = localStorage.getItem('token');
+      // The dashboard only carries the first page; the cursor continues on the skills listing
+      const res = await axios.get(`${API}/workers/${user.id}/skills`, {
+        headers: { Authorization: `Bearer ${token}` },
+        params: { cursor: skillsCursor },
+      });
+      setSkills((current) => [...current, ...res.data]);
+      setSkillsCursor(res.headers['x-next-cursor'] || null);
+    } catch (error) {
+      console.error('Error fetching more skills:', error);
+      toast.error('Yetenekler yüklenemedi');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   if (loading) {
     return (
       <div className="min-h-screen flex items-center justify-center">
@@ -116,7 +129,7 @@ const WorkerDashboard = ({ user, onLogout }) => {
             </CardHeader>
             <CardContent>
               <div className="text-3xl font-bold text-blue-600">
-                {portfolio.length}
+                {portfolioTotal}
               </div>
               <p className="text-sm text-gray-500 mt-1">fotoğraf</p>
             </CardContent>
@@ -180,7 +193,7 @@ const WorkerDashboard = ({ user, onLogout }) => {
           <Card>
             <CardHeader>
               <CardTitle>Yeteneklerim</CardTitle>
-              <CardDescription>Uzmanlık alanlarınız</CardDescription>
+              <CardDescription>Uzmanlık alanlarınız ({skillsTotal})</CardDescription>
             </CardHeader>
             <CardContent>
               {skills.length > 0 ? (
@@ -196,6 +209,16 @@ const WorkerDashboard = ({ user, onLogout }) => {
                       )}
                     </div>
                   ))}
+                  {skillsCursor && (
+                    <Button
+                      variant="outline"
+                      className="w-full"
+                      disabled={loadingMore}
+                      onClick={loadMoreSkills}
+                    >
+                      {loadingMore ? 'Yükleniyor...' : `Daha Fazla Göster (${skills.length}/${skillsTotal})`}
+                    </Button>
+                  )}
                 </div>
               ) : (
                 <div className="text-center py-8">
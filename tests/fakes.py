@@ -0,0 +1,340 @@
+"""Just enough of a Motor database for the modules under test.
+
+Covers the query operators, update operators and aggregation stages the
+backend modules use; anything else raises NotImplementedError so a test
+never passes on a silently ignored operator.
+"""
+import copy
+
+MISSING = object()
+
+
+def get_path(doc, path: str):
+    """Resolve a dotted path; through arrays it collects values like Mongo does"""
+    value = doc
+    for part in path.split("."):
+        if isinstance(value, list):
+            value = [item.get(part, MISSING) if isinstance(item, dict) else MISSING for item in value]
+            value = [item for item in value if item is not MISSING]
+        elif isinstance(value, dict):
+            value = value.get(part, MISSING)
+        else:
+            return MISSING
+        if value is MISSING:
+            return MISSING
+    return value
+
+
+def _compare(value, op: str, operand) -> bool:
+    if op == "$in":
+        return (None if value is MISSING else value) in operand
+    if op == "$nin":
+        return (None if value is MISSING else value) not in operand
+    if op == "$ne":
+        return (None if value is MISSING else value) != operand
+    if op == "$exists":
+        return (value is not MISSING) == bool(operand)
+    if value is MISSING or value is None:
+        return False
+    if op == "$gt":
+        return value > operand
+    if op == "$gte":
+        return value >= operand
+    if op == "$lt":
+        return value < operand
+    if op == "$lte":
+        return value <= operand
+    raise NotImplementedError(op)
+
+
+def matches(doc: dict, query: dict) -> bool:
+    for field, condition in query.items():
+        if field == "$or":
+            if not any(matches(doc, branch) for branch in condition):
+                return False
+            continue
+        if field == "$and":
+            if not all(matches(doc, branch) for branch in condition):
+                return False
+            continue
+        value = get_path(doc, field)
+        if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+            if not all(_compare(value, op, operand) for op, operand in condition.items()):
+                return False
+        elif (None if value is MISSING else value) != condition:
+            return False
+    return True
+
+
+def project(doc: dict, projection) -> dict:
+    if not projection:
+        return copy.deepcopy(doc)
+    included = [k for k, v in projection.items() if v and k != "_id"]
+    if not included:
+        return {k: copy.deepcopy(v) for k, v in doc.items() if projection.get(k, 1)}
+    out = {k: copy.deepcopy(doc[k]) for k in included if k in doc}
+    if projection.get("_id", 1) and "_id" in doc:
+        out["_id"] = doc["_id"]
+    return out
+
+
+def _set_path(doc: dict, path: str, value) -> None:
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def _unset_path(doc: dict, path: str) -> None:
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.get(part, {})
+    doc.pop(parts[-1], None)
+
+
+def apply_update(doc: dict, update: dict, inserting: bool = False) -> None:
+    for op, fields in update.items():
+        for path, value in fields.items():
+            if op == "$set" or (op == "$setOnInsert" and inserting):
+                _set_path(doc, path, copy.deepcopy(value))
+            elif op == "$setOnInsert":
+                pass
+            elif op == "$inc":
+                current = get_path(doc, path)
+                _set_path(doc, path, (0 if current is MISSING else current) + value)
+            elif op == "$unset":
+                _unset_path(doc, path)
+            elif op == "$max":
+                current = get_path(doc, path)
+                if current is MISSING or value > current:
+                    _set_path(doc, path, value)
+            else:
+                raise NotImplementedError(op)
+
+
+def _upsert_base(query: dict) -> dict:
+    return {k: v for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)}
+
+
+# Aggregation expressions
+
+def evaluate(expr, doc):
+    if isinstance(expr, str) and expr.startswith("$"):
+        value = get_path(doc, expr[1:])
+        return None if value is MISSING else value
+    if isinstance(expr, dict):
+        if len(expr) == 1 and next(iter(expr)).startswith("$"):
+            op, args = next(iter(expr.items()))
+            if op == "$literal":
+                return args
+            if op == "$cond":
+                condition, then, otherwise = args
+                return evaluate(then if evaluate(condition, doc) else otherwise, doc)
+            if op == "$and":
+                return all(evaluate(arg, doc) for arg in args)
+            if op == "$or":
+                return any(evaluate(arg, doc) for arg in args)
+            if op == "$not":
+                return not evaluate(args[0], doc)
+            if op == "$eq":
+                return evaluate(args[0], doc) == evaluate(args[1], doc)
+            if op == "$ne":
+                return evaluate(args[0], doc) != evaluate(args[1], doc)
+            if op == "$in":
+                return evaluate(args[0], doc) in evaluate(args[1], doc)
+            if op == "$ifNull":
+                value = evaluate(args[0], doc)
+                return evaluate(args[1], doc) if value is None else value
+            if op == "$arrayElemAt":
+                array, index = evaluate(args[0], doc), evaluate(args[1], doc)
+                return array[index] if array and -len(array) <= index < len(array) else None
+            raise NotImplementedError(op)
+        return {key: evaluate(value, doc) for key, value in expr.items()}
+    return expr
+
+
+def run_pipeline(docs, pipeline, db) -> list:
+    rows = [copy.deepcopy(doc) for doc in docs]
+    for stage in pipeline:
+        (name, spec), = stage.items()
+        if name == "$match":
+            rows = [row for row in rows if matches(row, spec)]
+        elif name == "$lookup":
+            foreign = getattr(db, spec["from"]).docs
+            for row in rows:
+                local = get_path(row, spec["localField"])
+                row[spec["as"]] = [
+                    copy.deepcopy(other) for other in foreign
+                    if get_path(other, spec["foreignField"]) == local
+                ]
+        elif name == "$project":
+            projected = []
+            for row in rows:
+                out = {} if spec.get("_id", 1) == 0 else {"_id": row.get("_id")}
+                for key, value in spec.items():
+                    if key == "_id":
+                        continue
+                    if value in (1, True):
+                        if key in row:
+                            out[key] = row[key]
+                    else:
+                        out[key] = evaluate(value if not isinstance(value, str) or value.startswith("$")
+                                            else {"$literal": value}, row)
+                projected.append(out)
+            rows = projected
+        elif name == "$unionWith":
+            rows = rows + run_pipeline(getattr(db, spec["coll"]).docs, spec.get("pipeline", []), db)
+        elif name == "$group":
+            groups = {}
+            for row in rows:
+                key = evaluate(spec["_id"], row)
+                group = groups.setdefault(repr(key), {"_id": key})
+                for field, accumulator in spec.items():
+                    if field == "_id":
+                        continue
+                    (op, arg), = accumulator.items()
+                    value = evaluate(arg, row)
+                    if op == "$sum":
+                        group[field] = group.get(field, 0) + (value if isinstance(value, (int, float)) else 0)
+                    elif op == "$first":
+                        group.setdefault(field, value)
+                    else:
+                        raise NotImplementedError(op)
+            rows = list(groups.values())
+        else:
+            raise NotImplementedError(name)
+    return rows
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def batch_size(self, size):
+        return self
+
+    def sort(self, *args, **kwargs):
+        return self
+
+    def __aiter__(self):
+        self._iter = iter(self.rows)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def to_list(self, length=None):
+        return list(self.rows if length is None else self.rows[:length])
+
+
+class BulkResult:
+    def __init__(self, modified_count: int):
+        self.modified_count = modified_count
+
+
+class DuplicateKey(Exception):
+    pass
+
+
+class FakeCollection:
+    def __init__(self, db, duplicate_error=DuplicateKey):
+        self.db = db
+        self.docs = []
+        self.duplicate_error = duplicate_error
+
+    async def insert_one(self, doc: dict):
+        if "_id" in doc and any(d.get("_id") == doc["_id"] for d in self.docs):
+            raise self.duplicate_error("duplicate key")
+        self.docs.append(copy.deepcopy(doc))
+
+    def find(self, query: dict = None, projection=None):
+        return FakeCursor([project(doc, projection) for doc in self.docs if matches(doc, query or {})])
+
+    async def find_one(self, query: dict, projection=None):
+        for doc in self.docs:
+            if matches(doc, query):
+                return project(doc, projection)
+        return None
+
+    def _update(self, query: dict, update: dict, upsert: bool = False, many: bool = False) -> int:
+        modified = 0
+        for doc in self.docs:
+            if matches(doc, query):
+                before = copy.deepcopy(doc)
+                apply_update(doc, update)
+                modified += doc != before
+                if not many:
+                    return modified
+        if modified == 0 and upsert:
+            doc = _upsert_base(query)
+            apply_update(doc, update, inserting=True)
+            self.docs.append(doc)
+        return modified
+
+    async def update_one(self, query: dict, update: dict, upsert: bool = False):
+        return BulkResult(self._update(query, update, upsert))
+
+    async def update_many(self, query: dict, update: dict):
+        return BulkResult(self._update(query, update, many=True))
+
+    async def find_one_and_update(
+        self, query: dict, update: dict, projection=None, return_document=None, upsert: bool = False
+    ):
+        for doc in self.docs:
+            if matches(doc, query):
+                before = project(doc, projection)
+                apply_update(doc, update)
+                # pymongo's ReturnDocument.AFTER is True
+                return project(doc, projection) if return_document else before
+        if upsert:
+            doc = _upsert_base(query)
+            apply_update(doc, update, inserting=True)
+            self.docs.append(doc)
+            return project(doc, projection) if return_document else None
+        return None
+
+    async def find_one_and_delete(self, query: dict, projection=None):
+        for i, doc in enumerate(self.docs):
+            if matches(doc, query):
+                del self.docs[i]
+                return project(doc, projection)
+        return None
+
+    async def replace_one(self, query: dict, doc: dict, upsert: bool = False):
+        for i, existing in enumerate(self.docs):
+            if matches(existing, query):
+                self.docs[i] = copy.deepcopy(doc)
+                return BulkResult(1)
+        if upsert:
+            self.docs.append(copy.deepcopy(doc))
+        return BulkResult(0)
+
+    async def delete_one(self, query: dict):
+        for i, doc in enumerate(self.docs):
+            if matches(doc, query):
+                del self.docs[i]
+                return
+
+    async def bulk_write(self, ops, ordered: bool = True):
+        modified = 0
+        for op in ops:
+            many = type(op).__name__ == "UpdateMany"
+            modified += self._update(op._filter, op._doc, getattr(op, "_upsert", False) or False, many=many)
+        return BulkResult(modified)
+
+    def aggregate(self, pipeline, **kwargs):
+        return FakeCursor(run_pipeline(self.docs, pipeline, self.db))
+
+
+class FakeDb:
+    def __init__(self, duplicate_error=DuplicateKey):
+        self._collections = {}
+        self._duplicate_error = duplicate_error
+
+    def __getattr__(self, name: str) -> FakeCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self._collections.setdefault(name, FakeCollection(self, self._duplicate_error))
@@ -0,0 +1,54 @@
+from candidate_pool import CandidatePool, PoolLoader
+
+CATEGORIES = {"metal": {"parent_id": None}, "cnc": {"parent_id": "metal"}, "weld": {"parent_id": "metal"}}
+WORKERS = [
+    {"user_id": "w1", "city": "İstanbul", "district": "Tuzla"},
+    {"user_id": "w2", "city": "istanbul", "district": "Pendik"},
+    {"user_id": "w3", "city": "Kocaeli", "district": "Gebze"},
+]
+SKILLS = [
+    {"worker_id": "w1", "skill_category_id": "cnc"},
+    {"worker_id": "w2", "skill_category_id": "weld"},
+    {"worker_id": "w3", "skill_category_id": "cnc"},
+    {"worker_id": "w3", "skill_category_id": "weld"},
+]
+
+
+def streamed() -> CandidatePool:
+    loader = PoolLoader(CATEGORIES)
+    for worker in WORKERS:
+        loader.add_worker(worker)
+    for skill in SKILLS:
+        loader.add_skill(skill)
+    return loader.finish()
+
+
+def test_streamed_load_matches_incremental_updates():
+    incremental = CandidatePool()
+    incremental.load(CATEGORIES, [], [])
+    for worker in WORKERS:
+        incremental.set_location(worker["user_id"], worker["city"], worker["district"])
+    for skill in SKILLS:
+        incremental.add_skill(skill["worker_id"], skill["skill_category_id"])
+
+    pool = streamed()
+    for wanted, city in [(["metal"], None), (["cnc", "weld"], None), (["weld"], "İstanbul"), (["cnc"], "Kocaeli")]:
+        assert pool.count(wanted, city=city) == incremental.count(wanted, city=city)
+    assert pool.count(["metal"], city="İstanbul") == {"all_skills": 2, "any_skill": 2, "in_location": 2}
+
+
+def test_load_replaces_the_previous_state():
+    pool = CandidatePool()
+    pool.load(CATEGORIES, [{"user_id": "old", "city": "Bursa"}], [])
+    pool.load(CATEGORIES, WORKERS, SKILLS)
+    assert len(pool) == 3
+    assert pool.count([], city="Bursa")["in_location"] == 0
+
+
+def test_removed_worker_no_longer_counts():
+    pool = streamed()
+    pool.remove_worker("w3")
+    assert pool.count(["cnc"]) == {"all_skills": 1, "any_skill": 1, "in_location": 2}
+    # The freed slot is reused without stale bits
+    pool.set_location("w4", "Kocaeli", "Gebze")
+    assert pool.count(["cnc"], city="Kocaeli")["all_skills"] == 0
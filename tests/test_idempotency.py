@@ -0,0 +1,159 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("pymongo")
+
+from pymongo.errors import DuplicateKeyError  # noqa: E402
+
+import idempotency  # noqa: E402
+from tests.fakes import FakeDb  # noqa: E402
+
+
+class App:
+    """ASGI app answering with a fixed status and counting its calls"""
+
+    def __init__(self, status: int):
+        self.status = status
+        self.calls = 0
+
+    async def __call__(self, scope, receive, send):
+        self.calls += 1
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        await send({"type": "http.response.start", "status": self.status, "headers": []})
+        await send({"type": "http.response.body", "body": b"call %d" % self.calls})
+
+
+def request(middleware, body: bytes = b'{"a": 1}', key: bytes = b"k1", content_type: bytes = b"application/json"):
+    scope = {
+        "type": "http", "method": "POST", "path": "/api/jobs", "query_string": b"",
+        "headers": [(b"idempotency-key", key), (b"content-type", content_type)],
+    }
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+    headers = dict(sent[0].get("headers", []))
+    return sent[0]["status"], sent[1]["body"], headers
+
+
+def make(status: int):
+    app = App(status)
+    db = FakeDb(duplicate_error=DuplicateKeyError)
+    return app, idempotency.IdempotencyMiddleware(app, lambda: db, ["/api/jobs"]), db
+
+
+def test_success_is_replayed_without_running_the_handler():
+    app, middleware, _ = make(201)
+    assert request(middleware)[:2] == (201, b"call 1")
+    status, body, headers = request(middleware)
+    assert (status, body, app.calls) == (201, b"call 1", 1)
+    assert headers[b"idempotent-replayed"] == b"true"
+
+
+@pytest.mark.parametrize("status", [400, 422])
+def test_validation_errors_are_replayed(status):
+    app, middleware, _ = make(status)
+    request(middleware)
+    request(middleware)
+    assert app.calls == 1
+
+
+@pytest.mark.parametrize("status", [401, 403, 404, 409, 429, 500, 503])
+def test_other_failures_release_the_key(status):
+    app, middleware, db = make(status)
+    request(middleware)
+    assert db.idempotency_keys.docs == []
+    app.status = 201
+    assert request(middleware)[:2] == (201, b"call 2")
+    assert request(middleware)[:2] == (201, b"call 2")
+
+
+def test_reusing_a_key_with_another_body_is_rejected():
+    app, middleware, _ = make(201)
+    request(middleware, body=b'{"a": 1}')
+    status, _, _ = request(middleware, body=b'{"a": 2}')
+    assert (status, app.calls) == (422, 1)
+
+
+def test_multipart_bodies_are_fingerprinted_while_streamed():
+    app, middleware, db = make(201)
+    multipart = b"multipart/form-data; boundary=x"
+    request(middleware, body=b"first upload", content_type=multipart)
+    assert db.idempotency_keys.docs[0]["fingerprint"] is not None
+    assert request(middleware, body=b"first upload", content_type=multipart)[:2] == (201, b"call 1")
+    status, _, _ = request(middleware, body=b"other upload", content_type=multipart)
+    assert (status, app.calls) == (422, 1)
+
+
+def test_should_buffer_skips_large_and_multipart_bodies():
+    assert idempotency.should_buffer({b"content-length": b"100"})
+    assert not idempotency.should_buffer({b"content-length": str(2 * 1024 * 1024).encode()})
+    assert not idempotency.should_buffer({b"content-type": b"multipart/form-data; boundary=x"})
+
+
+def test_expired_lease_is_taken_over():
+    _, middleware, db = make(201)
+    middleware.wait_timeout = 1.0
+    # A worker that claimed the key and died without releasing it
+    asyncio.run(middleware._lookup("dead", "crashed-owner"))
+    db.idempotency_keys.docs[0]["lease_until"] -= idempotency.timedelta(seconds=60)
+    assert asyncio.run(middleware._lookup("dead", "new-owner")) is None
+    assert db.idempotency_keys.docs[0]["owner"] == "new-owner"
+
+
+def test_live_lease_is_not_taken_over():
+    _, middleware, db = make(201)
+    middleware.wait_timeout = 0.3
+    asyncio.run(middleware._lookup("busy", "owner-1"))
+    stored = asyncio.run(middleware._lookup("busy", "owner-2"))
+    assert stored["status_code"] == 409
+    assert db.idempotency_keys.docs[0]["owner"] == "owner-1"
+
+
+def test_cancelled_handler_releases_waiters_and_the_key():
+    db = FakeDb(duplicate_error=DuplicateKeyError)
+    started = []
+
+    async def hanging_app(scope, receive, send):
+        await receive()
+        started.append(True)
+        await asyncio.sleep(3600)
+
+    middleware = idempotency.IdempotencyMiddleware(hanging_app, lambda: db, ["/api/jobs"])
+    scope = {
+        "type": "http", "method": "POST", "path": "/api/jobs", "query_string": b"",
+        "headers": [(b"idempotency-key", b"k1"), (b"content-type", b"application/json")],
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"{}", "more_body": False}
+
+    async def send(message):
+        pass
+
+    async def scenario():
+        owner = asyncio.create_task(middleware(scope, receive, send))
+        while not started:
+            await asyncio.sleep(0)
+        key = next(iter(middleware._in_flight))
+        waiter = asyncio.create_task(middleware._lookup(key, "waiter"))
+        await asyncio.sleep(0)
+        owner.cancel()
+        await asyncio.gather(owner, return_exceptions=True)
+        # The waiter is not left hanging on the future: it claims the key itself
+        assert await asyncio.wait_for(waiter, 5) is None
+        assert db.idempotency_keys.docs[0]["owner"] == "waiter"
+        assert middleware._in_flight == {}
+
+    asyncio.run(scenario())
@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("pymongo")
+
+import invalidation  # noqa: E402
+from tests.fakes import FakeDb  # noqa: E402
+
+
+class FlakyBus(invalidation.InvalidationBus):
+    """Fails the first `failures` subscriptions with errors pymongo does not raise"""
+
+    def __init__(self, failures: int):
+        super().__init__(FakeDb(), ["jobs"], poll_interval=0.001)
+        self.failures = failures
+        self.attempts = 0
+        self.subscribed = asyncio.Event()
+
+    async def _watch(self):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise RuntimeError("boom")
+        self.subscribed.set()
+        await asyncio.sleep(3600)
+
+
+def test_any_error_is_logged_and_the_stream_resubscribed():
+    async def scenario():
+        bus = FlakyBus(failures=3)
+        bus.start()
+        await asyncio.wait_for(bus.subscribed.wait(), 1)
+        await bus.stop()
+        return bus.attempts
+
+    assert asyncio.run(scenario()) == 4
+
+
+def test_retry_delay_backs_off_and_resets_after_a_healthy_stream():
+    bus = invalidation.InvalidationBus(None, ["jobs"], poll_interval=1.0)
+    assert [bus._next_retry_delay() for _ in range(8)] == [1, 2, 4, 8, 16, 32, 60, 60]
+    bus._subscribed = True
+    assert bus._next_retry_delay() == 1
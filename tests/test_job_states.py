@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("pymongo")
+
+import job_states  # noqa: E402
+from tests.fakes import FakeDb  # noqa: E402
+from job_states import TransitionError  # noqa: E402
+
+
+def make_db(status: str = job_states.OPEN, worker_id=None) -> FakeDb:
+    db = FakeDb()
+    db.jobs.docs.append({
+        "id": "job1", "employer_id": "emp1", "assigned_worker_id": worker_id,
+        "job_status": status, "required_skills": ["s1"],
+    })
+    return db
+
+
+def transition(db, *args, **kwargs):
+    return asyncio.run(job_states.transition(db, *args, **kwargs))
+
+
+def test_match_assigns_the_worker_and_logs_the_event():
+    db = make_db()
+    event = transition(db, "job1", "match", "emp1", assign_worker_id="w1")
+    assert (event["from_status"], event["to_status"], event["worker_id"]) == ("open", "matched", "w1")
+    job = db.jobs.docs[0]
+    assert job["job_status"] == "matched" and job["assigned_worker_id"] == "w1"
+    assert [e["action"] for e in db.job_events.docs] == ["match"]
+
+
+def test_invalid_source_status_is_rejected_and_nothing_changes():
+    db = make_db(job_states.COMPLETED)
+    with pytest.raises(TransitionError) as exc:
+        transition(db, "job1", "cancel", "emp1")
+    assert exc.value.reason == "invalid_status"
+    assert db.jobs.docs[0]["job_status"] == "completed"
+    assert db.job_events.docs == []
+
+
+def test_only_the_employer_may_run_employer_actions():
+    db = make_db()
+    with pytest.raises(TransitionError) as exc:
+        transition(db, "job1", "cancel", "someone-else")
+    assert exc.value.reason == "forbidden"
+
+
+def test_dispute_is_open_to_the_assigned_worker():
+    db = make_db(job_states.IN_PROGRESS, worker_id="w1")
+    event = transition(db, "job1", "dispute", "w1", reason="unpaid")
+    assert event["to_status"] == "disputed"
+    assert db.jobs.docs[0]["dispute_status"] == "worker_disputed"
+    with pytest.raises(TransitionError):
+        transition(make_db(job_states.IN_PROGRESS, worker_id="w1"), "job1", "dispute", "w2")
+
+
+def test_admin_resolution_needs_no_party_match():
+    db = make_db(job_states.DISPUTED, worker_id="w1")
+    event = transition(db, "job1", "resolve_completed", "admin1")
+    assert event["to_status"] == "completed"
+    assert db.jobs.docs[0]["dispute_status"] == "resolved"
+
+
+def test_unknown_job():
+    with pytest.raises(TransitionError) as exc:
+        transition(FakeDb(), "missing", "start", "emp1")
+    assert exc.value.reason == "not_found"
@@ -0,0 +1,68 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("pymongo")
+
+import marketplace_stats  # noqa: E402
+from tests.fakes import FakeDb  # noqa: E402
+
+NOW = datetime(2026, 10, 19, 12, tzinfo=timezone.utc)
+
+
+def read(db) -> dict:
+    return asyncio.run(marketplace_stats.read_stats(db, NOW - timedelta(days=1), NOW))
+
+
+def test_totals_are_summed_across_current_shards():
+    db = FakeDb()
+
+    async def write():
+        for _ in range(40):
+            await marketplace_stats.record_job_created(db, "Bursa", ["kaynak"], NOW)
+
+    asyncio.run(write())
+    # The writes were spread over several shards
+    assert len([d for d in db.daily_stats.docs if d["_id"] in marketplace_stats.CURRENT_IDS]) > 1
+    current = read(db)["current"]
+    assert (current["jobs_total"], current["open_jobs_total"]) == (40, 40)
+    assert current["open_jobs"] == {"Bursa": {"kaynak": 40}}
+    assert read(db)["days"][0]["jobs_created_by_city"] == {"Bursa": 40}
+
+
+def test_expired_open_jobs_leave_the_open_counts_once():
+    db = FakeDb()
+    db.employer_details.docs.append({"user_id": "e1", "city": "Bursa"})
+    db.jobs.docs += [
+        {"id": "old", "employer_id": "e1", "job_status": "open", "required_skills": ["kaynak"],
+         "expires_at": NOW - timedelta(hours=1)},
+        {"id": "fresh", "employer_id": "e1", "job_status": "open", "required_skills": ["kaynak"],
+         "expires_at": NOW + timedelta(days=1)},
+    ]
+
+    async def scenario():
+        for _ in db.jobs.docs:
+            await marketplace_stats.record_job_created(db, "Bursa", ["kaynak"], NOW - timedelta(days=2))
+        assert await marketplace_stats.sweep_expired_jobs(db, NOW) == 1
+        assert await marketplace_stats.sweep_expired_jobs(db, NOW) == 0
+
+    asyncio.run(scenario())
+    stats = read(db)
+    assert stats["current"]["open_jobs_total"] == 1
+    assert stats["current"]["open_jobs"]["Bursa"]["kaynak"] == 1
+    assert stats["days"][-1]["jobs_closed"] == 1
+    assert db.jobs.docs[0]["expiry_recorded"] is True
+
+
+def test_matching_an_expired_job_does_not_decrement_open_again():
+    db = FakeDb()
+
+    async def scenario():
+        await marketplace_stats.record_job_created(db, "Bursa", ["kaynak"], NOW)
+        await marketplace_stats.record_job_closed(db, "Bursa", ["kaynak"], NOW)
+        await marketplace_stats.record_match(db, "Bursa", ["kaynak"], NOW, NOW, was_open=False)
+
+    asyncio.run(scenario())
+    current = read(db)["current"]
+    assert (current["open_jobs_total"], current["matches_total"]) == (0, 1)
@@ -0,0 +1,37 @@
+from datetime import datetime, timezone
+
+import pytest
+
+import pagination
+
+
+def test_cursor_round_trip():
+    when = datetime(2026, 3, 1, 12, 30, tzinfo=timezone.utc)
+    assert pagination.decode_cursor(pagination.encode_cursor(when, "abc|def")) == (when, "abc|def")
+
+
+def test_invalid_cursor_raises_value_error():
+    with pytest.raises(ValueError):
+        pagination.decode_cursor("not-a-cursor")
+
+
+def test_split_page_uses_the_extra_row_only_for_the_cursor():
+    rows = [{"id": str(i), "created_at": datetime(2026, 1, 10 - i, tzinfo=timezone.utc)} for i in range(3)]
+    page, cursor = pagination.split_page(rows, "created_at", 2)
+    assert page == rows[:2]
+    assert pagination.decode_cursor(cursor) == (rows[1]["created_at"], "1")
+    assert pagination.split_page(rows, "created_at", 3) == (rows, None)
+
+
+def test_string_dates_get_a_cursor_that_stays_among_the_strings():
+    rows = [{"id": "1", "created_at": "2026-01-09T10:00:00+00:00"}, {"id": "2", "created_at": "2026-01-08"}]
+    page, cursor = pagination.split_page(rows, "created_at", 1)
+    assert pagination.decode_cursor(cursor) == ("2026-01-09T10:00:00+00:00", "1")
+    query = pagination.page_query({}, "created_at", cursor)
+    assert {"created_at": {"$type": "string"}} not in query["$or"]
+
+
+def test_date_cursor_continues_into_unmigrated_string_dates():
+    cursor = pagination.encode_cursor(datetime(2026, 1, 9, tzinfo=timezone.utc), "1")
+    query = pagination.page_query({}, "created_at", cursor)
+    assert {"created_at": {"$type": "string"}} in query["$or"]
@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+import ratelimit
+from ratelimit import Budget, InMemoryBucketStore, RateLimiter, RateLimitExceeded
+
+
+def make_limiter(burst: int = 1, max_concurrent: int = 10) -> RateLimiter:
+    # A practically zero refill rate keeps the tests independent of the clock
+    return RateLimiter(InMemoryBucketStore(), {"upload": Budget(rate=1e-6, burst=burst)}, max_concurrent)
+
+
+async def tokens(limiter: RateLimiter, key: str) -> bool:
+    allowed, _ = await limiter.store.peek(f"upload:{key}", limiter.budgets["upload"])
+    return allowed
+
+
+def test_admit_charges_every_key():
+    async def run():
+        limiter = make_limiter()
+        await limiter.admit("upload", ["ip:a", "user:u"])
+        limiter.release()
+        assert not await tokens(limiter, "ip:a")
+        assert not await tokens(limiter, "user:u")
+        assert limiter.allowed["upload"] == 1
+    asyncio.run(run())
+
+
+def test_rejection_on_one_key_does_not_charge_the_others():
+    async def run():
+        limiter = make_limiter()
+        await limiter.admit("upload", ["user:u"])
+        limiter.release()
+        with pytest.raises(RateLimitExceeded) as exc:
+            await limiter.admit("upload", ["ip:fresh", "user:u"])
+        assert exc.value.reason == "rate"
+        assert await tokens(limiter, "ip:fresh")
+        assert limiter.in_flight == 0
+    asyncio.run(run())
+
+
+def test_concurrency_rejection_does_not_charge_tokens():
+    async def run():
+        limiter = make_limiter(burst=5, max_concurrent=1)
+        await limiter.admit("upload", ["ip:a"])
+        with pytest.raises(RateLimitExceeded) as exc:
+            await limiter.admit("upload", ["ip:b"])
+        assert exc.value.reason == "concurrency"
+        assert limiter.concurrency_rejected["upload"] == 1
+        limiter.release()
+        # ip:b still has its full burst
+        for _ in range(5):
+            await limiter.admit("upload", ["ip:b"])
+            limiter.release()
+        assert not await tokens(limiter, "ip:b")
+    asyncio.run(run())
+
+
+def test_check_never_charges():
+    async def run():
+        limiter = make_limiter()
+        for _ in range(3):
+            await limiter.check("upload", ["ip:a"])
+        assert await tokens(limiter, "ip:a")
+    asyncio.run(run())
+
+
+def test_retry_after_header_is_at_least_one_second():
+    assert ratelimit.RateLimitExceeded(0.2, "rate").retry_after_header == "1"
+    assert ratelimit.RateLimitExceeded(2.1, "rate").retry_after_header == "3"
+
+
+def test_charge_only_delays_and_never_rejects():
+    async def run():
+        limiter = make_limiter(burst=2)
+        assert await limiter.delay("upload", "user:victim", 5.0) == 0.0
+        for _ in range(3):
+            await limiter.charge("upload", "user:victim")
+        # Empty bucket: the wait is capped instead of turning into a 429
+        assert await limiter.delay("upload", "user:victim", 5.0) == 5.0
+        assert limiter.delayed["upload"] == 1
+        await limiter.admit("upload", ["ip:a"])
+        limiter.release()
+    asyncio.run(run())
@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("pymongo")
+pytest.importorskip("fastapi")
+
+import reliability  # noqa: E402
+from tests.fakes import FakeDb  # noqa: E402
+
+
+def make_db() -> FakeDb:
+    db = FakeDb()
+    db.worker_details.docs += [
+        {"user_id": "w1", "ghosting_count": 0, "rejected_job_count": 0, "total_jobs_completed": 0},
+        {"user_id": "w2", "ghosting_count": 0, "rejected_job_count": 0, "total_jobs_completed": 0},
+        # Stale counters from earlier activity that has since been deleted
+        {"user_id": "idle", "ghosting_count": 3, "rejected_job_count": 2, "total_jobs_completed": 9},
+    ]
+    db.employer_details.docs += [
+        {"user_id": "e1", "cancellation_count": 0, "payment_reliability_score": 5.0},
+        {"user_id": "e2", "cancellation_count": 4, "payment_reliability_score": 1.0},
+    ]
+    db.jobs.docs += [
+        {"id": "done", "employer_id": "e1", "job_status": "completed"},
+        {"id": "open", "employer_id": "e1", "job_status": "open"},
+        {"id": "gone", "employer_id": "e1", "job_status": "cancelled"},
+    ]
+    db.job_applications.docs += [
+        {"id": "a1", "job_id": "done", "worker_id": "w1", "status": "accepted", "responded_at": "t"},
+        # Withdrew after being accepted: ghosting
+        {"id": "a2", "job_id": "open", "worker_id": "w1", "status": "withdrawn", "responded_at": "t"},
+        # Withdrew before any response: a job the worker turned down
+        {"id": "a3", "job_id": "open", "worker_id": "w2", "status": "withdrawn", "responded_at": None},
+        # Rejected by the employer: not held against the worker
+        {"id": "a4", "job_id": "done", "worker_id": "w2", "status": "rejected", "responded_at": None},
+        # Accepted on a job that is not finished yet
+        {"id": "a5", "job_id": "open", "worker_id": "w2", "status": "accepted", "responded_at": "t"},
+    ]
+    db.ratings.docs += [
+        {"to_user_id": "e1", "payment_made": True},
+        {"to_user_id": "e1", "payment_made": True},
+        {"to_user_id": "e1", "payment_made": False},
+        {"to_user_id": "e1", "payment_made": None},
+    ]
+    return db
+
+
+def profile(collection, user_id: str) -> dict:
+    return next(doc for doc in collection.docs if doc["user_id"] == user_id)
+
+
+def test_pipeline_counts_ghosting_rejected_and_completed():
+    db = make_db()
+    rows = asyncio.run(db.job_applications.aggregate(reliability.build_score_pipeline()).to_list(None))
+    by_user = {row["_id"]: row for row in rows}
+    assert (by_user["w1"]["ghosting"], by_user["w1"]["rejected"], by_user["w1"]["completed"]) == (1, 0, 1)
+    assert (by_user["w2"]["ghosting"], by_user["w2"]["rejected"], by_user["w2"]["completed"]) == (0, 1, 0)
+    assert (by_user["e1"]["cancelled"], by_user["e1"]["paid"], by_user["e1"]["payment_rated"]) == (1, 2, 3)
+
+
+def test_pipeline_is_scoped_to_the_given_users():
+    db = make_db()
+    rows = asyncio.run(db.job_applications.aggregate(reliability.build_score_pipeline(["w2"])).to_list(None))
+    assert [row["_id"] for row in rows] == ["w2"]
+
+
+@pytest.mark.parametrize("paid, rated, expected", [(0, 0, 5.0), (2, 3, 3.33), (4, 4, 5.0), (0, 2, 0.0)])
+def test_payment_reliability(paid, rated, expected):
+    assert reliability.payment_reliability(paid, rated) == expected
+
+
+def test_full_run_writes_scores_and_resets_users_without_activity():
+    db = make_db()
+    result = asyncio.run(reliability.run_scoring(db, full=True))
+
+    assert result["mode"] == "full"
+    assert profile(db.worker_details, "w1")["ghosting_count"] == 1
+    assert profile(db.worker_details, "w1")["total_jobs_completed"] == 1
+    assert profile(db.worker_details, "w2")["rejected_job_count"] == 1
+    assert profile(db.employer_details, "e1")["cancellation_count"] == 1
+    assert profile(db.employer_details, "e1")["payment_reliability_score"] == 3.33
+
+    idle = profile(db.worker_details, "idle")
+    assert (idle["ghosting_count"], idle["rejected_job_count"], idle["total_jobs_completed"]) == (0, 0, 0)
+    e2 = profile(db.employer_details, "e2")
+    assert (e2["cancellation_count"], e2["payment_reliability_score"]) == (0, 5.0)
+
+    assert db.pipeline_checkpoints.docs[0]["_id"] == reliability.CHECKPOINT_ID
+
+
+def test_recompute_resets_touched_users_whose_activity_is_gone():
+    db = make_db()
+    db.job_applications.docs = [a for a in db.job_applications.docs if a["worker_id"] != "w1"]
+    profile(db.worker_details, "w1")["ghosting_count"] = 1
+
+    counts = asyncio.run(reliability.recompute_for_users(db, ["w1"]))
+
+    assert counts["users"] == 1
+    assert profile(db.worker_details, "w1")["ghosting_count"] == 0
+    # Untouched users keep their counters on an incremental run
+    assert profile(db.worker_details, "idle")["ghosting_count"] == 3
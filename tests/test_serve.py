@@ -0,0 +1,19 @@
+import pytest
+
+pytest.importorskip("uvicorn")
+pytest.importorskip("dotenv")
+
+import serve  # noqa: E402
+
+
+def test_budgets_are_split_between_workers():
+    settings = serve.worker_settings(4, 8, {"MONGO_MAX_POOL_SIZE": "100", "EXPENSIVE_MAX_CONCURRENT": "32"})
+    assert settings["MONGO_MAX_POOL_SIZE"] == "25"
+    assert settings["BCRYPT_THREADS"] == "2"
+    assert settings["CPU_PROCESSES"] == "2"
+    assert settings["EXPENSIVE_MAX_CONCURRENT"] == "8"
+
+
+@pytest.mark.parametrize("env, expected", [({}, 1), ({"CPU_PROCESSES": "2"}, 1), ({"CPU_PROCESSES": "0"}, 0)])
+def test_every_worker_gets_a_process_unless_disabled(env, expected):
+    assert serve.cpu_processes(16, 8, env) == expected
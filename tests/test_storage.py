@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("pymongo")
+
+import storage  # noqa: E402
+from tests.fakes import FakeDb  # noqa: E402
+
+SHA = "ab" * 32
+KEY = storage.blob_key(SHA, "jpg")
+
+
+class MemoryStore:
+    """Blob store keeping keys in a set; delete can be held open to force a race"""
+
+    def __init__(self):
+        self.files = set()
+        self.delete_started = asyncio.Event()
+        self.allow_delete = asyncio.Event()
+        self.allow_delete.set()
+
+    async def put(self, key, source, content_type):
+        self.files.add(key)
+
+    async def exists(self, key):
+        return key in self.files
+
+    async def delete(self, key):
+        self.delete_started.set()
+        await self.allow_delete.wait()
+        self.files.discard(key)
+
+
+def acquire(db, store, tmp_path):
+    source = tmp_path / "incoming"
+    source.write_bytes(b"photo")
+    return storage.acquire_blob(db, store, SHA, "jpg", source, "image/jpeg")
+
+
+def test_last_release_deletes_the_file_and_record(tmp_path):
+    async def scenario():
+        db, store = FakeDb(), MemoryStore()
+        await acquire(db, store, tmp_path)
+        await acquire(db, store, tmp_path)
+        await storage.release_blob(db, store, SHA)
+        assert store.files == {KEY} and db.blobs.docs[0]["refcount"] == 1
+        await storage.release_blob(db, store, SHA)
+        assert store.files == set() and db.blobs.docs == []
+
+    asyncio.run(scenario())
+
+
+def test_acquire_during_the_last_release_keeps_its_file(tmp_path):
+    async def scenario():
+        db, store = FakeDb(), MemoryStore()
+        await acquire(db, store, tmp_path)
+
+        store.allow_delete.clear()
+        release = asyncio.create_task(storage.release_blob(db, store, SHA))
+        await store.delete_started.wait()
+        # The record is a tombstone now; this acquire revives it mid-delete
+        revive = asyncio.create_task(acquire(db, store, tmp_path))
+        await asyncio.sleep(0.1)
+        store.allow_delete.set()
+        await asyncio.gather(release, revive)
+
+        assert store.files == {KEY}
+        doc = db.blobs.docs[0]
+        assert doc["refcount"] == 1 and "deleting" not in doc
+
+    asyncio.run(scenario())